@@ -2,25 +2,58 @@
 """
 Consumer helper: read latest.json pointer, verify freshness (<=24h),
 fetch overlay/option_pl/gap CSVs, and emit:
-  - analysis_digest.json + analysis_digest.md
+  - analysis_digest.json + analysis_digest.md (+ analysis_digest.ndjson, one record per line)
   - vwap_missing.json + vwap_missing.md  <-- NEW (flags tickers with missing VWAP)
 
 A ticker is flagged as VWAP-missing if:
   - VWAP is None/NaN/blank OR
   - Px_vs_VWAP is "Unknown"
 
+When latest.json points at a snapshot manifest (tools/snapshot_manifest.py), the
+READY round trip is skipped: the manifest hash in the pointer decides whether
+anything changed, only artifacts whose SHA-256 differs from the local cache are
+downloaded, and every artifact is integrity-checked before use. Sequenced
+pointers (tools/snapshot_delta.py) are brought up to date by applying the row
+deltas since the cached sequence number, resyncing from the full snapshot on a gap.
+
+Fetching is hedged across mirrors (tools/mirror_fetch.py): GitHub Pages, jsDelivr
+and raw.githubusercontent.com race with a short hedge delay, the first response
+that passes its checksum/parse check wins, and per-mirror latency/error stats in
+CACHE_DIR reorder the mirrors on later runs. FETCH_MODE=raw restores the single
+raw.githubusercontent.com origin.
+
+Digests are rendered by tools/digest_writer.py: CSV rows are streamed once into
+the JSON, NDJSON and Markdown outputs (and the VWAP-missing check), with NaN/Inf
+written as null, so memory stays flat as the overlay grows and the JSON is strict.
+
+Trend mode (TREND_DAYS=N or --trend-days N) keeps the last N-1 published days of
+overlay and option P/L in CACHE_DIR/history and only downloads days it doesn't have
+(listed from data/index.json, falling back to a calendar walk), then adds
+day-over-day deltas and streaks per Ticker / OCC (tools/trends.py) to the digest
+records as trend columns.
+
 Env overrides (optional):
   REPO=Sevenon7/Tradier_Options
   MAX_AGE_HOURS=24
   RETRY_COUNT=3
   RETRY_SLEEP=1.2
+  CACHE_DIR=.leaps_cache
+  FETCH_MODE=hedged        (or raw)
+  MIRRORS, POINTER_MIRRORS, HEDGE_MS  (see tools/mirror_fetch.py)
+  TREND_DAYS=0             (N > 1 enables the N-day trend columns)
 """
 from __future__ import annotations
-import os, sys, json, time
+import os, sys, json, time, shutil
 import datetime as dt
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Iterable, Iterator, Tuple
+import argparse
 import requests
-import pandas as pd
+from tools.snapshot_manifest import sha256_bytes, verify_artifact, atomic_write_bytes
+from tools.snapshot_delta import delta_path, replay
+from tools.trends import (OVERLAY_KEY, OVERLAY_METRICS, PL_KEY, PL_METRICS, trend_table,
+                          with_trends)
+from tools.mirror_fetch import HedgedFetcher, MirrorStats, POINTER_MIRRORS, STATS_FILE
+from tools.digest_writer import DigestWriter, iter_csv_records, write_json_file, write_md_table
 
 REPO = os.environ.get("REPO", "Sevenon7/Tradier_Options")
 BASE_RAW = f"https://raw.githubusercontent.com/{REPO}/main"
@@ -29,27 +62,79 @@ POINTER_URL = f"{BASE_RAW}/latest.json"
 MAX_AGE_HOURS = int(os.environ.get("MAX_AGE_HOURS", "24"))
 RETRY_COUNT = int(os.environ.get("RETRY_COUNT", "3"))
 RETRY_SLEEP = float(os.environ.get("RETRY_SLEEP", "1.2"))
+CACHE_DIR = os.environ.get("CACHE_DIR", ".leaps_cache")
+FETCH_MODE = os.environ.get("FETCH_MODE", "hedged").strip().lower()
+TREND_DAYS = int(os.environ.get("TREND_DAYS", "0"))
+TREND_ARTIFACTS = ("overlay_vwap_macd_rsi.csv", "option_pl.csv")
 
 OUT_JSON = "analysis_digest.json"
 OUT_MD   = "analysis_digest.md"
+OUT_NDJSON = "analysis_digest.ndjson"
 
 VWAP_JSON = "vwap_missing.json"   # NEW
 VWAP_MD   = "vwap_missing.md"     # NEW
 
-def fetch(url: str) -> Optional[str]:
+def fetch_bytes(url: str, attempts: int = RETRY_COUNT) -> Optional[bytes]:
     last_err = None
-    for i in range(RETRY_COUNT):
+    for i in range(attempts):
         try:
             r = requests.get(url, timeout=15)
-            if r.status_code == 200 and r.text:
-                return r.text
+            if r.status_code == 200 and r.content:
+                return r.content
             last_err = f"{r.status_code} {r.text[:200]}"
         except Exception as e:
             last_err = str(e)
-        time.sleep(RETRY_SLEEP * (i + 1))
+        if i + 1 < attempts:
+            time.sleep(RETRY_SLEEP * (i + 1))
     print(f"[warn] fetch failed for {url}: {last_err}")
     return None
 
+def fetch(url: str) -> Optional[str]:
+    data = fetch_bytes(url)
+    return data.decode("utf-8", errors="replace") if data is not None else None
+
+_FETCHER: Optional[HedgedFetcher] = None
+
+def fetcher() -> HedgedFetcher:
+    global _FETCHER
+    if _FETCHER is None:
+        _FETCHER = HedgedFetcher(stats=MirrorStats(_cache_path(STATS_FILE)), timeout=15)
+    return _FETCHER
+
+def fetch_path(path: str, validate=None, pointer: bool = False,
+               attempts: int = RETRY_COUNT) -> Optional[bytes]:
+    """
+    Repo-relative path → bytes. Hedged across mirrors unless FETCH_MODE=raw; `validate`
+    rejects stale/corrupt bodies so another mirror can win, `pointer` limits the race
+    to POINTER_MIRRORS (jsDelivr caches branch files too long for latest.json and
+    data/index.json). `attempts=1` is for probes where a miss is an answer.
+    """
+    if FETCH_MODE == "raw":
+        return fetch_bytes(f"{BASE_RAW}/{path}", attempts)
+    for i in range(attempts):
+        data = fetcher().get(path, validate, only=POINTER_MIRRORS if pointer else None)
+        if data is not None:
+            return data
+        if i + 1 < attempts:
+            time.sleep(RETRY_SLEEP * (i + 1))
+    return None
+
+def fetch_path_text(path: str, validate=None, pointer: bool = False) -> Optional[str]:
+    data = fetch_path(path, validate, pointer)
+    return data.decode("utf-8", errors="replace") if data is not None else None
+
+def _is_json(data: bytes) -> bool:
+    return parse_json(data.decode("utf-8", errors="replace")) is not None
+
+def save_mirror_stats(notes: List[str]):
+    if _FETCHER is None:
+        return
+    st = _FETCHER.stats
+    order = [f"{m.name} ({st.data[m.name]['ewma_ms']:.0f} ms)" if st.data.get(m.name, {}).get("ewma_ms") is not None
+             else m.name for m in st.order(_FETCHER.mirrors)]
+    notes.append(f"Mirror order for next run: {', '.join(order)}")
+    st.save()
+
 def parse_json(text: str) -> Optional[dict]:
     try:
         return json.loads(text)
@@ -64,6 +149,10 @@ def within_24h(ts_iso: str) -> bool:
     except Exception:
         return False
 
+def build_paths(date_dir: str):
+    return (f"{date_dir}/overlay_vwap_macd_rsi.csv", f"{date_dir}/option_pl.csv",
+            f"{date_dir}/gapdown_above_100sma.csv", f"{date_dir}/READY")
+
 def build_raw(date_dir: str):
     overlay = f"{BASE_RAW}/{date_dir}/overlay_vwap_macd_rsi.csv"
     opl     = f"{BASE_RAW}/{date_dir}/option_pl.csv"
@@ -71,18 +160,229 @@ def build_raw(date_dir: str):
     ready   = f"{BASE_RAW}/{date_dir}/READY"
     return overlay, opl, gap, ready
 
-def csv_to_records(url: str) -> List[Dict]:
-    txt = fetch(url)
-    if not txt:
-        return []
+def csv_text_to_records(txt: Optional[str], src: str) -> Iterator[Dict]:
+    """Lazily typed records (NaN → None); a malformed CSV ends the stream with a warning."""
     try:
-        from io import StringIO
-        df = pd.read_csv(StringIO(txt))
-        df = df.where(pd.notna(df), None)
-        return json.loads(df.to_json(orient="records"))
+        yield from iter_csv_records(txt)
     except Exception as e:
-        print(f"[warn] failed reading CSV {url}: {e}")
-        return []
+        print(f"[warn] failed reading CSV {src}: {e}")
+
+def csv_to_records(path: str) -> Iterator[Dict]:
+    return csv_text_to_records(fetch_path_text(path), path)
+
+# ---------- Snapshot manifest sync ----------
+def _cache_path(*parts: str) -> str:
+    return os.path.join(CACHE_DIR, *parts)
+
+def _read_cached(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+def sync_snapshot(ptr: dict, notes: List[str]) -> Optional[Dict[str, bytes]]:
+    """
+    Bring the local cache in line with the manifest latest.json points at.
+    Returns {artifact_name: verified bytes}, or None if the manifest can't be trusted.
+    """
+    os.makedirs(_cache_path("artifacts"), exist_ok=True)
+    man_path = _cache_path("manifest.json")
+    raw = _read_cached(man_path)
+    if raw is None or sha256_bytes(raw) != ptr.get("manifest_sha256"):
+        raw = fetch_path(ptr["manifest"], lambda b: sha256_bytes(b) == ptr.get("manifest_sha256"))
+        if raw is None or sha256_bytes(raw) != ptr.get("manifest_sha256"):
+            notes.append("ERROR: manifest missing or does not match latest.json checksum.")
+            return None
+        notes.append(f"Manifest changed: {ptr['manifest']}")
+    else:
+        notes.append("Manifest unchanged since last run (served from cache).")
+    man = json.loads(raw)
+
+    out, fetched = {}, []
+    for name, entry in man.get("artifacts", {}).items():
+        local = _cache_path("artifacts", name)
+        data = _read_cached(local)
+        if not verify_artifact(entry, data):
+            data = fetch_path(entry["path"], lambda b, e=entry: verify_artifact(e, b)) if entry.get("bytes") else b""
+            if not verify_artifact(entry, data):
+                notes.append(f"WARNING: {name} failed integrity check (sha256/size); skipped.")
+                continue
+            atomic_write_bytes(local, data)
+            if data:
+                fetched.append(name)
+        out[name] = data
+    atomic_write_bytes(man_path, raw)
+    notes.append(f"Artifacts fetched: {', '.join(fetched) if fetched else 'none (all cached)'}")
+    return out
+
+def sync_deltas(ptr: dict, base: Dict[str, bytes], notes: List[str]) -> Dict[str, bytes]:
+    """Roll the full snapshot forward to ptr["seq"] using cached state plus any newer deltas."""
+    seq, full_seq = ptr.get("seq"), ptr.get("full_seq")
+    if seq is None or full_seq is None or seq <= full_seq:
+        return base
+    meta = parse_json((_read_cached(_cache_path("current.json")) or b"").decode("utf-8")) or {}
+    start, start_seq = None, None
+    if meta.get("manifest_sha256") == ptr.get("manifest_sha256") and full_seq <= meta.get("seq", -1) <= seq:
+        start = {name: _read_cached(_cache_path("current", name)) for name in base}
+        if any(v is None for v in start.values()):
+            start = None
+        else:
+            start_seq = meta["seq"]
+    load = lambda s: parse_json(fetch_path_text(delta_path(ptr["date_dir"], s), _is_json) or "")
+    try:
+        cur = replay(base, full_seq, seq, load, start, start_seq)
+    except LookupError as e:
+        if start is None:
+            notes.append(f"WARNING: {e}; using full snapshot seq {full_seq} (stale).")
+            return base
+        notes.append(f"Delta gap detected ({e}); resyncing from full snapshot seq {full_seq}.")
+        start_seq = None
+        try:
+            cur = replay(base, full_seq, seq, load)
+        except LookupError as e2:
+            notes.append(f"WARNING: {e2}; using full snapshot seq {full_seq} (stale).")
+            return base
+    os.makedirs(_cache_path("current"), exist_ok=True)
+    for name, data in cur.items():
+        atomic_write_bytes(_cache_path("current", name), data)
+    atomic_write_bytes(_cache_path("current.json"),
+                       json.dumps({"manifest_sha256": ptr.get("manifest_sha256"), "seq": seq}).encode("utf-8"))
+    first = (start_seq if start_seq is not None else full_seq) + 1
+    notes.append(f"Applied deltas {first}..{seq} (full_seq={full_seq})." if first <= seq
+                 else f"Cached state already at seq {seq}.")
+    return cur
+
+# ---------- Trend history (last N days) ----------
+def _day_of(date_dir: str) -> str:
+    return os.path.basename(date_dir.rstrip("/"))[:10]
+
+def _history_path(*parts: str) -> str:
+    return _cache_path("history", *parts)
+
+def list_history_days(cur_day: str, n: int, notes: List[str]) -> List[Tuple[str, Dict]]:
+    """Up to n published days before cur_day, newest first, as (day, index entry)."""
+    idx = parse_json(fetch_path_text("data/index.json", _is_json, pointer=True) or "") or {}
+    if isinstance(idx.get("days"), dict):
+        days = sorted((d for d in idx["days"] if d < cur_day), reverse=True)[:n]
+        return [(d, idx["days"][d]) for d in days]
+    notes.append("Trend: data/index.json unavailable; walking the calendar.")
+    return walk_calendar(cur_day, n)
+
+def walk_calendar(cur_day: str, n: int) -> List[Tuple[str, Dict]]:
+    """
+    Fallback day listing: step back from cur_day, using cached days as-is and probing
+    the rest with a single attempt each (manifest, else the legacy overlay CSV). Days
+    probed absent that are at least two days old are remembered in history/missing.json
+    and not probed again.
+    """
+    missing = set(parse_json((_read_cached(_history_path("missing.json")) or b"[]").decode("utf-8")) or [])
+    start, out, added = dt.date.fromisoformat(cur_day), [], False
+    for back in range(1, 2 * n + 8):
+        if len(out) >= n:
+            break
+        day = (start - dt.timedelta(days=back)).isoformat()
+        meta = parse_json((_read_cached(_history_path(day, "meta.json")) or b"").decode("utf-8"))
+        if meta:
+            out.append((day, meta.get("entry") or {"date_dir": f"data/{day}"}))
+            continue
+        if day in missing:
+            continue
+        raw = fetch_path(f"data/{day}/manifest.json", _is_json, attempts=1)
+        if raw is not None:
+            out.append((day, {"date_dir": f"data/{day}", "manifest": f"data/{day}/manifest.json",
+                              "manifest_sha256": sha256_bytes(raw)}))
+        elif fetch_path(f"data/{day}/{TREND_ARTIFACTS[0]}", attempts=1) is not None:
+            out.append((day, {"date_dir": f"data/{day}"}))
+        elif back >= 2:
+            missing.add(day)
+            added = True
+    if added:
+        os.makedirs(_history_path(), exist_ok=True)
+        atomic_write_bytes(_history_path("missing.json"), json.dumps(sorted(missing)).encode("utf-8"))
+    return out
+
+def fetch_day(entry: Dict) -> Optional[Dict[str, bytes]]:
+    """One past day's overlay/option P/L bytes: manifest-verified (+ deltas up to its seq), or legacy CSVs."""
+    if not entry.get("manifest"):
+        overlay = fetch_path(f"{entry['date_dir']}/{TREND_ARTIFACTS[0]}")
+        if overlay is None:
+            return None
+        return {TREND_ARTIFACTS[0]: overlay,
+                TREND_ARTIFACTS[1]: fetch_path(f"{entry['date_dir']}/{TREND_ARTIFACTS[1]}") or b""}
+    sha = entry.get("manifest_sha256")
+    raw = fetch_path(entry["manifest"], (lambda b: sha256_bytes(b) == sha) if sha else _is_json)
+    if raw is None:
+        return None
+    man = json.loads(raw)
+    base: Dict[str, bytes] = {}
+    for name in TREND_ARTIFACTS:
+        a = man.get("artifacts", {}).get(name)
+        data = b"" if not a or not a.get("bytes") else fetch_path(a["path"], lambda b, e=a: verify_artifact(e, b))
+        if a and not verify_artifact(a, data):
+            return None
+        base[name] = data or b""
+    seq, full_seq = entry.get("seq"), entry.get("full_seq")
+    if seq is not None and full_seq is not None and seq > full_seq:
+        def load(k: int) -> Optional[Dict]:
+            d = parse_json(fetch_path_text(delta_path(entry["date_dir"], k), _is_json) or "")
+            if d:
+                d["artifacts"] = {n: c for n, c in d.get("artifacts", {}).items() if n in base}
+            return d
+        try:
+            base = replay(base, full_seq, seq, load)
+        except LookupError as e:
+            print(f"[warn] {entry['date_dir']}: {e}; using its full snapshot")
+    return base
+
+def history_day(day: str, entry: Dict) -> Tuple[Optional[Dict[str, bytes]], bool]:
+    """(artifact bytes, downloaded?) for a past day; the cache is reused while its manifest/seq match the index."""
+    meta = parse_json((_read_cached(_history_path(day, "meta.json")) or b"").decode("utf-8")) or {}
+    cached = meta.get("entry") or {}
+    if meta and all(cached.get(k) == entry.get(k) for k in ("manifest_sha256", "seq") if entry.get(k) is not None):
+        data = {name: _read_cached(_history_path(day, name)) for name in TREND_ARTIFACTS}
+        if all(v is not None for v in data.values()):
+            return data, False
+    data = fetch_day(entry)
+    if data is None:
+        return None, True
+    os.makedirs(_history_path(day), exist_ok=True)
+    for name, body in data.items():
+        atomic_write_bytes(_history_path(day, name), body)
+    atomic_write_bytes(_history_path(day, "meta.json"), json.dumps({"entry": entry}).encode("utf-8"))
+    return data, True
+
+def build_trends(date_dir: str, current: Dict[str, Optional[str]], n_days: int,
+                 notes: List[str]) -> Optional[Dict]:
+    """
+    Trend tables over the last n_days snapshots (today's from `current`, the rest from
+    the history cache); only days missing from the cache are downloaded.
+    """
+    cur_day = _day_of(date_dir)
+    listed = list_history_days(cur_day, n_days - 1, notes)
+    days, fetched, texts = [], [], []
+    for day, entry in reversed(listed):  # oldest first
+        data, downloaded = history_day(day, entry)
+        if data is None:
+            notes.append(f"Trend: {day} unavailable; skipped.")
+            continue
+        days.append(day)
+        texts.append({n: data[n].decode("utf-8", errors="replace") for n in TREND_ARTIFACTS})
+        if downloaded:
+            fetched.append(day)
+    keep = set(days)
+    if os.path.isdir(_history_path()):
+        for d in os.listdir(_history_path()):  # drop days that fell out of the window
+            if d not in keep and d != "missing.json" and (not days or d < days[0]):
+                shutil.rmtree(_history_path(d), ignore_errors=True)
+    days.append(cur_day)
+    texts.append(current)
+    rows = lambda name: [list(csv_text_to_records(t.get(name), f"{d}/{name}")) for d, t in zip(days, texts)]
+    overlay = trend_table(rows(TREND_ARTIFACTS[0]), OVERLAY_KEY, OVERLAY_METRICS)
+    pl = trend_table(rows(TREND_ARTIFACTS[1]), PL_KEY, PL_METRICS)
+    notes.append(f"Trend: {len(days)} days ({days[0]}..{days[-1]}); downloaded "
+                 f"{', '.join(fetched) if fetched else 'none (all cached)'}.")
+    return {"days": days, "fetched": fetched, "overlay": overlay, "option_pl": pl}
 
 def is_missing_vwap(rec: Dict) -> bool:
     vwap = rec.get("VWAP")
@@ -94,104 +394,122 @@ def is_missing_vwap(rec: Dict) -> bool:
         return True
     return False
 
-def vwap_missing_table(overlay: List[Dict]) -> List[Dict]:
-    flags = []
-    for r in overlay:
-        if is_missing_vwap(r):
-            flags.append({
-                "Ticker": r.get("Ticker"),
-                "VWAP": r.get("VWAP"),
-                "Px_vs_VWAP": r.get("Px_vs_VWAP"),
-                "LastPx": r.get("LastPx"),
-                "RSI14": r.get("RSI14"),
-                "MACD>Signal": r.get("MACD>Signal"),
-                "Note": "VWAP missing or Px_vs_VWAP=Unknown"
-            })
-    return flags
-
-def md_table(records, cols, title):
-    if not records:
-        return f"## {title}\n_No data_\n"
-    s = [f"## {title}", "| " + " | ".join(cols) + " |", "| " + " | ".join(["---"]*len(cols)) + " |"]
-    for r in records:
-        s.append("| " + " | ".join("" if r.get(c) is None else str(r.get(c)) for c in cols) + " |")
-    return "\n".join(s) + "\n"
-
-def main():
-    summary = {
-        "generated_utc": dt.datetime.now(dt.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
-        "raw_links": {}, "overlay": [], "option_pl": [], "gap_screen": [], "notes": []
+def vwap_missing_row(r: Dict) -> Dict:
+    return {
+        "Ticker": r.get("Ticker"),
+        "VWAP": r.get("VWAP"),
+        "Px_vs_VWAP": r.get("Px_vs_VWAP"),
+        "LastPx": r.get("LastPx"),
+        "RSI14": r.get("RSI14"),
+        "MACD>Signal": r.get("MACD>Signal"),
+        "Note": "VWAP missing or Px_vs_VWAP=Unknown"
     }
 
+def vwap_missing_table(overlay: Iterable[Dict]) -> List[Dict]:
+    return [vwap_missing_row(r) for r in overlay if is_missing_vwap(r)]
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(prog="leaps consume", description="Build analysis_digest + vwap_missing "
+                                 "reports from latest.json (configured via env; see module docstring)")
+    ap.add_argument("--trend-days", type=int, default=TREND_DAYS,
+                    help="add N-day trend columns from the local history cache (default: TREND_DAYS env, 0 = off)")
+    args = ap.parse_args(argv)
+    generated_utc = dt.datetime.now(dt.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    notes: List[str] = []
+
     # Pointer first
-    ptr = parse_json(fetch(POINTER_URL) or "") or {}
+    ptr = parse_json((fetch_path("latest.json", _is_json, pointer=True) or b"").decode("utf-8")) or {}
     date_dir = ptr.get("date_dir")
     if date_dir:
         fresh = within_24h(ptr.get("generated_utc",""))
-        summary["notes"].append(f"Pointer freshness <=24h: {fresh}")
+        notes.append(f"Pointer freshness <=24h: {fresh}")
         if not fresh:
-            summary["notes"].append("WARNING: latest.json older than 24h.")
+            notes.append("WARNING: latest.json older than 24h.")
     else:
         # Fallback: today UTC then yesterday
         now = dt.datetime.now(dt.timezone.utc)
         for d in [now, now - dt.timedelta(days=1)]:
             candidate = f"data/{d.strftime('%Y-%m-%d')}"
-            if fetch(f"{BASE_RAW}/{candidate}/overlay_vwap_macd_rsi.csv"):
+            if fetch_path(f"{candidate}/overlay_vwap_macd_rsi.csv"):
                 date_dir = candidate
-                summary["notes"].append(f"Fallback date_dir used: {date_dir}")
+                notes.append(f"Fallback date_dir used: {date_dir}")
                 break
 
     if not date_dir:
-        summary["notes"].append("ERROR: No valid date_dir found.")
-        with open(OUT_JSON, "w") as f: json.dump(summary, f, indent=2)
+        notes.append("ERROR: No valid date_dir found.")
+        save_mirror_stats(notes)
+        write_json_file(OUT_JSON, {"generated_utc": generated_utc, "raw_links": {}, "overlay": [],
+                                   "option_pl": [], "gap_screen": [], "notes": notes})
         with open(OUT_MD, "w") as f: f.write("# Analysis Digest (empty)\nNo valid data_dir found.\n")
+        with open(OUT_NDJSON, "w") as f: f.write(json.dumps({"section": "notes", "value": notes}) + "\n")
         # Also write empty VWAP report
-        with open(VWAP_JSON, "w") as f: json.dump({"date_dir": None, "count": 0, "tickers": []}, f, indent=2)
+        write_json_file(VWAP_JSON, {"date_dir": None, "count": 0, "tickers": []})
         with open(VWAP_MD, "w") as f: f.write("# VWAP Missing Report\n_No data_\n")
         return 0
 
     overlay_url, opl_url, gap_url, ready_url = build_raw(date_dir)
-    summary["raw_links"] = {"overlay": overlay_url, "option_pl": opl_url, "gap_screen": gap_url, "ready": ready_url, "latest": POINTER_URL}
-
-    ready_ok = fetch(ready_url) is not None
-    summary["notes"].append(f"READY flag present: {ready_ok}")
-
-    summary["overlay"] = csv_to_records(overlay_url)
-    summary["option_pl"] = csv_to_records(opl_url)
-    summary["gap_screen"] = csv_to_records(gap_url)
+    overlay_path, opl_path, gap_path, ready_path = build_paths(date_dir)
+    raw_links = {"overlay": overlay_url, "option_pl": opl_url, "gap_screen": gap_url, "ready": ready_url, "latest": POINTER_URL}
 
-    # --- Build main digest outputs ---
-    with open(OUT_JSON, "w", encoding="utf-8") as f:
-        json.dump(summary, f, indent=2)
+    snap = sync_snapshot(ptr, notes) if ptr.get("manifest") else None
+    if snap is not None:
+        snap = sync_deltas(ptr, snap, notes)
+        raw_links["manifest"] = f"{BASE_RAW}/{ptr['manifest']}"
+        text = lambda name: snap[name].decode("utf-8") if name in snap else None
+        overlay_txt, opl_txt, gap_txt = (text(n) for n in ("overlay_vwap_macd_rsi.csv", "option_pl.csv",
+                                                           "gapdown_above_100sma.csv"))
+    else:
+        ready_ok = fetch_path(ready_path) is not None
+        notes.append(f"READY flag present: {ready_ok}")
+        overlay_txt, opl_txt, gap_txt = (fetch_path_text(p) for p in (overlay_path, opl_path, gap_path))
+    overlay = csv_text_to_records(overlay_txt, overlay_url)
+    option_pl = csv_text_to_records(opl_txt, opl_url)
+    gap_screen = csv_text_to_records(gap_txt, gap_url)
 
     overlay_cols = ["Ticker","RSI14","MACD>Signal","VWAP","LastPx","Px_vs_VWAP","SMA100","Gap%","Guidance"]
     pl_cols      = ["Contract","OCC","Bid","Ask","Last","MidUsed","Entry","Contracts","P/L($)","P/L(%)","IV","source","quote_status","spot_status","spot","strike","type","root","expiry","note"]
     gap_cols     = ["Ticker","Gap%","Close","SMA100"]
 
-    md = []
-    md.append(f"# Analysis Digest\n\n**date_dir:** `{date_dir}`  \n**generated_utc:** {summary['generated_utc']}  \n**latest.json:** {POINTER_URL}\n")
-    md.append("### Raw links\n")
-    md.append(f"- overlay: {overlay_url}\n- option_pl: {opl_url}\n- gap_screen: {gap_url}\n- ready: {ready_url}\n")
-    md.append(md_table(summary["overlay"], overlay_cols, "Overlay (VWAP/MACD/RSI)"))
-    md.append(md_table(summary["option_pl"], pl_cols, "Actual Option P/L"))
-    md.append(md_table(summary["gap_screen"], gap_cols, "Gap Down ≥ -1% & Above 100-SMA"))
-    if summary["notes"]:
-        md.append("### Notes\n- " + "\n- ".join(summary["notes"]) + "\n")
+    trend = None
+    if args.trend_days > 1:
+        trend = build_trends(date_dir, {"overlay_vwap_macd_rsi.csv": overlay_txt, "option_pl.csv": opl_txt},
+                             args.trend_days, notes)
+        overlay = with_trends(overlay, OVERLAY_KEY, trend["overlay"], OVERLAY_METRICS)
+        option_pl = with_trends(option_pl, PL_KEY, trend["option_pl"], PL_METRICS)
+        overlay_cols += ["RSI14_d1", "RSI14_streak", "LastPx_d1", "LastPx_streak", "TrendDays"]
+        pl_cols = pl_cols[:10] + ["P/L($)_d1", "P/L($)_streak", "P/L($)_chg", "TrendDays"] + pl_cols[10:]
+
+    save_mirror_stats(notes)
 
-    with open(OUT_MD, "w", encoding="utf-8") as f:
-        f.write("\n".join(md))
+    # --- Main digest: one streaming pass per artifact into JSON + NDJSON + Markdown ---
+    # Notes are complete here (sync is done); CSVs are only read from this point on.
+    flags: List[Dict] = []
+    flag = lambda r: flags.append(vwap_missing_row(r)) if is_missing_vwap(r) else None
+    with open(OUT_JSON, "w", encoding="utf-8") as fj, open(OUT_NDJSON, "w", encoding="utf-8") as fn, \
+         open(OUT_MD, "w", encoding="utf-8") as fm:
+        w = DigestWriter(fj, fn, fm)
+        w.markdown(f"# Analysis Digest\n\n**date_dir:** `{date_dir}`  \n**generated_utc:** {generated_utc}  \n**latest.json:** {POINTER_URL}\n\n")
+        w.markdown("### Raw links\n\n")
+        w.markdown(f"- overlay: {overlay_url}\n- option_pl: {opl_url}\n- gap_screen: {gap_url}\n- ready: {ready_url}\n\n")
+        w.field("generated_utc", generated_utc)
+        w.field("raw_links", raw_links)
+        if trend is not None:
+            w.field("trend", {"days": trend["days"], "downloaded": trend["fetched"]})
+        w.section("overlay", overlay, overlay_cols, "Overlay (VWAP/MACD/RSI)", on_record=flag)
+        w.section("option_pl", option_pl, pl_cols, "Actual Option P/L")
+        w.section("gap_screen", gap_screen, gap_cols, "Gap Down ≥ -1% & Above 100-SMA")
+        w.field("notes", notes)
+        if notes:
+            w.markdown("### Notes\n- " + "\n- ".join(notes) + "\n")
+        w.close()
 
     # --- Build VWAP-missing report (NEW) ---
-    flags = vwap_missing_table(summary["overlay"])
-    vwjson = {"date_dir": date_dir, "count": len(flags), "tickers": flags, "generated_utc": summary["generated_utc"]}
-    with open(VWAP_JSON, "w", encoding="utf-8") as f:
-        json.dump(vwjson, f, indent=2)
+    write_json_file(VWAP_JSON, {"date_dir": date_dir, "count": len(flags), "tickers": flags, "generated_utc": generated_utc})
 
     v_cols = ["Ticker","VWAP","Px_vs_VWAP","LastPx","RSI14","MACD>Signal","Note"]
-    vmd = ["# VWAP Missing Report", f"**date_dir:** `{date_dir}`  ", f"**count:** {len(flags)}  "]
-    vmd.append(md_table(flags, v_cols, "Tickers missing VWAP"))
     with open(VWAP_MD, "w", encoding="utf-8") as f:
-        f.write("\n".join(vmd))
+        f.write(f"# VWAP Missing Report\n**date_dir:** `{date_dir}`  \n**count:** {len(flags)}  \n")
+        write_md_table(f, flags, v_cols, "Tickers missing VWAP")
 
     return 0
 
@@ -0,0 +1 @@
+"""Single `leaps` command-line entry point (python -m leaps <command>); see leaps.cli."""
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fast-start CLI: one entry point for every pipeline stage.
+
+Each subcommand is a (module, help) row; the module is imported only when that
+command runs, so `leaps probe` or `leaps vwap-warn` never pays for pandas, NumPy
+or requests, and config/env is read by the subcommand, not here. This module
+itself imports only the standard library.
+
+Usage:
+  python -m leaps <command> [args...]       # python -m leaps <command> --help
+  python -m leaps startup [--budget-ms 60] [--runs 5]
+
+`startup` is the measured budget: for each cheap command it runs
+`python -m leaps <command> --help` in a fresh interpreter, takes the best of
+--runs, subtracts bare `python -c pass`, and fails (exit 1) if the overhead is
+over budget or if any of pandas/numpy/requests got imported.
+
+Env:
+  LEAPS_STARTUP_BUDGET_MS  -> default --budget-ms (60)
+"""
+
+from __future__ import annotations
+import importlib, os, subprocess, sys, time
+from typing import List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# command -> (module exposing main(argv), one-line help)
+COMMANDS = {
+    "produce":       ("leaps_batched_cached", "build overlay/option P&L/gap CSVs (or --serve)"),
+    "consume":       ("consumer_latest_reader", "read latest.json -> analysis_digest + vwap_missing"),
+    "enrich-vwap":   ("tools.enrich_overlay_with_vwap", "fill VWAP columns in an overlay CSV"),
+    "vwap-backfill": ("tools.vwap_backfill", "fill missing VWAP in published snapshots under data/"),
+    "option-pl":     ("tools.option_pl_builder", "mark open options -> option_pl.csv"),
+    "positions":     ("tools.positions", "sync account positions into the cached options book"),
+    "probe":         ("tools.timesales_probe", "check /markets/timesales access for a symbol"),
+    "vwap-warn":     ("tools.vwap_warn", "emit GitHub warnings from vwap_missing.json"),
+    "mirror-fetch":  ("tools.mirror_fetch", "hedged fetch of repo paths across Pages/jsDelivr/raw"),
+    "mirror-standin": ("tools.mirror_standin", "local stand-in mirrors with injected latency/errors"),
+    "publish":       ("tools.snapshot_manifest", "publish a manifest-backed snapshot + latest.json"),
+    "publish-delta": ("tools.snapshot_delta", "publish a run as a row-level delta"),
+    "stream":        ("tools.stream_ingest", "ingest streaming trades/quotes"),
+    "stream-replay": ("tools.stream_replay", "local stand-in for the streaming API"),
+    "accounts-standin": ("tools.accounts_standin", "local stand-in for the account/quote endpoints"),
+    "digest":        ("tools.digest_writer", "strict-JSON digest of a snapshot directory"),
+    "rules":         ("tools.rules", "dry-run rules.json over an overlay CSV"),
+    "risk":          ("tools.risk_grid", "greeks + scenario grid for the options book"),
+}
+CHEAP = ["probe", "vwap-warn", "publish", "publish-delta", "stream-replay", "accounts-standin", "digest"]
+HEAVY = ("pandas", "numpy", "requests")
+BUDGET_MS = float(os.environ.get("LEAPS_STARTUP_BUDGET_MS", "60"))
+
+def usage() -> str:
+    width = max(len(c) for c in COMMANDS)
+    lines = ["usage: python -m leaps <command> [args...]", "", "commands:"]
+    lines += [f"  {c:<{width}}  {h}" for c, (_, h) in COMMANDS.items()]
+    lines.append(f"  {'startup':<{width}}  measure CLI start-up against the budget")
+    return "\n".join(lines)
+
+def run(cmd: str, argv: List[str]) -> int:
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    module = importlib.import_module(COMMANDS[cmd][0])
+    rc = module.main(argv)
+    return rc if isinstance(rc, int) else 0
+
+# ---------- Startup budget ----------
+def _best_ms(args: List[str], runs: int) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run(args, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        best = min(best, (time.perf_counter() - t0) * 1000.0)
+    return best
+
+def _heavy_imports(cmd: str) -> List[str]:
+    """Heavy modules loaded by `<cmd> --help`, checked in a child interpreter."""
+    code = ("import sys\nfrom leaps.cli import run\n"
+            f"try:\n    run({cmd!r}, ['--help'])\nexcept SystemExit:\n    pass\n"
+            f"print(','.join(m for m in {HEAVY!r} if m in sys.modules), file=sys.stderr)")
+    p = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    last = p.stderr.strip().splitlines()[-1:] or [""]
+    return [m for m in last[0].split(",") if m]
+
+def startup(argv: List[str]) -> int:
+    import argparse
+    ap = argparse.ArgumentParser(prog="leaps startup")
+    ap.add_argument("--budget-ms", type=float, default=BUDGET_MS, help="max overhead over bare `python -c pass`")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("commands", nargs="*", default=CHEAP)
+    args = ap.parse_args(argv)
+
+    base = _best_ms([sys.executable, "-c", "pass"], args.runs)
+    print(f"[startup] interpreter baseline {base:.1f} ms; budget +{args.budget_ms:.0f} ms")
+    failed, width = 0, max(map(len, args.commands), default=0)
+    for cmd in args.commands:
+        if cmd not in COMMANDS:
+            print(f"[startup] unknown command {cmd!r}")
+            failed += 1
+            continue
+        ms = _best_ms([sys.executable, "-m", "leaps", cmd, "--help"], args.runs)
+        heavy = _heavy_imports(cmd)
+        ok = ms - base <= args.budget_ms and not heavy
+        failed += not ok
+        print(f"  {cmd:<{width}} {ms:7.1f} ms (+{ms - base:5.1f})  {'ok' if ok else 'OVER'}"
+              + (f"  imports {', '.join(heavy)}" if heavy else ""))
+    return 1 if failed else 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return 0 if argv else 2
+    cmd, rest = argv[0], argv[1:]
+    if cmd == "startup":
+        return startup(rest)
+    if cmd not in COMMANDS:
+        print(f"leaps: unknown command {cmd!r}\n\n{usage()}", file=sys.stderr)
+        return 2
+    return run(cmd, rest)
+
+if __name__ == "__main__":
+    sys.exit(main())
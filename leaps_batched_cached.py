@@ -5,14 +5,35 @@ LEAPS Overlay Runner (Tradier) — resilient build
 - Retries + rate-limit awareness for all REST calls (Tradier minute windows).
 - Correct quotes endpoint for equities & OCC options (with greeks).
 - Intraday VWAP via /v1/markets/timesales (ET cash session first, fallback to 'all').
+- Intraday RSI/MACD/EMA on 1/5/15-minute bars, all resampled from the one 1-minute timesales
+  pull (tools/intraday_ta.py), incremental across refreshes; extra overlay columns + rule variables.
+- History/timesales bodies are streamed straight into typed bar arrays (tools/bars_decode.py);
+  no per-bar dicts or DataFrames on the fetch path.
 - Market clock guard (VWAP marked unavailable if closed/unknown).
 - Safe indicators (SMA100/RSI/MACD) only when enough bars.
 - Gap screen is empty-safe; atomic CSV writes; JSON-safe numbers.
+- Guidance (EXIT/TRIM/HOLD) and the gap screen come from rules.json via tools/rules.py,
+  evaluated as NumPy masks over the whole overlay panel; GuidanceRule records the rule that fired.
+- Option P/L book synced from the Tradier accounts (tools/positions.py): positions cached with
+  change hashes, quotes/greeks re-resolved only for added/changed contracts.
+- Rolling return correlation / beta-to-QQQ across the tickers (tools/correlation.py), updated
+  incrementally from the cached daily bars → correlation.csv + correlation_top.csv.
+- --serve: resident mode that keeps bars/indicators/quotes in memory, refreshes on a
+  schedule and serves overlay / option P/L / gap / correlation / digest JSON over local HTTP with ETags.
+
+Usage:
+  python leaps_batched_cached.py                      # one-shot: write the output CSVs
+  python leaps_batched_cached.py --serve [--host 127.0.0.1] [--port 8787] [--refresh 300] [--stream]
+
+  --stream feeds VWAP / last price / option marks from the Tradier streaming session
+  (tools/stream_ingest.py); timesales bars still drive the intraday TA columns and seed
+  the VWAP from 09:30 up to the connect, and it is only used once that seed is in.
 """
 
 from __future__ import annotations
-import os, sys, math, time, json, tempfile, contextlib, re
+import os, sys, math, time, json, tempfile, contextlib, argparse, hashlib, threading
 import datetime as dt
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from zoneinfo import ZoneInfo
 from typing import Any, Dict, List
 
@@ -21,31 +42,51 @@ from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import pandas as pd
 
+from tools.bars_decode import Bars, OHLCV, decode_bars
+from tools.intraday_ta import update_timeframes
+from tools.positions import QUOTE_TTL, PositionBook, fetch_quotes
+from tools.correlation import STATE_FILE as CORR_STATE_FILE, RollingCorr, matrix_frame, top_pairs_frame
+from tools.rules import RULES_FILE, load_rules, panel_from_rows
+from tools.vwap_engine import VWAP, bar_prices, to_ms
+
 # ---------- Config ----------
-BASE   = "https://api.tradier.com/v1"
-TOKEN  = os.getenv("TRADIER_TOKEN")
-if not TOKEN:
-    print("ERROR: Set TRADIER_TOKEN environment variable.")
-    sys.exit(1)
+BASE   = os.getenv("TRADIER_BASE", "https://api.tradier.com/v1")
+TOKEN  = os.getenv("TRADIER_TOKEN")  # checked in main(); importing this module has no side effects
 
 HEADERS = {"Authorization": f"Bearer {TOKEN}", "Accept": "application/json"}
 
 CONFIG = {
     "tickers": ["QQQ","META","MSFT","MSTU","MSTR","PLTR","AMD","NVDA","BBAI","RKLB","VST","ASTS","RDDT","UUUU"],
-    "open_options": [
-        {"occ":"META260220C00700000","entry":109.13,"contracts":1,  "label":"META 700C Feb '26"},
-        {"occ":"MSTU260320C00005000","entry":1.86,  "contracts":20, "label":"MSTU 5C Mar '26"},
-    ],
     "daily_lookback_days": 400,
     "intraday_interval": "5min",
+    # Intraday indicator timeframes (minutes); when set, timesales are pulled once at 1min and resampled
+    "intraday_timeframes": [int(x) for x in os.getenv("INTRADAY_TF", "1,5,15").split(",") if x.strip()],
     "out_overlay_csv": "overlay_vwap_macd_rsi.csv",
     "out_pl_csv": "option_pl.csv",
     "out_gap_csv": "gapdown_above_100sma.csv",
+    "out_corr_csv": "correlation.csv",
+    "out_corr_top_csv": "correlation_top.csv",
+    "corr_benchmark": "QQQ",
+    "corr_top_pairs": 10,
+    "corr_state": os.path.join(os.getenv("CACHE_DIR", ".leaps_cache"), CORR_STATE_FILE),
+    "rules_file": os.getenv("RULES_FILE") or RULES_FILE,
 }
 
-# ---------- Utils / resilience ----------
-OSI_RE = re.compile(r"^[A-Z0-9 ]{6}\d{6}[CP]\d{8}$")  # 21-char OCC/OSI
+# Guidance / screen rules (rules.json); columns a rule may reference:
+PANEL_COLS = ["px", "vwap", "vwap_sd", "vwap_z", "rsi", "macd", "signal", "close", "open", "sma100", "gap"]
+# ...plus rsi_<m>m, macdh_<m>m, ema20_<m>m per intraday timeframe (overlay RSI14_<m>m, MACDh_<m>m, EMA20_<m>m)
+TA_COLS = {"rsi": ("RSI14", 2), "macdh": ("MACDh", 4), "ema20": ("EMA20", 4)}
+TA_PANEL_COLS = [f"{k}_{m}m" for m in CONFIG["intraday_timeframes"] for k in TA_COLS]
+TA_OVERLAY_COLS = [f"{TA_COLS[k][0]}_{m}m" for m in CONFIG["intraday_timeframes"] for k in TA_COLS]
+_RULES = None
+
+def rules():
+    global _RULES
+    if _RULES is None:
+        _RULES = load_rules(CONFIG["rules_file"])
+    return _RULES
 
+# ---------- Utils / resilience ----------
 def requests_retry_session(
     total=4, backoff_factor=0.6,
     status_forcelist=(429, 500, 502, 503, 504),
@@ -72,7 +113,13 @@ def requests_retry_session(
     s.request = _wrap
     return s
 
-S = requests_retry_session()
+_S: requests.Session | None = None
+
+def session() -> requests.Session:
+    global _S
+    if _S is None:
+        _S = requests_retry_session()
+    return _S
 
 def _rate_limit_rest(resp: requests.Response):
     """Honor Tradier minute window if we're near empty. Headers: X-Ratelimit-Available, X-Ratelimit-Expiry."""
@@ -92,19 +139,24 @@ def _rate_limit_rest(resp: requests.Response):
     except Exception:
         pass
 
-def get_json(url: str, params: Dict[str, Any] | None = None) -> Dict[str, Any] | None:
-    r = S.get(url, headers=HEADERS, params=params or {})
-    _rate_limit_rest(r)
+def _status_ok(r: requests.Response, url: str, params: Dict[str, Any] | None) -> bool:
     if r.status_code == 404:
         print(f"[warn] 404: {url} {params}")
-        return None
+        return False
     if r.status_code == 401:
         print("[error] 401 Unauthorized from Tradier. Check token scope.")
-        return None
+        return False
     try:
         r.raise_for_status()
     except requests.HTTPError as e:
         print(f"[warn] HTTP {r.status_code}: {url} {params} -> {e} :: {r.text[:200]}")
+        return False
+    return True
+
+def get_json(url: str, params: Dict[str, Any] | None = None) -> Dict[str, Any] | None:
+    r = session().get(url, headers=HEADERS, params=params or {})
+    _rate_limit_rest(r)
+    if not _status_ok(r, url, params):
         return None
     try:
         return r.json()
@@ -112,6 +164,19 @@ def get_json(url: str, params: Dict[str, Any] | None = None) -> Dict[str, Any] |
         print(f"[warn] JSON decode failed: {url} {params}")
         return None
 
+def get_bars(url: str, params: Dict[str, Any], fields=OHLCV) -> Bars:
+    """History/timesales → Bars, decoded chunk by chunk as the body arrives."""
+    with session().get(url, headers=HEADERS, params=params, stream=True) as r:
+        _rate_limit_rest(r)
+        if not _status_ok(r, url, params):
+            return Bars.blank()
+        try:
+            return decode_bars(r.iter_content(1 << 16), fields,
+                               size_hint=int(r.headers.get("Content-Length") or 0))
+        except ValueError:
+            print(f"[warn] bar decode failed: {url} {params}")
+            return Bars.blank()
+
 @contextlib.contextmanager
 def atomic_write(path: str, mode: str = "w", encoding: str | None = "utf-8"):
     d = os.path.dirname(os.path.abspath(path)) or "."
@@ -142,9 +207,6 @@ def sanitize_json(obj: Any) -> Any:
         return [sanitize_json(v) for v in obj]
     return obj
 
-def validate_osi(occ: str) -> bool:
-    return bool(OSI_RE.match(occ))
-
 # ---------- TA helpers ----------
 def rsi(series: pd.Series, period=14) -> pd.Series:
     delta = series.diff()
@@ -166,23 +228,35 @@ def macd(series: pd.Series, fast=12, slow=26, signal=9):
 def sma(series: pd.Series, period: int) -> pd.Series:
     return series.rolling(period).mean()
 
-def session_vwap_from_bars(df: pd.DataFrame):
-    if df is None or df.empty:
-        return math.nan, math.nan
-    tp = (df["high"] + df["low"] + df["close"]) / 3.0
-    vol = df["volume"].fillna(0)
-    cv = vol.cumsum()
-    vwap = (tp * vol).cumsum() / cv.replace(0, pd.NA)
-    last_px = float(df["close"].iloc[-1])
-    return (float(vwap.iloc[-1]) if pd.notna(vwap.iloc[-1]) else math.nan, last_px)
-
-def mid_from_quote(q: dict) -> float:
-    bid = float(q.get("bid") or 0)
-    ask = float(q.get("ask") or 0)
-    last = float(q.get("last") or 0)
-    if bid > 0 and ask > 0:
-        return (bid + ask) / 2.0
-    return last or bid or ask
+def session_vwap(sym: str, idf: Bars, session_open_et: dt.datetime, state: dict) -> dict:
+    """Session VWAP/σ anchored at the open; the cached accumulator only folds in bars it hasn't counted."""
+    anchor = to_ms(session_open_et)  # Bars.t is epoch ms
+    acc = state["vwap"].get(sym)
+    if acc is None or acc.anchor != anchor:
+        acc = state["vwap"][sym] = VWAP(anchor)
+    if idf is not None and not idf.empty:
+        acc.update(idf.t, bar_prices(idf), idf.volume)
+    return acc.stats()
+
+def intraday_indicators(sym: str, idf: Bars | None, session_open_et: dt.datetime, state: dict) -> dict:
+    """{"rsi_5m": .., "macdh_5m": .., "ema20_5m": .., ...}; per-timeframe state lives in state["ta"][sym]."""
+    tfs = CONFIG["intraday_timeframes"]
+    out = {c: math.nan for c in TA_PANEL_COLS}
+    if not tfs or idf is None or idf.empty:
+        return out
+    vals = update_timeframes(state["ta"].setdefault(sym, {}), idf, to_ms(session_open_et), tfs)
+    for m, v in vals.items():
+        out.update({f"rsi_{m}m": v["rsi"], f"macdh_{m}m": v["macdh"], f"ema20_{m}m": v["ema"]})
+    return out
+
+def ta_overlay(ta: dict) -> dict:
+    """Panel values → rounded overlay cells (RSI14_5m, MACDh_5m, EMA20_5m, ...)."""
+    out = {}
+    for m in CONFIG["intraday_timeframes"]:
+        for k, (col, nd) in TA_COLS.items():
+            v = ta[f"{k}_{m}m"]
+            out[f"{col}_{m}m"] = None if v != v else round(float(v), nd)
+    return out
 
 # ---------- Tradier pulls ----------
 def market_open_now() -> bool | None:
@@ -191,36 +265,22 @@ def market_open_now() -> bool | None:
         return None  # fail soft
     return data["clock"].get("state") == "open"
 
-def get_daily_history(symbol: str, start: str, end: str) -> pd.DataFrame:
-    data = get_json(f"{BASE}/markets/history",
-                    params={"symbol": symbol, "interval": "daily", "start": start, "end": end})
-    rows = (data or {}).get("history", {}).get("day", [])
-    df = pd.DataFrame(rows)
-    if df.empty:
-        return df
-    df["date"] = pd.to_datetime(df["date"])
-    for c in ["open", "high", "low", "close", "volume"]:
-        df[c] = pd.to_numeric(df[c], errors="coerce")
-    return df.sort_values("date")
+def get_daily_history(symbol: str, start: str, end: str) -> Bars:
+    """Daily bars; t is midnight UTC of each trading date."""
+    return get_bars(f"{BASE}/markets/history",
+                    {"symbol": symbol, "interval": "daily", "start": start, "end": end})
 
 def get_intraday_timesales(symbol: str, start_dt_et: dt.datetime, end_dt_et: dt.datetime,
-                           interval="5min", session="open") -> pd.DataFrame:
+                           interval="5min", session="open") -> Bars:
+    """Session bars; t is the bar's epoch ms. Open isn't used intraday, so it isn't decoded."""
     fmt = "%Y-%m-%d %H:%M"
-    data = get_json(f"{BASE}/markets/timesales", params={
+    return get_bars(f"{BASE}/markets/timesales", {
         "symbol": symbol,
         "interval": interval,
         "start": start_dt_et.strftime(fmt),
         "end": end_dt_et.strftime(fmt),
         "session_filter": session
-    })
-    rows = (data or {}).get("series", {}).get("data", [])
-    df = pd.DataFrame(rows)
-    if df.empty:
-        return df
-    df["time"] = pd.to_datetime(df["time"])
-    for c in ["open", "high", "low", "close", "volume"]:
-        df[c] = pd.to_numeric(df[c], errors="coerce")
-    return df.sort_values("time")
+    }, fields=("high", "low", "close", "volume"))
 
 def batch_equity_quotes(symbols: List[str]) -> dict:
     data = get_json(f"{BASE}/markets/quotes", params={"symbols": ",".join(symbols)})
@@ -229,40 +289,63 @@ def batch_equity_quotes(symbols: List[str]) -> dict:
         q = [q]
     return {row.get("symbol"): row for row in q if isinstance(row, dict)}
 
-def options_quotes_occ(occs: List[str]) -> dict:
-    good = [o for o in occs if validate_osi(o)]
-    bad = [o for o in occs if not validate_osi(o)]
-    for b in bad:
-        print(f"[warn] OCC symbol failed OSI check: {b}")
-
-    # Batch first
-    params = {"symbols": ",".join(good), "greeks": "true"} if good else {"symbols": "", "greeks": "true"}
-    data = get_json(f"{BASE}/markets/quotes", params=params)
-    out = {}
-    if data:
-        rows = data.get("quotes", {}).get("quote", [])
-        if isinstance(rows, dict): rows = [rows]
-        for r in rows:
-            if isinstance(r, dict) and r.get("symbol"):
-                out[r["symbol"]] = r
-
-    # Per-symbol salvage
-    for occ in good:
-        if occ in out:
-            continue
-        d = get_json(f"{BASE}/markets/quotes", params={"symbols": occ, "greeks": "true"})
-        if not d:
-            continue
-        rows = d.get("quotes", {}).get("quote", [])
-        if isinstance(rows, dict): rows = [rows]
-        for r in rows:
-            if r.get("symbol") == occ:
-                out[occ] = r
-                break
-    return out
+# ---------- Run state ----------
+def new_run_state() -> dict:
+    """In-memory cache reused across refreshes (--serve); a fresh one per one-shot run."""
+    return {"day": None, "daily": {}, "intraday": {}, "vwap": {}, "ta": {}}
+
+def daily_bars(sym: str, start_hist: str, end_hist: str, state: dict, quote: dict | None) -> Bars:
+    """Full history once per day; later refreshes only rebuild today's bar from the batched quote."""
+    ddf = state["daily"].get(sym)
+    if ddf is None:
+        ddf = get_daily_history(sym, start_hist, end_hist)
+    elif not ddf.empty and quote and quote.get("open") is not None and quote.get("last") is not None:
+        num = lambda k: math.nan if quote.get(k) is None else float(quote[k])
+        today = int(to_ms(dt.datetime.strptime(end_hist, "%Y-%m-%d").replace(tzinfo=dt.timezone.utc)))
+        ddf = ddf.upsert(today, num("open"), num("high"), num("low"), num("last"), num("volume"))
+    state["daily"][sym] = ddf
+    return ddf
+
+def correlation_frames(daily: dict[str, Bars], state: dict) -> dict[str, pd.DataFrame]:
+    """
+    Roll the correlation tracker forward with any new days (O(N²) per day). It lives in
+    state["corr"] across refreshes and day changes, and on disk between one-shot runs.
+    """
+    rc = state.get("corr")
+    if rc is None or rc.symbols != list(daily):
+        rc = RollingCorr.load(CONFIG["corr_state"], list(daily))
+    rc.update(daily)
+    try:
+        rc.save(CONFIG["corr_state"])
+    except OSError as e:
+        print(f"[warn] correlation state not saved: {e}")
+    state["corr"] = rc
+    st = rc.stats()
+    return {"correlation": matrix_frame(rc, CONFIG["corr_benchmark"], st),
+            "correlation_top": top_pairs_frame(rc, CONFIG["corr_top_pairs"], st)}
+
+def session_bars(sym: str, session_open_et: dt.datetime, session_end_et: dt.datetime, state: dict) -> Bars:
+    """Session timesales; with cached bars only the tail since the last (possibly partial) bar is pulled."""
+    prev = state["intraday"].get(sym)
+    have_prev = prev is not None and not prev.empty
+    interval = "1min" if CONFIG["intraday_timeframes"] else CONFIG["intraday_interval"]
+    start = (dt.datetime.fromtimestamp(prev.t[-1] / 1000.0, session_open_et.tzinfo) if have_prev
+             else session_open_et)
+    idf = get_intraday_timesales(sym, start, session_end_et,
+                                 interval=interval, session="open")
+    if idf.empty and not have_prev:
+        alt_start = session_open_et - dt.timedelta(minutes=5)
+        idf = get_intraday_timesales(sym, alt_start, session_end_et,
+                                     interval=interval, session="all")
+    if have_prev:
+        idf = prev.merge(idf)
+    state["intraday"][sym] = idf
+    return idf
 
 # ---------- Main ----------
-def main():
+def compute_outputs(state: dict | None = None) -> dict[str, pd.DataFrame]:
+    """One full pass (quotes → indicators → VWAP → guidance → option P/L); returns overlay/option_pl/gap frames."""
+    state = state if state is not None else new_run_state()
     # Time anchors
     now_utc = dt.datetime.now(dt.timezone.utc)
     et = ZoneInfo("America/New_York")
@@ -279,29 +362,30 @@ def main():
     # Market clock (None = unknown)
     is_open = market_open_now()
 
+    # New trading day → drop cached bars
+    if state["day"] != end_hist:
+        state.update(new_run_state(), day=end_hist)
+
     # Equity quotes
     quotes = batch_equity_quotes(CONFIG["tickers"])
 
     # Daily frames (for indicators)
-    daily_frames: dict[str, pd.DataFrame] = {}
+    daily_frames: dict[str, Bars] = {}
     for sym in CONFIG["tickers"]:
-        df = get_daily_history(sym, start_hist, end_hist)
-        daily_frames[sym] = df
+        daily_frames[sym] = daily_bars(sym, start_hist, end_hist, state, quotes.get(sym))
 
-    overlay_rows, gap_rows = [], []
+    overlay_rows, gap_rows, panel_rows = [], [], []
 
     for sym, ddf in daily_frames.items():
         if ddf.empty or len(ddf) < 2:
             print(f"[warn] insufficient daily data for {sym}")
             continue
 
-        ddf["SMA100"] = sma(ddf["close"], 100)
-        ddf["RSI14"]  = rsi(ddf["close"], 14)
-        macd_line, sig_line, _ = macd(ddf["close"], 12, 26, 9)
-        ddf["MACD"], ddf["MACDsig"] = macd_line, sig_line
-
-        last = ddf.iloc[-1]
-        prev = ddf.iloc[-2]
+        close = pd.Series(ddf.close, copy=False)
+        macd_line, sig_line, _ = macd(close, 12, 26, 9)
+        last = {"open": ddf.open[-1], "close": ddf.close[-1], "SMA100": sma(close, 100).iloc[-1],
+                "RSI14": rsi(close, 14).iloc[-1], "MACD": macd_line.iloc[-1], "MACDsig": sig_line.iloc[-1]}
+        prev = {"close": ddf.close[-2]}
 
         # Gap%
         gap_pct = None
@@ -309,16 +393,23 @@ def main():
             gap_pct = (float(last["open"]) - float(prev["close"])) / float(prev["close"]) * 100.0
 
         # Intraday VWAP (only if open/unknown)
-        vwap = math.nan
+        vwap = vwap_sd = math.nan
         last_px_intraday = math.nan
+        ta = {c: math.nan for c in TA_PANEL_COLS}
         if is_open is None or is_open is True:
-            idf = get_intraday_timesales(sym, session_open_et, session_end_et,
-                                         interval=CONFIG["intraday_interval"], session="open")
-            if idf.empty:
-                alt_start = session_open_et - dt.timedelta(minutes=5)
-                idf = get_intraday_timesales(sym, alt_start, session_end_et,
-                                             interval=CONFIG["intraday_interval"], session="all")
-            vwap, last_px_intraday = session_vwap_from_bars(idf)
+            stream = state.get("stream")
+            live = stream.lookup(sym) if stream else None
+            idf = session_bars(sym, session_open_et, session_end_et, state)
+            ta = intraday_indicators(sym, idf, session_open_et, state)  # bar-based whatever feeds VWAP
+            if live and not live["seeded"] and not idf.empty:
+                if stream.seed(sym, idf.t, bar_prices(idf), idf.volume):
+                    live = stream.lookup(sym)  # bars 09:30 → connect now folded into the streamed VWAP
+            if live and live["seeded"] and live["vwap"] == live["vwap"] and live["last"] is not None:
+                vwap, vwap_sd, last_px_intraday = live["vwap"], live["vwap_sd"], live["last"]  # streamed ticks
+            else:
+                vw = session_vwap(sym, idf, session_open_et, state)
+                vwap, vwap_sd = vw["vwap"], vw["sigma"]
+                last_px_intraday = float(idf.close[-1]) if not idf.empty else math.nan
 
         last_px = (last_px_intraday if last_px_intraday == last_px_intraday
                    else float(quotes.get(sym, {}).get("last") or last["close"]))
@@ -329,17 +420,11 @@ def main():
             except Exception:
                 above_vwap = None
 
+        vwap_z = (last_px - vwap) / vwap_sd if vwap_sd and vwap_sd == vwap_sd and last_px == last_px else math.nan
+
         macd_pos = bool(last["MACD"] > last["MACDsig"])
         rsi_val  = float(last["RSI14"]) if pd.notna(last["RSI14"]) else None
 
-        # Heuristic guidance
-        if (above_vwap is False) and (not macd_pos) and (rsi_val is not None and rsi_val < 45):
-            guidance = "EXIT"
-        elif (above_vwap is False) or (rsi_val is not None and rsi_val > 70 and not macd_pos):
-            guidance = "TRIM"
-        else:
-            guidance = "HOLD"
-
         overlay_rows.append({
             "Ticker": sym,
             "RSI14": round(rsi_val, 2) if rsi_val is not None else None,
@@ -349,54 +434,53 @@ def main():
             "Px_vs_VWAP": ("Above" if above_vwap else ("Below" if above_vwap is False else "Unknown")),
             "SMA100": round(float(last["SMA100"]), 4) if pd.notna(last["SMA100"]) else None,
             "Gap%": round(gap_pct, 2) if gap_pct is not None else None,
-            "Guidance": guidance,
-            "MarketOpen": is_open if is_open is not None else "unknown"
+            "Guidance": None,
+            "MarketOpen": is_open if is_open is not None else "unknown",
+            "VWAP_SD": None if vwap_sd != vwap_sd else round(float(vwap_sd), 4),
+            "VWAP_Z": None if vwap_z != vwap_z else round(float(vwap_z), 2),
+            **ta_overlay(ta),
         })
-
-        # Gap screen row
-        if (gap_pct is not None and gap_pct <= -1.0) and (float(last["close"]) > float(last["SMA100"])):
+        # Unrounded inputs for the rule engine (one row per overlay row)
+        panel_rows.append({"px": last_px, "vwap": vwap, "vwap_sd": vwap_sd, "vwap_z": vwap_z, "rsi": rsi_val, "macd": last["MACD"],
+                           "signal": last["MACDsig"], "close": last["close"], "open": last["open"],
+                           "sma100": last["SMA100"], "gap": gap_pct, **ta})
+
+    # Guidance + screens: all rules evaluated in one vectorized pass over the panel
+    panel = panel_from_rows(panel_rows, PANEL_COLS + TA_PANEL_COLS)
+    screens = rules().evaluate(panel) if panel_rows else {}
+    if "Guidance" in screens:
+        for row, label, rule in zip(overlay_rows, screens["Guidance"]["label"], screens["Guidance"]["rule"]):
+            row["Guidance"], row["GuidanceRule"] = label, rule
+    if "gap_down_above_sma100" in screens:
+        hits = [i for i, label in enumerate(screens["gap_down_above_sma100"]["label"]) if label is not None]
+        for i in hits:
             gap_rows.append({
-                "Ticker": sym,
-                "Gap%": round(gap_pct, 2),
-                "Close": float(last["close"]),
-                "SMA100": float(last["SMA100"])
+                "Ticker": overlay_rows[i]["Ticker"],
+                "Gap%": round(float(panel["gap"][i]), 2),
+                "Close": float(panel["close"][i]),
+                "SMA100": float(panel["sma100"][i])
             })
 
-    # Options P/L via OCC symbols
-    occs = [o["occ"] for o in CONFIG["open_options"]]
-    occ_quotes = options_quotes_occ(occs)
-
-    pl_rows = []
-    for o in CONFIG["open_options"]:
-        if not validate_osi(o["occ"]):
-            print(f"[warn] skipping invalid OCC: {o['occ']}")
-            continue
-        q = occ_quotes.get(o["occ"], {})
-        if not q:
-            print(f"[warn] missing quote for {o['occ']}; skipping P/L calc")
-            continue
-        mid = mid_from_quote(q)
-        pnl_d = (mid - o["entry"]) * 100 * o["contracts"]
-        pnl_p = (mid / o["entry"] - 1) * 100 if o["entry"] else None
-        g = (q.get("greeks") or {})
-        iv = g.get("mid_iv") or g.get("ask_iv") or g.get("bid_iv") or g.get("smv_vol")
-
-        pl_rows.append({
-            "Contract": o["label"],
-            "OCC": o["occ"],
-            "Bid": q.get("bid"),
-            "Ask": q.get("ask"),
-            "Last": q.get("last"),
-            "MidUsed": round(mid, 2) if mid == mid else None,
-            "Entry": o["entry"],
-            "Contracts": o["contracts"],
-            "P/L($)": round(pnl_d, 2) if pnl_p is not None else None,
-            "P/L(%)": round(pnl_p, 2) if pnl_p is not None else None,
-            "IV": iv
-        })
-
-    # ---------- Save outputs (atomic, empty-safe) ----------
-    overlay_cols = ["Ticker","RSI14","MACD>Signal","VWAP","LastPx","Px_vs_VWAP","SMA100","Gap%","Guidance","MarketOpen"]
+    # Options P/L from the account book (tools/positions.py): positions synced incrementally,
+    # quotes re-resolved only for added/changed contracts, plus stale ones without a fresh streamed mark
+    book = state.setdefault("book", PositionBook())
+    sync = book.sync(token=TOKEN)
+    if sync["added"] or sync["changed"] or sync["removed"]:
+        print(f"[positions] +{len(sync['added'])} ~{len(sync['changed'])} -{len(sync['removed'])} "
+              f"across {sync['accounts']} account(s)")
+    stream = state.get("stream")
+    marks = {}
+    if stream:
+        fresh_ms = (time.time() - QUOTE_TTL) * 1000
+        for c in book.contracts():
+            live = stream.lookup(c["occ"])
+            if live and live["mark"] and live["updated_ms"] >= fresh_ms:
+                marks[c["occ"]] = live["mark"]
+    book.resolve(QUOTE_TTL, fetch=lambda syms: fetch_quotes(syms, base=BASE, token=TOKEN), fresh=marks)
+    pl_rows = book.pl_rows(marks)
+
+    # ---------- Assemble outputs (empty-safe) ----------
+    overlay_cols = ["Ticker","RSI14","MACD>Signal","VWAP","LastPx","Px_vs_VWAP","SMA100","Gap%","Guidance","MarketOpen","GuidanceRule","VWAP_SD","VWAP_Z"] + TA_OVERLAY_COLS
     pl_cols      = ["Contract","OCC","Bid","Ask","Last","MidUsed","Entry","Contracts","P/L($)","P/L(%)","IV"]
     gap_cols     = ["Ticker","Gap%","Close","SMA100"]
 
@@ -406,14 +490,12 @@ def main():
     else:
         df_overlay = df_overlay[[c for c in overlay_cols if c in df_overlay.columns]]
         df_overlay = df_overlay.sort_values("Ticker", na_position="last")
-    safe_to_csv(df_overlay, CONFIG["out_overlay_csv"])
 
     df_pl = pd.DataFrame(pl_rows)
     if df_pl.empty:
         df_pl = pd.DataFrame(columns=pl_cols)
     else:
         df_pl = df_pl[[c for c in pl_cols if c in df_pl.columns]]
-    safe_to_csv(df_pl, CONFIG["out_pl_csv"])
 
     df_gap = pd.DataFrame(gap_rows)
     if df_gap.empty:
@@ -423,7 +505,19 @@ def main():
             df_gap["Gap%"] = pd.to_numeric(df_gap["Gap%"], errors="coerce")
             df_gap = df_gap.sort_values("Gap%", na_position="last")
         df_gap = df_gap[[c for c in gap_cols if c in df_gap.columns]]
+
+    return {"overlay": df_overlay, "option_pl": df_pl, "gap": df_gap, **correlation_frames(daily_frames, state)}
+
+def run_once():
+    frames = compute_outputs()
+    df_overlay, df_pl, df_gap = frames["overlay"], frames["option_pl"], frames["gap"]
+
+    # ---------- Save outputs (atomic) ----------
+    safe_to_csv(df_overlay, CONFIG["out_overlay_csv"])
+    safe_to_csv(df_pl, CONFIG["out_pl_csv"])
     safe_to_csv(df_gap, CONFIG["out_gap_csv"])
+    safe_to_csv(frames["correlation"], CONFIG["out_corr_csv"])
+    safe_to_csv(frames["correlation_top"], CONFIG["out_corr_top_csv"])
 
     # Pretty logs
     print("\n=== OVERLAY (VWAP / MACD / RSI) ===")
@@ -438,5 +532,121 @@ def main():
     try: print(df_gap.to_string(index=False))
     except Exception: print("(gap screen not available)")
 
+    print("\n=== MOST CORRELATED PAIRS (rolling daily returns) ===")
+    try: print(frames["correlation_top"].to_string(index=False))
+    except Exception: print("(correlation not available)")
+
+# ---------- Service mode ----------
+class OverlayService:
+    """Refreshes outputs on a schedule into pre-rendered JSON bodies; readers only ever copy bytes."""
+    ROUTES = {"/overlay.json": "overlay", "/option_pl.json": "option_pl",
+              "/gap.json": "gap", "/correlation.json": "correlation",
+              "/correlation_top.json": "correlation_top", "/digest.json": "digest"}
+
+    def __init__(self, refresh_sec: float):
+        self.refresh_sec = refresh_sec
+        self.state = new_run_state()
+        self.payloads: dict[str, tuple[bytes, str]] = {}
+        self.generated_utc: str | None = None
+
+    def refresh(self):
+        frames = compute_outputs(self.state)
+        gen = dt.datetime.now(dt.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        docs = {name: df.to_dict(orient="records") for name, df in frames.items()}
+        docs["digest"] = {
+            "generated_utc": gen, "refresh_sec": self.refresh_sec,
+            "overlay": docs["overlay"], "option_pl": docs["option_pl"], "gap_screen": docs["gap"],
+            "vwap_missing": [r["Ticker"] for r in docs["overlay"] if r.get("Px_vs_VWAP") == "Unknown"],
+            "correlation_top": docs["correlation_top"],
+        }
+        rendered = {}
+        for name, doc in docs.items():
+            body = json.dumps(sanitize_json(doc), separators=(",", ":")).encode("utf-8")
+            rendered[name] = (body, '"' + hashlib.sha256(body).hexdigest()[:32] + '"')
+        self.payloads, self.generated_utc = rendered, gen  # single reference swap; no reader locking
+
+    def refresh_loop(self, stop: threading.Event):
+        while not stop.is_set():
+            t0 = time.monotonic()
+            try:
+                self.refresh()
+                print(f"[serve] refreshed {self.generated_utc} in {time.monotonic() - t0:.1f}s")
+            except Exception as e:
+                print(f"[warn] refresh failed (serving previous data): {e}")
+            stop.wait(max(1.0, self.refresh_sec - (time.monotonic() - t0)))
+
+    def handler(self):
+        svc = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path == "/healthz":
+                    return self._send(200, json.dumps({"generated_utc": svc.generated_utc}).encode("utf-8"))
+                name = svc.ROUTES.get(path)
+                if name is None:
+                    return self._send(404, b'{"error":"not found"}')
+                hit = svc.payloads.get(name)
+                if hit is None:
+                    return self._send(503, b'{"error":"warming up"}')
+                body, etag = hit
+                if self.headers.get("If-None-Match") == etag:
+                    return self._send(304, b"", etag)
+                return self._send(200, body, etag)
+
+            def _send(self, code: int, body: bytes, etag: str | None = None):
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Cache-Control", f"max-age={int(svc.refresh_sec)}")
+                if etag:
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                pass
+
+        return Handler
+
+def serve(host: str, port: int, refresh_sec: float, stream: bool = False):
+    svc = OverlayService(refresh_sec)
+    if stream:
+        from tools.stream_ingest import start_background
+        book = svc.state["book"] = PositionBook()
+        book.sync(token=TOKEN)  # contracts opened later are quoted over REST until the next restart
+        symbols = CONFIG["tickers"] + [c["occ"] for c in book.contracts()]
+        svc.state["stream"] = start_background(symbols, os.getenv("TRADIER_STREAM_BASE", "https://api.tradier.com"), TOKEN)
+    stop = threading.Event()
+    threading.Thread(target=svc.refresh_loop, args=(stop,), daemon=True).start()
+    httpd = ThreadingHTTPServer((host, port), svc.handler())
+    print(f"[serve] http://{host}:{port} {sorted(svc.ROUTES)} refresh={refresh_sec}s")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        httpd.server_close()
+
+def main(argv: List[str] | None = None):
+    ap = argparse.ArgumentParser(prog="leaps produce")
+    ap.add_argument("--serve", action="store_true", help="resident mode: refresh in memory and serve JSON")
+    ap.add_argument("--host", default=os.getenv("SERVICE_HOST", "127.0.0.1"))
+    ap.add_argument("--port", type=int, default=int(os.getenv("SERVICE_PORT", "8787")))
+    ap.add_argument("--refresh", type=float, default=float(os.getenv("SERVICE_REFRESH_SEC", "300")),
+                    help="seconds between refreshes in --serve mode")
+    ap.add_argument("--stream", action="store_true", help="with --serve: ingest trades/quotes from the streaming API")
+    args = ap.parse_args(argv)
+    if not TOKEN:
+        print("ERROR: Set TRADIER_TOKEN environment variable.")
+        return 1
+    if args.serve:
+        serve(args.host, args.port, args.refresh, args.stream)
+    else:
+        run_once()
+    return 0
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local stand-in for Tradier's account + quote endpoints, for exercising tools.positions offline.
+
+Serves:
+  GET      /v1/user/profile                 -> the --accounts synthetic accounts
+  GET      /v1/accounts/{id}/positions      -> that account's book (options + a few equities)
+  GET|POST /v1/markets[/options]/quotes     -> deterministic bid/ask/last (+ greeks) per symbol
+
+Every account starts with --positions option positions drawn from a fixed set of roots,
+monthly expiries and strikes (seeded, so runs are reproducible). With --churn F, each
+positions request after an account's first changes the quantity of ~F of its positions,
+opens one and closes one, so incremental syncs have something to find. --latency-ms delays
+the positions response, like a slow brokerage backend.
+
+Usage:
+  python -m tools.accounts_standin --accounts 3 --positions 500 [--churn 0.02] [--port 8792]
+  TRADIER_BASE=http://127.0.0.1:8792/v1 TRADIER_TOKEN=x python -m tools.positions
+"""
+
+from __future__ import annotations
+import argparse, datetime as dt, hashlib, json, random, sys, threading, time
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+
+MULT = 100
+ROOTS = {"META": 700.0, "MSFT": 510.0, "NVDA": 180.0, "AMD": 250.0, "PLTR": 180.0, "MSTU": 6.0,
+         "MSTR": 300.0, "QQQ": 600.0, "RKLB": 60.0, "ASTS": 75.0}
+
+def _expiries(n: int = 12) -> List[dt.date]:
+    """Third Fridays of the next n months."""
+    out, d = [], dt.date.today().replace(day=1)
+    for _ in range(n):
+        first_fri = d + dt.timedelta(days=(4 - d.weekday()) % 7)
+        out.append(first_fri + dt.timedelta(days=14))
+        d = (d + dt.timedelta(days=32)).replace(day=1)
+    return out
+
+def _occ(root: str, expiry: dt.date, right: str, strike: float) -> str:
+    return f"{root}{expiry:%y%m%d}{right}{int(round(strike * 1000)):08d}"
+
+def _u(sym: str, salt: str = "") -> float:
+    """Stable uniform [0, 1) per symbol."""
+    return int(hashlib.sha256((salt + sym).encode()).hexdigest()[:8], 16) / 2 ** 32
+
+def quote_for(sym: str) -> Dict:
+    if sym in ROOTS or len(sym) < 16:
+        px = round(ROOTS.get(sym, 20 + 200 * _u(sym)) * (0.97 + 0.06 * _u(sym, "px")), 2)
+        return {"symbol": sym, "type": "stock", "last": px, "bid": round(px - 0.01, 2), "ask": round(px + 0.01, 2)}
+    mid = round(0.5 + 40 * _u(sym), 2)
+    spread = max(0.01, round(mid * 0.02, 2))
+    iv = round(0.3 + 0.6 * _u(sym, "iv"), 4)
+    return {"symbol": sym, "type": "option", "bid": round(mid - spread / 2, 2), "ask": round(mid + spread / 2, 2),
+            "last": mid, "greeks": {"delta": round(_u(sym, "d"), 4), "gamma": 0.01, "theta": -0.05, "vega": 0.2,
+                                    "bid_iv": iv - 0.01, "mid_iv": iv, "ask_iv": iv + 0.01, "smv_vol": iv}}
+
+class Accounts:
+    """Synthetic books keyed by account number; mutated per request when churn > 0."""
+
+    def __init__(self, n_accounts: int, n_positions: int, churn: float, seed: int):
+        self.rnd, self.churn, self.lock = random.Random(seed), churn, threading.Lock()
+        self.expiries = _expiries()
+        self.books: Dict[str, Dict[str, dict]] = {}
+        self.served: Dict[str, int] = {}
+        for i in range(n_accounts):
+            acct = f"VA{i + 1:06d}"
+            book: Dict[str, dict] = {}
+            while len(book) < n_positions:
+                self._open(book)
+            for sym in ("QQQ", "NVDA"):
+                book[sym] = {"symbol": sym, "quantity": 10.0, "cost_basis": 10 * ROOTS[sym]}
+            self.books[acct] = book
+
+    def _open(self, book: Dict[str, dict]):
+        root = self.rnd.choice(sorted(ROOTS))
+        spot = ROOTS[root]
+        strike = round(spot * self.rnd.uniform(0.6, 1.5) / (5 if spot > 50 else 0.5)) * (5 if spot > 50 else 0.5)
+        occ = _occ(root, self.rnd.choice(self.expiries), self.rnd.choice("CP"), max(strike, 0.5))
+        qty = float(self.rnd.choice([1, 1, 2, 5, 10, 20, -1, -2]))
+        book[occ] = {"symbol": occ, "quantity": qty,
+                     "cost_basis": round(qty * MULT * quote_for(occ)["last"] * self.rnd.uniform(0.5, 1.5), 2),
+                     "date_acquired": dt.datetime.now(dt.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")}
+
+    def positions(self, acct: str) -> List[dict] | None:
+        with self.lock:
+            book = self.books.get(acct)
+            if book is None:
+                return None
+            n = self.served[acct] = self.served.get(acct, 0) + 1
+            if n > 1 and self.churn > 0:
+                opts = [k for k in book if len(k) > 15]
+                for k in self.rnd.sample(opts, min(len(opts), max(1, int(len(opts) * self.churn)))):
+                    p = book[k]
+                    unit = p["cost_basis"] / p["quantity"]
+                    p["quantity"] += 1.0 if p["quantity"] > 0 else -1.0
+                    p["cost_basis"] = round(unit * p["quantity"], 2)
+                if opts:
+                    book.pop(self.rnd.choice(opts))
+                self._open(book)
+            return [{"id": i + 1, **p} for i, p in enumerate(book.values())]
+
+def make_handler(accts: Accounts, latency_ms: float):
+    from http.server import BaseHTTPRequestHandler  # here, not at import: `--help` stays cheap (leaps startup)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            u = urlparse(self.path)
+            self._route(u.path, {k: v[0] for k, v in parse_qs(u.query).items()})
+
+        def do_POST(self):
+            n = int(self.headers.get("Content-Length") or 0)
+            form = {k: v[0] for k, v in parse_qs(self.rfile.read(n).decode("utf-8")).items()}
+            self._route(urlparse(self.path).path, form)
+
+        def _route(self, path: str, params: Dict[str, str]):
+            if not self.headers.get("Authorization", "").startswith("Bearer "):
+                return self._send(401, {"fault": {"faultstring": "Invalid Access Token"}})
+            parts = path.rstrip("/").split("/")
+            if path.endswith("/user/profile"):
+                acc = [{"account_number": a, "type": "margin", "status": "active"} for a in sorted(accts.books)]
+                return self._send(200, {"profile": {"id": "id-standin", "name": "Stand-in",
+                                                    "account": acc[0] if len(acc) == 1 else acc}})
+            if len(parts) >= 4 and parts[-3] == "accounts" and parts[-1] == "positions":
+                if latency_ms:
+                    time.sleep(latency_ms / 1000.0)
+                rows = accts.positions(parts[-2])
+                if rows is None:
+                    return self._send(400, {"fault": {"faultstring": "Invalid account"}})
+                body = {"positions": "null"} if not rows else \
+                    {"positions": {"position": rows[0] if len(rows) == 1 else rows}}
+                return self._send(200, body)
+            if path.endswith("/quotes"):  # /markets/quotes and /markets/options/quotes
+                q = [quote_for(s) for s in params.get("symbols", "").split(",") if s]
+                return self._send(200, {"quotes": {"quote": q[0] if len(q) == 1 else q}})
+            return self._send(404, {"error": "not found"})
+
+        def _send(self, code: int, doc: dict):
+            body = json.dumps(doc).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="leaps accounts-standin")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8792)
+    ap.add_argument("--accounts", type=int, default=2)
+    ap.add_argument("--positions", type=int, default=50, help="option positions per account")
+    ap.add_argument("--churn", type=float, default=0.0, help="fraction of positions changed per later request")
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args(argv)
+
+    accts = Accounts(args.accounts, args.positions, args.churn, args.seed)
+    from http.server import ThreadingHTTPServer
+    httpd = ThreadingHTTPServer((args.host, args.port), make_handler(accts, args.latency_ms))
+    print(f"[standin] http://{args.host}:{args.port}/v1 accounts={','.join(sorted(accts.books))} "
+          f"positions={args.positions}/account churn={args.churn}")
+    sys.stdout.flush()
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
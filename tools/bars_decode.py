@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Streaming decode of Tradier history / timesales JSON straight into typed arrays.
+
+  {"history": {"day": [{"date": "2025-10-29", "open": .., "high": .., "low": .., "close": .., "volume": ..}, ...]}}
+  {"series":  {"data": [{"time": "..", "timestamp": 1761744600, "price": .., "open": .., ..., "volume": ..}, ...]}}
+
+The body is read in chunks (response.iter_content). Each chunk is cut at its last
+'}' — bars are flat objects, so that boundary always closes a whole bar — and for
+every wanted field one C-level regex scan pulls the values, which are converted
+with np.fromiter into growing preallocated arrays. No per-bar dicts, no DataFrame,
+no per-column to_numeric/to_datetime copies; peak memory is one chunk plus the
+arrays. If a field is missing or null in some bars (counts disagree within a
+chunk), that chunk is decoded object by object instead.
+
+Bars.t is int64 epoch ms: timesales "timestamp" (UTC seconds) when present, else
+"time" read as America/New_York wall clock; history "date" is midnight UTC of that
+day. Bars supports `"close" in bars` / `bars["close"]` / `bars["time"]` so the VWAP
+engine and indicators take it directly; to_frame() builds a DataFrame on demand.
+"""
+
+from __future__ import annotations
+import json, math, re
+import datetime as dt
+from typing import Dict, Iterable, Iterator, Optional, Sequence
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+ET = ZoneInfo("America/New_York")
+OHLCV = ("open", "high", "low", "close", "volume")
+_NUM = rb'(-?[0-9][0-9.eE+-]*|null)'
+_FIELD_RE: Dict[str, "re.Pattern[bytes]"] = {}
+_OBJ_RE = re.compile(rb'\{[^{}]*\}')
+
+def _field_re(name: str) -> "re.Pattern[bytes]":
+    pat = _FIELD_RE.get(name)
+    if pat is None:
+        val = rb'"([^"]*)"' if name in ("date", "time") else _NUM
+        pat = _FIELD_RE[name] = re.compile(rb'"' + name.encode() + rb'"\s*:\s*' + val)
+    return pat
+
+def _floats(vals: list, dtype) -> np.ndarray:
+    if b"null" in vals:
+        return np.fromiter((math.nan if v == b"null" else float(v) for v in vals), dtype, count=len(vals))
+    return np.fromiter(map(float, vals), dtype, count=len(vals))
+
+def _ms_from_text(vals: Sequence, kind: str) -> np.ndarray:
+    if kind == "date":  # "YYYY-MM-DD" → midnight UTC
+        return np.array([v.decode() if isinstance(v, bytes) else v for v in vals],
+                        dtype="datetime64[D]").astype("datetime64[ms]").astype(np.int64)
+    wall = np.array([v.decode() if isinstance(v, bytes) else v for v in vals], dtype="datetime64[s]")
+    if not len(wall):
+        return wall.astype(np.int64)
+    first = wall[0].astype(dt.datetime)  # one ET offset per response (a session never spans a DST switch)
+    off = int(first.replace(tzinfo=ET).utcoffset().total_seconds())
+    return (wall.astype(np.int64) - off) * 1000
+
+class Bars:
+    """Compact OHLCV bars: t (int64 epoch ms) + float arrays, sorted by t."""
+    __slots__ = ("t", "open", "high", "low", "close", "volume")
+
+    def __init__(self, t, open, high, low, close, volume):
+        self.t = np.asarray(t, dtype=np.int64)
+        self.open, self.high, self.low, self.close, self.volume = (np.asarray(a) for a in (open, high, low, close, volume))
+
+    @classmethod
+    def blank(cls, dtype=np.float64) -> "Bars":
+        z = np.empty(0, dtype)
+        return cls(np.empty(0, np.int64), z, z, z, z, z)
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, c).nbytes for c in self.__slots__)
+
+    @property
+    def empty(self) -> bool:  # same spelling as DataFrame.empty, so callers test either alike
+        return len(self.t) == 0
+
+    def __contains__(self, col: str) -> bool:
+        return col == "time" or col in OHLCV
+
+    def __getitem__(self, col: str) -> np.ndarray:
+        return self.t if col == "time" else getattr(self, col)
+
+    def _take(self, idx) -> "Bars":
+        return Bars(*(getattr(self, c)[idx] for c in self.__slots__))
+
+    def since(self, t_ms: int) -> "Bars":
+        return self._take(slice(int(np.searchsorted(self.t, t_ms, side="left")), None))
+
+    def until(self, t_ms: int) -> "Bars":
+        """Bars stamped at or before t_ms (the counterpart of since)."""
+        return self._take(slice(None, int(np.searchsorted(self.t, t_ms, side="right"))))
+
+    def merge(self, newer: "Bars") -> "Bars":
+        """
+        Tail refresh: self's bars before newer's first time, then newer (which covers
+        its range and wins on any shared time, e.g. a re-fetched partial bar).
+        """
+        if not len(self):
+            return newer
+        if not len(newer):
+            return self
+        i = int(np.searchsorted(self.t, newer.t[0], side="left"))
+        return Bars(*(np.concatenate([getattr(self, c)[:i], getattr(newer, c)]) for c in self.__slots__))
+
+    def normalized(self) -> "Bars":
+        """Sorted by t with one bar per time (the later row wins)."""
+        if len(self.t) < 2 or np.all(np.diff(self.t) > 0):
+            return self
+        b = self._take(np.argsort(self.t, kind="stable"))
+        return b._take(np.r_[b.t[1:] != b.t[:-1], True])
+
+    def upsert(self, t_ms: int, o: float, h: float, l: float, c: float, v: float) -> "Bars":
+        """Replace (or append) the last bar at t_ms — e.g. today's daily bar rebuilt from a quote."""
+        row = Bars([t_ms], [o], [h], [l], [c], [v])
+        return self.merge(row)
+
+    def to_frame(self):
+        import pandas as pd
+        return pd.DataFrame({"time": pd.to_datetime(self.t, unit="ms", utc=True),
+                             **{c: getattr(self, c) for c in OHLCV}})
+
+class _Grow:
+    """Append-only typed array with amortized doubling."""
+    __slots__ = ("a", "n")
+
+    def __init__(self, dtype, cap: int):
+        self.a, self.n = np.empty(max(cap, 16), dtype), 0
+
+    def extend(self, vals: np.ndarray):
+        need = self.n + len(vals)
+        if need > len(self.a):
+            b = np.empty(max(need, 2 * len(self.a)), self.a.dtype)
+            b[:self.n] = self.a[:self.n]
+            self.a = b
+        self.a[self.n:need] = vals
+        self.n = need
+
+    def view(self) -> np.ndarray:
+        """Filled part; copied out when the presized buffer overshot, so the slack is freed."""
+        return self.a[:self.n] if 4 * self.n >= 3 * len(self.a) else self.a[:self.n].copy()
+
+def decode_bars(chunks: Iterable[bytes], fields: Sequence[str] = OHLCV, dtype=np.float64,
+                size_hint: int = 0) -> Bars:
+    """
+    Decode a history/timesales body from byte chunks into Bars. Only `fields` are
+    parsed (others stay NaN); size_hint (e.g. Content-Length) presizes the arrays.
+    """
+    cap = size_hint // 120 if size_hint else 1024  # ~120-200 bytes per bar on the wire
+    cols = {f: _Grow(dtype, cap) for f in fields}
+    tcol = _Grow(np.int64, cap)
+    tkey: Optional[str] = None
+    buf = b""
+    for chunk in _with_tail(chunks):
+        if chunk is None:  # end of stream: flush whatever is complete
+            part, buf = buf, b""
+        else:
+            buf += chunk
+            cut = buf.rfind(b"}")
+            if cut < 0:
+                continue
+            part, buf = buf[:cut + 1], buf[cut + 1:]
+        if not part:
+            continue
+        if tkey is None:
+            tkey = next((k for k in ("timestamp", "date", "time") if b'"' + k.encode() + b'"' in part), None)
+            if tkey is None:
+                continue
+        tvals = _field_re(tkey).findall(part)
+        if not tvals:
+            continue
+        vals = {f: _field_re(f).findall(part) for f in fields}
+        if all(len(v) == len(tvals) for v in vals.values()):
+            t = (np.fromiter(map(int, tvals), np.int64, count=len(tvals)) * 1000 if tkey == "timestamp"
+                 else _ms_from_text(tvals, tkey))
+            tcol.extend(t)
+            for f, v in vals.items():
+                cols[f].extend(_floats(v, dtype))
+        else:
+            _decode_objects(part, tkey, fields, tcol, cols, dtype)
+
+    t = tcol.view()
+    n = len(t)
+    nan = lambda: np.full(n, np.nan, dtype)
+    arrays = {f: (cols[f].view() if f in cols else nan()) for f in OHLCV}
+    return Bars(t, arrays["open"], arrays["high"], arrays["low"], arrays["close"], arrays["volume"]).normalized()
+
+def _with_tail(chunks: Iterable[bytes]) -> Iterator[Optional[bytes]]:
+    for c in chunks:
+        if c:
+            yield c
+    yield None
+
+def _decode_objects(part: bytes, tkey: str, fields: Sequence[str], tcol: _Grow, cols: Dict[str, _Grow], dtype):
+    """Slow path for ragged chunks: one small json.loads per bar object."""
+    ts, rows = [], {f: [] for f in fields}
+    for m in _OBJ_RE.finditer(part):
+        try:
+            obj = json.loads(m.group(0))
+        except ValueError:
+            continue
+        if obj.get(tkey) is None:
+            continue
+        ts.append(obj[tkey])
+        for f in fields:
+            v = obj.get(f)
+            rows[f].append(math.nan if v is None else float(v))
+    if not ts:
+        return
+    tcol.extend(np.asarray(ts, dtype=np.int64) * 1000 if tkey == "timestamp" else _ms_from_text(ts, tkey))
+    for f in fields:
+        cols[f].extend(np.asarray(rows[f], dtype=dtype))
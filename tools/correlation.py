@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rolling return correlation and beta for the whole watchlist, updated incrementally.
+
+- Daily closes (the producer's cached Bars) are aligned on the union of dates; a
+  symbol's return on a day is log(close / previous close), missing when either is.
+- Four N×N rolling sums over the last WINDOW returns, pairwise-complete
+  (r = 0 where missing, m = 1 where present):
+      n[i,j] = Σ m_i m_j   sx[i,j] = Σ r_i m_j   sxx[i,j] = Σ r_i² m_j   sxy[i,j] = Σ r_i r_j
+  New days are added and the days they push out of the window subtracted as one
+  rank-k matmul each, so a daily update costs O(N²) instead of O(N²·WINDOW).
+  Sums are rebuilt from the ring every WINDOW commits so add/subtract drift can't build up.
+- The newest day stays provisional (today's bar is rebuilt from quotes all session):
+  it is folded in when reading, not committed, so refreshes never double count.
+- corr[i,j] and beta[i,j] (i regressed on j) come from the same sums; beta to the
+  benchmark is the benchmark's column.
+- State persists as <CACHE_DIR>/correlation_state.npz; a changed universe or window
+  rebuilds from the bars on hand.
+
+Outputs (producer): correlation.csv (Ticker, Obs, Beta_<bench>, Corr_<bench>, then
+the correlation matrix) and correlation_top.csv (most correlated pairs).
+"""
+
+from __future__ import annotations
+import io, os
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+WINDOW = int(os.environ.get("CORR_WINDOW", "60"))
+MIN_OBS = 20          # pairs with fewer overlapping returns report NaN
+STATE_FILE = "correlation_state.npz"
+
+class RollingCorr:
+    __slots__ = ("symbols", "window", "ring", "ring_m", "head", "count", "n", "sx", "sxx", "sxy",
+                 "last_t", "last_close", "since_rebase", "prov", "prov_t")
+
+    def __init__(self, symbols: Sequence[str], window: int = WINDOW):
+        k = len(symbols)
+        self.symbols, self.window = list(symbols), int(window)
+        self.ring = np.zeros((self.window, k))            # committed returns, 0 where missing
+        self.ring_m = np.zeros((self.window, k))          # 1.0 where present
+        self.head = self.count = self.since_rebase = 0    # head = next ring row to overwrite
+        self.n, self.sx, self.sxx, self.sxy = (np.zeros((k, k)) for _ in range(4))
+        self.last_t: Optional[int] = None                 # last committed day (epoch ms)
+        self.last_close = np.full(k, np.nan)              # closes on last_t (base of the next return)
+        self.prov, self.prov_t = None, None               # provisional (r, m) for the newest day
+
+    # ---------- updates ----------
+    def update(self, bars: Dict[str, "object"]):
+        """
+        Fold in every day newer than the last committed one from {symbol: Bars};
+        all but the newest are committed, the newest is kept provisional.
+        """
+        closes, days = self._aligned(bars)
+        if not len(days):
+            return
+        prev = self.last_close
+        rets = np.empty_like(closes)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for d in range(len(days)):
+                rets[d] = np.log(closes[d] / prev)
+                prev = closes[d]
+        m = np.isfinite(rets)
+        r = np.where(m, rets, 0.0)
+        m = m.astype(np.float64)
+        if len(days) > 1:
+            self._commit(r[:-1], m[:-1])
+            self.last_t, self.last_close = int(days[-2]), closes[-2]
+        self.prov, self.prov_t = (r[-1], m[-1]), int(days[-1])
+
+    def _aligned(self, bars: Dict[str, "object"]):
+        """Closes for days after last_t: (days × symbols) matrix, NaN where a symbol has no bar."""
+        after = -1 if self.last_t is None else self.last_t
+        cols = []
+        for s in self.symbols:
+            b = bars.get(s)
+            if b is None or not len(b):
+                cols.append((np.empty(0, np.int64), np.empty(0)))
+                continue
+            i = int(np.searchsorted(b.t, after, side="right"))
+            cols.append((b.t[i:], b.close[i:]))
+        ts = [t for t, _ in cols if len(t)]
+        days = np.unique(np.concatenate(ts)) if ts else np.empty(0, np.int64)
+        closes = np.full((len(days), len(self.symbols)), np.nan)
+        for j, (t, c) in enumerate(cols):
+            if len(t):
+                closes[np.searchsorted(days, t), j] = c
+        return closes, days
+
+    def _commit(self, r: np.ndarray, m: np.ndarray):
+        k = len(r)
+        if k >= self.window:
+            self.ring[:], self.ring_m[:] = r[-self.window:], m[-self.window:]
+            self.head, self.count = 0, self.window
+            self._rebase()
+            return
+        rows = (self.head + np.arange(k)) % self.window
+        old_r, old_m = self.ring[rows], self.ring_m[rows]   # zeros while the ring is filling
+        self._add(r, m, 1.0)
+        self._add(old_r, old_m, -1.0)
+        self.ring[rows], self.ring_m[rows] = r, m
+        self.head = int((self.head + k) % self.window)
+        self.count = min(self.window, self.count + k)
+        self.since_rebase += k
+        if self.since_rebase >= self.window:
+            self._rebase()
+
+    def _add(self, r: np.ndarray, m: np.ndarray, sign: float):
+        self.n += sign * (m.T @ m)
+        self.sx += sign * (r.T @ m)
+        self.sxx += sign * ((r * r).T @ m)
+        self.sxy += sign * (r.T @ r)
+
+    def _rebase(self):
+        r, m = self.ring, self.ring_m
+        self.n, self.sx, self.sxx, self.sxy = m.T @ m, r.T @ m, (r * r).T @ m, r.T @ r
+        self.since_rebase = 0
+
+    # ---------- results ----------
+    def _sums(self):
+        """Committed sums with the provisional day folded in (and the day it would evict taken out)."""
+        n, sx, sxx, sxy = self.n, self.sx, self.sxx, self.sxy
+        if self.prov is None:
+            return n, sx, sxx, sxy
+        r, m = self.prov
+        n, sx, sxx, sxy = n + np.outer(m, m), sx + np.outer(r, m), sxx + np.outer(r * r, m), sxy + np.outer(r, r)
+        if self.count == self.window:
+            orr, om = self.ring[self.head], self.ring_m[self.head]
+            n -= np.outer(om, om)
+            sx -= np.outer(orr, om)
+            sxx -= np.outer(orr * orr, om)
+            sxy -= np.outer(orr, orr)
+        return n, sx, sxx, sxy
+
+    def stats(self, min_obs: int = MIN_OBS) -> Dict[str, np.ndarray]:
+        """{"corr", "beta", "obs"} N×N; beta[i, j] = cov(i, j) / var(j) over their common days."""
+        n, sx, sxx, sxy = self._sums()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            nn = np.where(n >= max(min_obs, 2), n, np.nan)
+            mx = sx / nn
+            cov = sxy / nn - mx * mx.T
+            var = np.maximum(sxx / nn - mx * mx, 0.0)   # var[i, j]: variance of i over days shared with j
+            corr = np.clip(cov / np.sqrt(var * var.T), -1.0, 1.0)
+            beta = cov / var.T
+        np.fill_diagonal(corr, np.where(np.isfinite(np.diag(corr)), 1.0, np.nan))
+        return {"corr": corr, "beta": beta, "obs": np.rint(n).astype(np.int64)}
+
+    # ---------- persistence ----------
+    def save(self, path: str):
+        from tools.snapshot_manifest import atomic_write_bytes
+        buf = io.BytesIO()
+        np.savez(buf, symbols=np.array(self.symbols), window=self.window, ring=self.ring, ring_m=self.ring_m,
+                 head=self.head, count=self.count, since_rebase=self.since_rebase,
+                 n=self.n, sx=self.sx, sxx=self.sxx, sxy=self.sxy,
+                 last_t=-1 if self.last_t is None else self.last_t, last_close=self.last_close)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        atomic_write_bytes(path, buf.getvalue())
+
+    @classmethod
+    def load(cls, path: str, symbols: Sequence[str], window: int = WINDOW) -> "RollingCorr":
+        """Saved state when it matches this universe and window, else a fresh tracker."""
+        rc = cls(symbols, window)
+        try:
+            with np.load(path) as z:
+                if list(z["symbols"]) != list(symbols) or int(z["window"]) != rc.window:
+                    return rc
+                rc.ring, rc.ring_m, rc.n, rc.sx, rc.sxx, rc.sxy, rc.last_close = (
+                    z[k] for k in ("ring", "ring_m", "n", "sx", "sxx", "sxy", "last_close"))
+                rc.head, rc.count, rc.since_rebase = int(z["head"]), int(z["count"]), int(z["since_rebase"])
+                rc.last_t = None if int(z["last_t"]) < 0 else int(z["last_t"])
+        except (OSError, KeyError, ValueError):
+            return cls(symbols, window)
+        return rc
+
+# ---------- tables ----------
+def matrix_frame(rc: RollingCorr, benchmark: str = "QQQ", stats: Optional[dict] = None):
+    """Ticker, Obs (vs benchmark), Beta_/Corr_<benchmark>, then one correlation column per ticker."""
+    import pandas as pd
+    st = stats or rc.stats()
+    syms = rc.symbols
+    b = syms.index(benchmark) if benchmark in syms else None
+    nan = np.full(len(syms), np.nan)
+    df = pd.DataFrame({
+        "Ticker": syms,
+        "Obs": st["obs"][:, b] if b is not None else np.diag(st["obs"]),
+        f"Beta_{benchmark}": np.round(st["beta"][:, b], 3) if b is not None else nan,
+        f"Corr_{benchmark}": np.round(st["corr"][:, b], 3) if b is not None else nan,
+    })
+    return pd.concat([df, pd.DataFrame(np.round(st["corr"], 3), columns=syms)], axis=1)
+
+def top_pairs_frame(rc: RollingCorr, k: int = 10, stats: Optional[dict] = None):
+    """The k most correlated distinct pairs: A, B, Corr, Beta (A on B), Obs."""
+    import pandas as pd
+    st = stats or rc.stats()
+    iu, ju = np.triu_indices(len(rc.symbols), 1)
+    c = st["corr"][iu, ju]
+    ok = np.flatnonzero(np.isfinite(c))
+    if len(ok) > k:
+        ok = ok[np.argpartition(-c[ok], k - 1)[:k]]
+    ok = ok[np.argsort(-c[ok], kind="stable")]
+    i, j = iu[ok], ju[ok]
+    return pd.DataFrame({"A": [rc.symbols[x] for x in i], "B": [rc.symbols[x] for x in j],
+                         "Corr": np.round(c[ok], 3), "Beta": np.round(st["beta"][i, j], 3),
+                         "Obs": st["obs"][i, j]}, columns=["A", "B", "Corr", "Beta", "Obs"])
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Streaming digest rendering: JSON, NDJSON and Markdown written row by row.
+
+- Records come from iterators (iter_csv_records reads CSV text lazily with the
+  stdlib csv module), so memory stays flat however many rows the overlay has.
+- Every value passes through clean_value once on its way out: NaN/±Inf (floats,
+  NumPy scalars, pandas' NA spellings, or "inf" text in a numeric column) become
+  null/blank, so the JSON is strict (json.dumps(..., allow_nan=False) would raise on anything that slipped by).
+- DigestWriter fans each record out to all open sinks in the same pass: a JSON
+  document (one record per line inside its array), an optional NDJSON stream
+  ({"section", "record"} per line) and a Markdown table.
+
+Usage (directory digest, as built by the unified workflow):
+  python -m tools.digest_writer data/2025-10-29 [--out analysis_digest.json] [--preview 20]
+"""
+
+from __future__ import annotations
+import argparse, csv, io, json, math, os, sys
+import datetime as dt
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional
+
+_BOOL = {"true": True, "false": False}
+_PLAIN = (str, int, bool, type(None))
+
+def clean_value(v: Any) -> Any:
+    """One value → strict-JSON-safe value (NaN/Inf → None, NumPy scalars → Python)."""
+    t = type(v)
+    if t is float:
+        return v if math.isfinite(v) else None
+    if t in _PLAIN:
+        return v
+    if hasattr(v, "item") and not isinstance(v, (str, bytes)):
+        v = v.item()
+    if isinstance(v, float) and not math.isfinite(v):
+        return None
+    return v
+
+def clean_record(rec: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: clean_value(v) for k, v in rec.items()}
+
+# pandas.read_csv's default na_values: these cells are missing whatever the column holds
+NA_VALUES = frozenset(["", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND",
+                       "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"])
+
+def parse_cell(s: Optional[str], numeric: bool = False) -> Any:
+    """
+    CSV text → None / bool / int / float / str. Missing cells follow pandas' na_values;
+    other text that float() reads as non-finite ("inf", "Infinity", "NAN") is only
+    None in a numeric column and otherwise stays the string it is.
+    """
+    if s is None or s in NA_VALUES:
+        return None
+    try:
+        f = float(s)
+    except ValueError:
+        t = s.strip()
+        return None if not t else _BOOL.get(t.lower(), s)
+    if not math.isfinite(f):
+        return None if numeric else s
+    if f.is_integer() and s.strip().lstrip("+-").isdigit():
+        return int(s)
+    return f
+
+def typed_rows(rows: Iterable[Dict[str, Optional[str]]]) -> Iterator[Dict[str, Any]]:
+    """
+    Typed row dicts; a column counts as numeric once it has held a finite number and
+    no other text, which is when pandas would read its inf spellings as floats.
+    """
+    numeric: Dict[str, bool] = {}
+    for row in rows:
+        out = {}
+        for k, v in row.items():
+            if k is None:
+                continue
+            x = out[k] = parse_cell(v, numeric.get(k, False))
+            if isinstance(x, str):
+                numeric[k] = False
+            elif isinstance(x, (int, float)) and not isinstance(x, bool) and k not in numeric:
+                numeric[k] = True
+        yield out
+
+def iter_csv_records(text: Optional[str]) -> Iterator[Dict[str, Any]]:
+    """Typed row dicts from CSV text, one at a time (empty/None text → nothing)."""
+    if not text:
+        return
+    yield from typed_rows(csv.DictReader(io.StringIO(text)))
+
+def _dumps(v: Any) -> str:
+    return json.dumps(v, ensure_ascii=False, allow_nan=False)
+
+def _md_cell(v: Any) -> str:
+    v = clean_value(v)
+    return "" if v is None else str(v).replace("|", "\\|").replace("\n", " ")
+
+def _md_head(title: str, cols: List[str]) -> str:
+    return f"## {title}\n| " + " | ".join(cols) + " |\n| " + " | ".join(["---"] * len(cols)) + " |\n"
+
+def _md_row(rec: Dict[str, Any], cols: List[str]) -> str:
+    return "| " + " | ".join(_md_cell(rec.get(c)) for c in cols) + " |\n"
+
+class DigestWriter:
+    """
+    Incremental writer for one JSON object (top-level keys in call order) plus
+    optional NDJSON/Markdown sinks. Call field()/section() in document order,
+    then close().
+    """
+
+    def __init__(self, json_out: IO[str], ndjson_out: Optional[IO[str]] = None, md_out: Optional[IO[str]] = None):
+        self.j, self.nd, self.md = json_out, ndjson_out, md_out
+        self.first = True
+        self.j.write("{")
+
+    def _key(self, key: str):
+        self.j.write(("\n  " if self.first else ",\n  ") + _dumps(key) + ": ")
+        self.first = False
+
+    def field(self, key: str, value: Any):
+        """Small scalar/dict/list value, normalized and written at once."""
+        self._key(key)
+        self.j.write(json.dumps(_clean_tree(value), ensure_ascii=False, allow_nan=False, indent=2)
+                     .replace("\n", "\n  "))
+        if self.nd is not None:
+            self.nd.write(_dumps({"section": key, "value": _clean_tree(value)}) + "\n")
+
+    def markdown(self, text: str):
+        if self.md is not None:
+            self.md.write(text)
+
+    def section(self, key: str, records: Iterable[Dict[str, Any]], md_cols: Optional[List[str]] = None,
+                md_title: Optional[str] = None, on_record=None) -> int:
+        """
+        Stream records into a JSON array under `key` (and NDJSON / a Markdown table
+        over md_cols). on_record(rec) sees each cleaned record, e.g. to collect flags.
+        Returns the row count.
+        """
+        self._key(key)
+        self.j.write("[")
+        table = self.md is not None and md_cols is not None
+        nd_prefix = '{"section": ' + _dumps(key) + ', "record": '
+        n = 0
+        for rec in records:
+            rec = clean_record(rec)
+            line = _dumps(rec)  # encoded once, shared by the JSON and NDJSON sinks
+            self.j.write(("\n    " if n == 0 else ",\n    ") + line)
+            if self.nd is not None:
+                self.nd.write(nd_prefix + line + "}\n")
+            if table:
+                if n == 0:
+                    self.md.write(_md_head(md_title or key, md_cols))
+                self.md.write(_md_row(rec, md_cols))
+            if on_record is not None:
+                on_record(rec)
+            n += 1
+        self.j.write("\n  ]" if n else "]")
+        if table:
+            self.md.write("\n" if n else f"## {md_title or key}\n_No data_\n\n")
+        return n
+
+    def close(self):
+        self.j.write("\n}\n")
+
+def _clean_tree(obj: Any) -> Any:
+    if isinstance(obj, dict):
+        return {k: _clean_tree(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_clean_tree(v) for v in obj]
+    return clean_value(obj)
+
+def write_md_table(out: IO[str], records: Iterable[Dict[str, Any]], cols: List[str], title: str) -> int:
+    """Markdown table streamed to `out`; same layout as DigestWriter.section."""
+    n = 0
+    for rec in records:
+        if n == 0:
+            out.write(_md_head(title, cols))
+        out.write(_md_row(rec, cols))
+        n += 1
+    out.write("\n" if n else f"## {title}\n_No data_\n\n")
+    return n
+
+def write_json_file(path: str, doc: Dict[str, Any]):
+    """Small strict-JSON document (NaN/Inf → null), indent=2."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(_clean_tree(doc), f, indent=2, ensure_ascii=False, allow_nan=False)
+        f.write("\n")
+
+# ---------- Directory digest (unified workflow) ----------
+OVERLAY_PREVIEW = ["Ticker", "RSI14", "MACD>Signal", "VWAP", "LastPx", "Px_vs_VWAP", "SMA100", "Gap%", "Guidance"]
+
+def file_meta(path: str, preview_cols: Optional[List[str]] = None, n: int = 20) -> Dict[str, Any]:
+    """{"status", "rows", "columns", "preview"} for one CSV, counted in a single streaming pass."""
+    if not os.path.exists(path):
+        return {"status": "missing"}
+    try:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            rdr = csv.DictReader(f)
+            cols = list(rdr.fieldnames or [])
+            keep = [c for c in (preview_cols or []) if c in cols]
+            rows, preview = 0, []
+            head = typed_rows({c: row.get(c) for c in keep} for row in rdr) if keep else rdr
+            for row in head:
+                if keep and rows < n:
+                    preview.append(row)
+                rows += 1
+        m: Dict[str, Any] = {"status": "ok", "rows": rows, "columns": len(cols)}
+        if keep:
+            m["preview"] = preview
+        return m
+    except (OSError, csv.Error, UnicodeDecodeError) as e:
+        return {"status": "error", "error": str(e)}
+
+def dir_digest(date_dir: str, preview: int = 20) -> Dict[str, Any]:
+    d = date_dir.rstrip("/")
+    return {
+        "date_dir": d,
+        "generated_utc": dt.datetime.now(dt.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "files": {
+            "overlay": file_meta(f"{d}/overlay_vwap_macd_rsi.csv", OVERLAY_PREVIEW, preview),
+            "option_pl": file_meta(f"{d}/option_pl.csv"),
+            "gap": file_meta(f"{d}/gapdown_above_100sma.csv"),
+        },
+    }
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="leaps digest")
+    ap.add_argument("date_dir", help="snapshot directory, e.g. data/2025-10-29")
+    ap.add_argument("--out", default="analysis_digest.json")
+    ap.add_argument("--preview", type=int, default=20, help="overlay rows included as preview")
+    args = ap.parse_args(argv)
+    write_json_file(args.out, dir_digest(args.date_dir, args.preview))
+    print(f"[digest] {args.date_dir} -> {args.out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
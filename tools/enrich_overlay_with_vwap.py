@@ -16,10 +16,10 @@ import argparse, os, sys
 import pandas as pd
 from tools.vwap_utils import compute_today_vwap
 
-def main():
-    ap = argparse.ArgumentParser()
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="leaps enrich-vwap")
     ap.add_argument("--overlay", default="overlay_vwap_macd_rsi.csv")
-    args = ap.parse_args()
+    args = ap.parse_args(argv)
 
     path = args.overlay
     if not os.path.exists(path):
@@ -46,7 +46,7 @@ def main():
             lastpx = None
 
         vwap = compute_today_vwap(ticker)
-        vwap_vals.append(vwap)
+        vwap_vals.append(None if vwap is None else round(vwap, 4))  # round for display only
 
         if vwap is None or lastpx is None:
             px_vs.append("Unknown")
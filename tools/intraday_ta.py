@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Multi-timeframe intraday indicators (RSI14, MACD 12/26/9, EMA20) from one 1-minute fetch.
+
+- The session's 1-minute timesales Bars are resampled to every timeframe
+  (TIMEFRAMES, minutes) by bucketing epoch ms from the session open:
+  open = first, high/low = fmax/fmin, close = last, volume = sum — a few
+  reduceat calls, no extra API requests.
+- Each (symbol, timeframe) keeps a small running state: the two MACD EMAs, the
+  signal EMA, EMA20 and the last RSI_N close-to-close gains/losses. Like
+  tools.vwap_engine.VWAP, the newest bucket stays "open": later refreshes replace it
+  until a newer bucket arrives, and only then is it committed. So a refresh costs
+  the new buckets, not the session.
+- Definitions match the daily indicators in leaps_batched_cached.py: EMAs are
+  ewm(adjust=False) seeded with the first close, the signal line is an EMA of MACD,
+  and RSI uses simple means of the last RSI_N gains/losses.
+"""
+
+from __future__ import annotations
+import math
+from collections import deque
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from tools.bars_decode import Bars
+
+TIMEFRAMES = (1, 5, 15)
+RSI_N, FAST, SLOW, SIGNAL, EMA_N = 14, 12, 26, 9, 20
+_A = {n: 2.0 / (n + 1.0) for n in (FAST, SLOW, SIGNAL, EMA_N)}
+
+def resample(bars: Bars, minutes: int, anchor_ms: int) -> Bars:
+    """Bars → `minutes` buckets aligned to anchor_ms; t is the bucket start."""
+    if bars.empty:
+        return bars
+    width = minutes * 60_000
+    b = (bars.t - anchor_ms) // width
+    starts = np.flatnonzero(np.r_[True, b[1:] != b[:-1]])
+    ends = np.r_[starts[1:], len(b)] - 1
+    return Bars(anchor_ms + b[starts] * width, bars.open[starts],
+                np.fmax.reduceat(bars.high, starts), np.fmin.reduceat(bars.low, starts),
+                bars.close[ends], np.add.reduceat(np.nan_to_num(bars.volume), starts))
+
+def _ema(prev: Optional[float], x: float, n: int) -> float:
+    return x if prev is None else prev + _A[n] * (x - prev)
+
+class IntradayTA:
+    """Running RSI/MACD/EMA over one timeframe's closes; the newest bar is revisable."""
+    __slots__ = ("fast", "slow", "signal", "ema", "prev", "gains", "losses", "open_t", "open_c")
+
+    def __init__(self):
+        self.fast = self.slow = self.signal = self.ema = self.prev = None
+        self.gains, self.losses = deque(maxlen=RSI_N), deque(maxlen=RSI_N)
+        self.open_t: Optional[int] = None
+        self.open_c = math.nan
+
+    def _next(self, x: float):
+        fast, slow = _ema(self.fast, x, FAST), _ema(self.slow, x, SLOW)
+        return fast, slow, _ema(self.signal, fast - slow, SIGNAL), _ema(self.ema, x, EMA_N)
+
+    def _commit(self, x: float):
+        if x != x:
+            return
+        self.fast, self.slow, self.signal, self.ema = self._next(x)
+        if self.prev is not None:
+            self.gains.append(max(x - self.prev, 0.0))
+            self.losses.append(max(self.prev - x, 0.0))
+        self.prev = x
+
+    def update(self, t: np.ndarray, close: np.ndarray):
+        """Fold in time-sorted bars: older than the open bar → skipped, same time → replaces it."""
+        lo = 0 if self.open_t is None else int(np.searchsorted(t, self.open_t, side="left"))
+        if lo >= len(t):
+            return
+        if self.open_t is not None and t[lo] > self.open_t:
+            self._commit(self.open_c)
+        for x in close[lo:-1].tolist():
+            self._commit(x)
+        self.open_t, self.open_c = int(t[-1]), float(close[-1])
+
+    def values(self) -> Dict[str, float]:
+        """{"rsi", "macd", "signal", "macdh", "ema"} including the open bar (NaN until warmed up)."""
+        x = self.open_c
+        if x != x:
+            fast, slow, signal, ema, gains, losses = self.fast, self.slow, self.signal, self.ema, self.gains, self.losses
+        else:
+            fast, slow, signal, ema = self._next(x)
+            gains, losses = list(self.gains), list(self.losses)
+            if self.prev is not None:
+                gains, losses = (gains + [max(x - self.prev, 0.0)])[-RSI_N:], (losses + [max(self.prev - x, 0.0)])[-RSI_N:]
+        rsi = math.nan
+        if len(gains) == RSI_N:
+            g, l = sum(gains) / RSI_N, sum(losses) / RSI_N
+            rsi = 100.0 if l == 0 and g > 0 else (math.nan if l == 0 else 100.0 - 100.0 / (1.0 + g / l))
+        if fast is None:
+            return {"rsi": rsi, "macd": math.nan, "signal": math.nan, "macdh": math.nan, "ema": math.nan}
+        macd = fast - slow
+        return {"rsi": rsi, "macd": macd, "signal": signal, "macdh": macd - signal, "ema": ema}
+
+def update_timeframes(tas: Dict[int, IntradayTA], bars: Bars, anchor_ms: int,
+                      timeframes: Sequence[int] = TIMEFRAMES) -> Dict[int, Dict[str, float]]:
+    """
+    Session 1-minute Bars → {minutes: values()} for every timeframe; `tas` holds the
+    per-timeframe state across refreshes. Only bars from each open bucket on are resampled.
+    """
+    out = {}
+    for m in timeframes:
+        ta = tas.get(m)
+        if ta is None:
+            ta = tas[m] = IntradayTA()
+        tail = bars.since(anchor_ms if ta.open_t is None else ta.open_t)
+        if not tail.empty:
+            rb = tail if m == 1 else resample(tail, m, anchor_ms)
+            ta.update(rb.t, rb.close)
+        out[m] = ta.values()
+    return out
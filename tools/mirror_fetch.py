@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hedged multi-mirror fetching for published artifacts.
+
+The same repo path is served by GitHub Pages, jsDelivr and raw.githubusercontent.com
+(tools/fetch.sh tries them strictly in order). Here they race instead:
+
+- Mirrors are tried in order of their recorded score (EWMA latency inflated by the
+  EWMA error rate; unseen mirrors keep their configured rank).
+- The best mirror starts first; if it has not produced a valid body within
+  HEDGE_MS, or fails, the next one starts, and so on.
+- The first response that is 200, non-empty and passes `validate(body)` wins;
+  the others are cancelled (their readers stop at the next chunk). A cancelled
+  attempt's elapsed time is only a lower bound on its latency, so it is recorded
+  censored: it can push the mirror's EWMA up, never down.
+- Stats persist in <CACHE_DIR>/mirror_stats.json between runs.
+
+Validators matter: jsDelivr caches branch files for hours and Pages only carries
+the latest snapshot, so callers pass a checksum check where one is known (manifest
+and artifacts) and fetch the pointer only from mirrors in POINTER_MIRRORS.
+
+Usage:
+  python -m tools.mirror_fetch latest.json data/2025-10-29/manifest.json [--out-dir .] [--stats]
+  MIRRORS="a=http://127.0.0.1:8801,b=http://127.0.0.1:8802" python -m tools.mirror_fetch latest.json
+
+Env:
+  REPO=Sevenon7/Tradier_Options, BRANCH=main
+  MIRRORS          -> "name=base,..." (default: pages, jsdelivr, raw for REPO)
+  POINTER_MIRRORS  -> mirrors trusted for latest.json (default: pages,raw)
+  HEDGE_MS=250     -> delay before launching the next mirror
+  GITHUB_TOKEN     -> sent to the raw mirror only
+"""
+
+from __future__ import annotations
+import argparse, json, os, queue, sys, threading, time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+
+REPO = os.environ.get("REPO", "Sevenon7/Tradier_Options")
+BRANCH = os.environ.get("BRANCH", "main")
+HEDGE_MS = float(os.environ.get("HEDGE_MS", "250"))
+POINTER_MIRRORS = [m for m in os.environ.get("POINTER_MIRRORS", "pages,raw").split(",") if m]
+STATS_FILE = "mirror_stats.json"
+ALPHA = 0.3           # EWMA weight of the newest sample
+ERROR_PENALTY = 4.0   # score = ewma_ms * (1 + ERROR_PENALTY * err_rate)
+CHUNK = 64 * 1024
+
+Validator = Callable[[bytes], bool]
+
+@dataclass
+class Mirror:
+    name: str
+    base: str
+    headers: Optional[Dict[str, str]] = None
+
+    def url(self, path: str) -> str:
+        return f"{self.base.rstrip('/')}/{path.lstrip('/')}"
+
+def default_mirrors(repo: str = REPO, branch: str = BRANCH) -> List[Mirror]:
+    spec = os.environ.get("MIRRORS", "").strip()
+    if spec:
+        return [Mirror(*item.split("=", 1)) for item in spec.split(",") if "=" in item]
+    owner, name = repo.split("/", 1)
+    tok = os.environ.get("GITHUB_TOKEN", "").strip()
+    return [
+        Mirror("pages", f"https://{owner}.github.io/{name}"),
+        Mirror("jsdelivr", f"https://cdn.jsdelivr.net/gh/{repo}@{branch}"),
+        Mirror("raw", f"https://raw.githubusercontent.com/{repo}/{branch}",
+               {"Authorization": f"Bearer {tok}"} if tok else None),
+    ]
+
+class MirrorStats:
+    """Per-mirror {"ewma_ms", "err", "ok", "fail"}; thread-safe, persisted as JSON."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.data: Dict[str, Dict[str, float]] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.data = json.load(f)
+            except (OSError, ValueError):
+                self.data = {}
+
+    def _row(self, name: str) -> Dict[str, float]:
+        return self.data.setdefault(name, {"ewma_ms": None, "err": 0.0, "ok": 0, "fail": 0})
+
+    def record(self, name: str, ms: Optional[float], ok: bool):
+        """ok=False counts an error; ms=None leaves the latency estimate alone."""
+        with self.lock:
+            row = self._row(name)
+            if ms is not None:
+                self._blend(row, ms)
+            row["err"] = (1 - ALPHA) * row["err"] + ALPHA * (0.0 if ok else 1.0)
+            row["ok" if ok else "fail"] += 1
+
+    def record_censored(self, name: str, ms: float):
+        """
+        A cancelled attempt: ms only bounds its latency from below, so it can raise the
+        estimate but never lower it, and it counts as neither a success nor an error.
+        """
+        with self.lock:
+            row = self._row(name)
+            self._blend(row, ms if row["ewma_ms"] is None else max(row["ewma_ms"], ms))
+
+    @staticmethod
+    def _blend(row: Dict[str, Any], ms: float):
+        row["ewma_ms"] = ms if row["ewma_ms"] is None else (1 - ALPHA) * row["ewma_ms"] + ALPHA * ms
+
+    def score(self, name: str) -> Optional[float]:
+        """Lower is better; None = never seen; inf = has only ever failed."""
+        row = self.data.get(name)
+        if not row:
+            return None
+        if row["ewma_ms"] is None:
+            return float("inf") if row["fail"] else None
+        return row["ewma_ms"] * (1.0 + ERROR_PENALTY * row["err"])
+
+    def order(self, mirrors: List[Mirror]) -> List[Mirror]:
+        """Best score first; unseen mirrors tie with the best known one (configured rank breaks ties)."""
+        known = [s for s in (self.score(m.name) for m in mirrors) if s is not None and s != float("inf")]
+        default = min(known) if known else 0.0
+        def key(im):
+            i, m = im
+            s = self.score(m.name)
+            return (default if s is None else s, i)
+        return [m for _, m in sorted(enumerate(mirrors), key=key)]
+
+    def save(self):
+        if not self.path:
+            return
+        from tools.snapshot_manifest import atomic_write_bytes
+        with self.lock:
+            body = json.dumps(self.data, indent=2, sort_keys=True).encode("utf-8")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        atomic_write_bytes(self.path, body)
+
+class HedgedFetcher:
+    def __init__(self, mirrors: Optional[List[Mirror]] = None, stats: Optional[MirrorStats] = None,
+                 hedge_ms: float = HEDGE_MS, timeout: float = 15.0):
+        self.mirrors = mirrors or default_mirrors()
+        self.stats = stats or MirrorStats()
+        self.hedge_s = max(0.0, hedge_ms) / 1000.0
+        self.timeout = timeout
+        # one pooled session per mirror: attempts run on short-lived threads but reuse connections
+        self.sessions = {m.name: requests.Session() for m in self.mirrors}
+        self.last: Dict[str, str] = {}  # path -> mirror that served it
+
+    def _attempt(self, m: Mirror, path: str, validate: Optional[Validator],
+                 cancel: threading.Event, out: "queue.Queue"):
+        t0 = time.perf_counter()
+        body, err = None, None
+        try:
+            with self.sessions[m.name].get(m.url(path), headers=m.headers, stream=True, timeout=self.timeout) as r:
+                if r.status_code != 200:
+                    err = f"HTTP {r.status_code}"
+                else:
+                    parts = []
+                    for chunk in r.iter_content(CHUNK):
+                        if cancel.is_set():
+                            break
+                        parts.append(chunk)
+                    body = b"".join(parts)
+        except requests.RequestException as e:
+            err = str(e) or e.__class__.__name__
+        ms = (time.perf_counter() - t0) * 1000.0
+        if cancel.is_set():
+            self.stats.record_censored(m.name, ms)  # lost the race: elapsed is a lower bound on its latency
+            out.put((m, None, "cancelled"))
+            return
+        if err is None and not body:
+            err = "empty body"
+        if err is None and validate is not None and not validate(body):
+            err = "failed validation"
+        self.stats.record(m.name, ms if err is None else None, err is None)
+        out.put((m, body if err is None else None, err))
+
+    def get(self, path: str, validate: Optional[Validator] = None,
+            only: Optional[List[str]] = None) -> Optional[bytes]:
+        """First valid body for `path` across mirrors (restricted to `only` names if given), else None."""
+        order = [m for m in self.stats.order(self.mirrors) if not only or m.name in only]
+        if not order:
+            return None
+        cancel, out = threading.Event(), queue.Queue()
+        launched, pending, errors = 0, 0, []
+
+        def launch():
+            nonlocal launched, pending
+            m = order[launched]
+            threading.Thread(target=self._attempt, args=(m, path, validate, cancel, out), daemon=True).start()
+            launched += 1
+            pending += 1
+
+        launch()
+        while pending:
+            try:
+                m, body, err = out.get(timeout=self.hedge_s if launched < len(order) else None)
+            except queue.Empty:
+                launch()  # preferred mirror is slow: hedge with the next one
+                continue
+            pending -= 1
+            if body is not None:
+                cancel.set()
+                self.last[path] = m.name
+                return body
+            errors.append(f"{m.name}: {err}")
+            if launched < len(order):
+                launch()  # failed outright: don't wait out the hedge delay
+        print(f"[warn] all mirrors failed for {path}: {'; '.join(errors)}")
+        return None
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="leaps mirror-fetch")
+    ap.add_argument("paths", nargs="+", help="repo-relative paths, e.g. latest.json")
+    ap.add_argument("--out-dir", default=None, help="write each file here (default: only report)")
+    ap.add_argument("--stats-file", default=os.path.join(os.environ.get("CACHE_DIR", ".leaps_cache"), STATS_FILE))
+    ap.add_argument("--hedge-ms", type=float, default=HEDGE_MS)
+    ap.add_argument("--stats", action="store_true", help="print mirror stats after fetching")
+    args = ap.parse_args(argv)
+
+    stats = MirrorStats(args.stats_file)
+    f = HedgedFetcher(stats=stats, hedge_ms=args.hedge_ms)
+    rc = 0
+    for p in args.paths:
+        t0 = time.perf_counter()
+        body = f.get(p)
+        ms = (time.perf_counter() - t0) * 1000.0
+        if body is None:
+            rc = 1
+            continue
+        print(f"[mirror] {p}: {len(body)} bytes from {f.last[p]} in {ms:.0f} ms")
+        if args.out_dir:
+            from tools.snapshot_manifest import atomic_write_bytes
+            dest = os.path.join(args.out_dir, p)
+            os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+            atomic_write_bytes(dest, body)
+    stats.save()
+    if args.stats:
+        for m in stats.order(f.mirrors):
+            print(f"  {m.name:<10} {json.dumps(stats.data.get(m.name))}")
+    return rc
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local stand-ins for the Pages / jsDelivr / raw mirrors, for exercising tools.mirror_fetch offline.
+
+Each --mirror serves --root over HTTP on its own port with injected behaviour:
+  name:port[:delay_ms[:fail_rate[:stall_rate]]]
+delay_ms is added before the response (±25% jitter), fail_rate answers 503,
+stall_rate sends headers and then trickles the body for 30 s (a hung mirror).
+--stale NAME=DIR serves that mirror from an older copy of the tree.
+
+Usage:
+  python -m tools.mirror_standin --root . --mirror pages:8801:900 --mirror jsdelivr:8802:40:0.3 \\
+      --mirror raw:8803:120
+  # prints the MIRRORS=... value for tools.mirror_fetch / consumer_latest_reader.py
+"""
+
+from __future__ import annotations
+import argparse, os, random, sys, threading, time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from functools import partial
+
+def make_handler(root: str, delay_ms: float, fail_rate: float, stall_rate: float, rnd: random.Random):
+    class Handler(SimpleHTTPRequestHandler):
+        def do_GET(self):
+            if delay_ms:
+                time.sleep(delay_ms * rnd.uniform(0.75, 1.25) / 1000.0)
+            roll = rnd.random()
+            if roll < fail_rate:
+                self.send_error(503, "injected failure")
+                return
+            if roll < fail_rate + stall_rate:
+                self.send_response(200)
+                self.send_header("Content-Length", "1048576")
+                self.end_headers()
+                try:
+                    for _ in range(300):
+                        self.wfile.write(b" ")
+                        self.wfile.flush()
+                        time.sleep(0.1)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                return
+            super().do_GET()
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return partial(Handler, directory=root)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="leaps mirror-standin")
+    ap.add_argument("--root", default=".")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--mirror", action="append", required=True,
+                    help="name:port[:delay_ms[:fail_rate[:stall_rate]]] (repeatable)")
+    ap.add_argument("--stale", action="append", default=[], help="NAME=DIR: serve this mirror from DIR")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args(argv)
+
+    stale = dict(s.split("=", 1) for s in args.stale)
+    rnd = random.Random(args.seed)
+    env = []
+    for spec in args.mirror:
+        parts = spec.split(":")
+        name, port = parts[0], int(parts[1])
+        delay, fail, stall = (float(x) for x in (parts[2:] + ["0", "0", "0"])[:3])
+        root = os.path.abspath(stale.get(name, args.root))
+        httpd = ThreadingHTTPServer((args.host, port), make_handler(root, delay, fail, stall, rnd))
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        print(f"[standin] {name}: http://{args.host}:{port} root={root} delay={delay:.0f}ms fail={fail} stall={stall}")
+        env.append(f"{name}=http://{args.host}:{port}")
+    print(f"MIRRORS={','.join(env)}")
+    sys.stdout.flush()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OCC / OSI option symbols parsed in bulk into a searchable contract index.
+
+  ROOT + YYMMDD + C|P + STRIKE (8 digits = strike × 1000)
+  META260220C00700000      bare root (Tradier's spelling)
+  META  260220C00700000    OSI: root space-padded to 6 characters (21 in total)
+
+Both spellings parse to the same contract. The last 15 characters are fixed
+width, so the symbols are encoded once into a uint8 matrix and right-aligned to
+21 columns: every field is then a column slice, and validation, dates, strikes
+and a sortable root code are a few array ops for the whole list — no per-symbol
+regex. Strikes are kept as integer mills (1/1000 $, exactly what the symbol
+encodes), so equality and band lookups never see float rounding.
+
+ContractIndex keeps the parsed arrays (root, expiry datetime64[D], right 'C'/'P',
+strike_mills) in the caller's order, plus one int64 key per contract
+(root rank | expiry day | right | strike) sorted for lookups: select() narrows by
+root and expiry range with binary searches and masks the strike band, and find()
+matches other symbols (either spelling) to rows.
+"""
+
+from __future__ import annotations
+import datetime as dt
+from typing import Iterable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+WIDTH, ROOT_W = 21, 6
+_DIGITS = np.r_[6:12, 13:21]          # YYMMDD + strike columns once right-aligned to 21
+_POW10 = 10 ** np.arange(7, -1, -1, dtype=np.int64)
+_EPOCH = np.datetime64("2000-01-01", "D")
+_CODE = np.zeros(256, np.int64)       # root byte → 6-bit code in ASCII order (0 = padding)
+_CODE[48:58], _CODE[65:91] = np.arange(1, 11), np.arange(11, 37)
+_CHARS = np.array(list(" 0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+_SHIFT = 6 * np.arange(ROOT_W - 1, -1, -1, dtype=np.int64)
+
+DateLike = Union[str, np.datetime64, dt.date]
+
+def _rows(symbols: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Symbols → (uint8 rows n×21 right-aligned and upper-cased, length-ok mask)."""
+    try:
+        b = np.asarray(symbols, dtype="S")
+    except UnicodeEncodeError:
+        b = np.array([str(s).encode("ascii", "replace") for s in symbols], dtype="S")
+    n, width = len(b), b.dtype.itemsize
+    if not n or not width:
+        return np.full((n, WIDTH), 32, np.uint8), np.zeros(n, dtype=bool)
+    m = b.view(np.uint8).reshape(n, width)
+    lower = m >= 97
+    if lower.any():
+        m = np.where(lower & (m <= 122), m - 32, m)
+    text = m > 32                                   # NUL padding, spaces and control whitespace
+    start = np.argmax(text, axis=1)
+    end = width - 1 - np.argmax(text[:, ::-1], axis=1)
+    size = end - start + 1
+    ok = text.any(axis=1) & (size > 15) & (size <= WIDTH)
+    w = np.full((n, WIDTH), 32, np.uint8)
+    for e in np.unique(end):                        # one block copy per distinct end column
+        rows = np.flatnonzero(end == e)
+        src = m[rows, max(e - WIDTH + 1, 0):e + 1]
+        w[rows, WIDTH - src.shape[1]:] = src
+    if start.any():                                 # blank leading whitespace / longer text
+        w[np.arange(WIDTH) + (end - WIDTH + 1)[:, None] < start[:, None]] = 32
+    return w, ok
+
+def _parse(symbols: Sequence[str]):
+    """→ (valid, root code int64, expiry datetime64[D], is_put bool, strike_mills int64)."""
+    m, ok = _rows(symbols)
+    root_b = m[:, :ROOT_W]
+    alnum = _CODE[root_b] > 0
+    # the root is one run of [A-Z0-9]; spaces may only pad it
+    first = np.argmax(alnum, axis=1)
+    last = ROOT_W - 1 - np.argmax(alnum[:, ::-1], axis=1)
+    ok &= (alnum | (root_b == 32)).all(axis=1) & alnum.any(axis=1) & (alnum.sum(axis=1) == last - first + 1)
+    pos = np.arange(ROOT_W) - first[:, None]                      # left-align the root, then pack 6 bits/char
+    code = np.where(alnum, _CODE[root_b] << np.take(_SHIFT, np.clip(pos, 0, ROOT_W - 1)), 0).sum(axis=1)
+
+    dig = m[:, _DIGITS].astype(np.int64) - 48
+    ok &= ((dig >= 0) & (dig <= 9)).all(axis=1)
+    right_b = m[:, 12]
+    ok &= (right_b == 67) | (right_b == 80)
+    dig = np.where(ok[:, None], dig, 0)
+    yy, mo, dd = dig[:, 0] * 10 + dig[:, 1], dig[:, 2] * 10 + dig[:, 3], dig[:, 4] * 10 + dig[:, 5]
+    ok &= (mo >= 1) & (mo <= 12) & (dd >= 1)
+    month = np.datetime64("2000-01", "M") + (yy * 12 + np.clip(mo, 1, 12) - 1)
+    expiry = month.astype("datetime64[D]") + (dd - 1)
+    ok &= expiry.astype("datetime64[M]") == month                 # the day exists in that month
+    strike = dig[:, 6:] @ _POW10
+    return ok, np.where(ok, code, -1), expiry, right_b == 80, np.where(ok, strike, -1)
+
+def _root_names(codes: np.ndarray) -> np.ndarray:
+    """Root codes → strings (decoded once per distinct root)."""
+    if not len(codes):
+        return np.empty(0, f"U{ROOT_W}")
+    uniq, inv = np.unique(codes, return_inverse=True)
+    chars = _CHARS[(np.maximum(uniq, 0)[:, None] >> _SHIFT) & 63]
+    names = np.array(["".join(c).rstrip() for c in chars.tolist()], dtype=f"U{ROOT_W}")
+    return names[inv.reshape(-1)]
+
+def _root_code(root: str) -> int:
+    return int(_parse([root.strip().ljust(ROOT_W) + "000101C00000000"])[1][0])
+
+def parse_arrays(symbols: Sequence[str]):
+    """
+    Bulk parse → (valid bool, root U6, expiry datetime64[D], right U1, strike_mills int64).
+    Invalid rows get root "", expiry NaT, right "", strike_mills -1.
+    """
+    ok, code, expiry, is_put, strike = _parse(symbols)
+    return (ok, np.where(ok, _root_names(code), ""), np.where(ok, expiry, np.datetime64("NaT", "D")),
+            np.where(ok, np.where(is_put, "P", "C"), ""), strike)
+
+def _as_day(x: DateLike) -> int:
+    return int((np.datetime64(x, "D") - _EPOCH).astype(np.int64))
+
+class ContractIndex:
+    """Parsed OCC symbols (caller's order) with sorted lookups by root / expiry / strike."""
+    __slots__ = ("symbols", "valid", "root", "expiry", "right", "strike_mills", "_codes", "_order", "_keys")
+
+    def __init__(self, symbols: Iterable[str]):
+        self.symbols = np.asarray(list(symbols), dtype=object)
+        ok, code, expiry, is_put, strike = _parse(self.symbols)
+        self.valid, self.strike_mills = ok, strike
+        self.root = np.where(ok, _root_names(code), "")
+        self.expiry = np.where(ok, expiry, np.datetime64("NaT", "D"))
+        self.right = np.where(ok, np.where(is_put, "P", "C"), "")
+        self._codes = np.unique(code[ok])                         # distinct roots, sorted
+        keys = self._key(code, expiry, is_put, strike)
+        good = np.flatnonzero(ok)
+        self._order = good[np.argsort(keys[good], kind="stable")]  # row numbers, sorted by contract
+        self._keys = keys[self._order]
+
+    def _key(self, code, expiry, is_put, strike) -> np.ndarray:
+        """root rank (19 bits) | days since 2000 (16) | put (1) | strike mills (27): sorts like the contract tuple."""
+        rank = np.searchsorted(self._codes, code).astype(np.int64)
+        day = (expiry - _EPOCH).astype(np.int64)
+        return (rank << 44) | (day << 28) | (is_put.astype(np.int64) << 27) | np.maximum(strike, 0)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    @property
+    def strike(self) -> np.ndarray:
+        """Strikes in dollars (float64)."""
+        return self.strike_mills / 1000.0
+
+    @property
+    def is_call(self) -> np.ndarray:
+        return self.right == "C"
+
+    def occ(self, padded: bool = False) -> np.ndarray:
+        """Canonical symbols (bare root, or OSI 6-wide root with padded=True); "" where invalid."""
+        if not len(self):
+            return np.empty(0, f"U{WIDTH}")
+        e = np.where(self.valid, self.expiry, _EPOCH)
+        mon = e.astype("datetime64[M]")
+        yymmdd = ((mon.astype(np.int64) // 12 + 70) % 100 * 10000 + (mon.astype(np.int64) % 12 + 1) * 100
+                  + (e - mon.astype("datetime64[D]")).astype(np.int64) + 1)
+        root = np.char.ljust(self.root, ROOT_W) if padded else self.root
+        tail = np.char.add(np.char.add(np.char.zfill(yymmdd.astype(str), 6), self.right),
+                           np.char.zfill(self.strike_mills.astype(str), 8))
+        return np.where(self.valid, np.char.add(root, tail), "")
+
+    def select(self, root: Optional[str] = None, expiry_from: Optional[DateLike] = None,
+               expiry_to: Optional[DateLike] = None, strike_lo: Optional[float] = None,
+               strike_hi: Optional[float] = None, right: Optional[str] = None) -> np.ndarray:
+        """Row numbers (caller's order, ascending) of contracts matching every given bound; bounds are inclusive."""
+        keys, order = self._keys, self._order
+        d_lo = None if expiry_from is None else _as_day(expiry_from)
+        d_hi = None if expiry_to is None else _as_day(expiry_to)
+        if root is not None:
+            code = _root_code(root)
+            r = int(np.searchsorted(self._codes, code))
+            if r >= len(self._codes) or self._codes[r] != code:
+                return np.empty(0, np.int64)
+            base = r << 44                                         # one root's expiries are contiguous and sorted
+            lo = np.searchsorted(keys, base | (max(d_lo or 0, 0) << 28))
+            hi = np.searchsorted(keys, base + (1 << 44) if d_hi is None else base | ((d_hi + 1) << 28))
+            keys, order = keys[lo:hi], order[lo:hi]
+        mask = np.ones(len(order), dtype=bool)
+        if root is None and (d_lo is not None or d_hi is not None):
+            day = (keys >> 28) & 0xFFFF
+            if d_lo is not None:
+                mask &= day >= d_lo
+            if d_hi is not None:
+                mask &= day <= d_hi
+        k = keys & ((1 << 27) - 1)
+        if strike_lo is not None:
+            mask &= k >= int(round(strike_lo * 1000))
+        if strike_hi is not None:
+            mask &= k <= int(round(strike_hi * 1000))
+        if right is not None:
+            mask &= ((keys >> 27) & 1) == (right.strip().upper()[:1] == "P")
+        return np.sort(order[mask])
+
+    def find(self, symbols: Iterable[str]) -> np.ndarray:
+        """Row number of each symbol's contract (padded or bare spelling), -1 when absent or invalid."""
+        ok, code, expiry, is_put, strike = _parse(list(symbols))
+        if not len(self._keys) or not len(ok):
+            return np.full(len(ok), -1, np.int64)
+        r = np.minimum(np.searchsorted(self._codes, code), len(self._codes) - 1)
+        ok &= self._codes[r] == code
+        want = self._key(code, np.where(ok, expiry, _EPOCH), is_put, strike)
+        pos = np.minimum(np.searchsorted(self._keys, want), len(self._keys) - 1)
+        return np.where(ok & (self._keys[pos] == want), self._order[pos], -1)
+
+def parse_one(occ: str) -> Optional[Tuple[str, np.datetime64, str, int]]:
+    """(root, expiry, right, strike_mills) for one symbol, or None."""
+    ok, root, expiry, right, strike = parse_arrays([occ])
+    return (str(root[0]), expiry[0], str(right[0]), int(strike[0])) if ok[0] else None
+
+def normalize(occ: str) -> Optional[str]:
+    """Bare-root spelling (what the quotes API expects) of a padded or bare symbol; None if invalid."""
+    p = parse_one(occ)
+    if p is None:
+        return None
+    root, expiry, right, mills = p
+    return f"{root}{str(expiry).replace('-', '')[2:]}{right}{mills:08d}"
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Incremental account positions sync: the options book straight from Tradier accounts.
+
+- Accounts: TRADIER_ACCOUNTS (comma-separated) or, when unset, every account on
+  /user/profile. /accounts/{id}/positions is pulled for all of them concurrently
+  (one pooled session, a thread per account), so a multi-account book syncs in one pass.
+- Option positions are parsed in bulk with tools.occ.ContractIndex; equities are left out
+  of the options book. Each position is hashed on (account, symbol, quantity, cost_basis)
+  and the result is cached in <CACHE_DIR>/positions.json, so a sync reports what was
+  added / changed / removed. An account whose fetch fails keeps its cached positions.
+- contracts() aggregates the book per contract across accounts (quantity and Tradier's
+  cost_basis, the total paid, summed; entry = cost / (quantity × 100)).
+- resolve() re-quotes (bid/ask/last + greeks, plus the underlyings' last for spot) only
+  the contracts whose positions were added or changed, or whose cached quote is older
+  than POSITIONS_QUOTE_TTL seconds, in one batched /markets/quotes pass.
+- open_options() is the {"occ", "entry", "contracts", "label"} list the producer and
+  option_pl_builder take; pl_rows() gives option_pl.csv rows for the risk grid.
+
+Usage:
+  python -m tools.positions [--accounts VA000001,VA000002] [--ttl 300] [--offline] [--out option_pl.csv]
+  # offline: python -m tools.accounts_standin --accounts 3 --positions 500 --port 8792
+  #          TRADIER_BASE=http://127.0.0.1:8792/v1 TRADIER_TOKEN=x python -m tools.positions
+
+Env:
+  TRADIER_TOKEN, TRADIER_BASE, TRADIER_ACCOUNTS_BASE (defaults to TRADIER_BASE), TRADIER_ACCOUNTS,
+  POSITIONS_QUOTE_TTL (default 300), CACHE_DIR
+"""
+
+from __future__ import annotations
+import argparse, hashlib, json, os, sys, time
+import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from tools.occ import ContractIndex
+from tools.snapshot_manifest import atomic_write_bytes
+
+BASE = os.getenv("TRADIER_BASE", "https://api.tradier.com/v1").rstrip("/")
+ACCOUNTS_BASE = (os.getenv("TRADIER_ACCOUNTS_BASE") or BASE).rstrip("/")
+ACCOUNTS = [a.strip() for a in os.getenv("TRADIER_ACCOUNTS", "").split(",") if a.strip()]
+CACHE_PATH = os.path.join(os.getenv("CACHE_DIR", ".leaps_cache"), "positions.json")
+QUOTE_TTL = float(os.getenv("POSITIONS_QUOTE_TTL", "300"))
+QUOTE_CHUNK = 1000     # symbols per POST /markets/quotes
+MULT = 100
+GREEKS = ("delta", "gamma", "theta", "vega", "mid_iv", "bid_iv", "ask_iv", "smv_vol")
+PL_COLS = ["Contract", "OCC", "Bid", "Ask", "Last", "MidUsed", "Entry", "Contracts", "P/L($)", "P/L(%)", "IV", "spot"]
+
+# ---------- HTTP ----------
+def _session(pool: int = 16) -> requests.Session:
+    s = requests.Session()
+    retry = Retry(total=4, backoff_factor=0.6, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset(["GET", "POST"]), raise_on_status=False,
+                  respect_retry_after_header=True)
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=pool, pool_maxsize=pool)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    return s
+
+def _call(s: requests.Session, url: str, token: str, params: Dict[str, str] | None = None,
+          data: Dict[str, str] | None = None) -> Optional[dict]:
+    headers = {"Authorization": f"Bearer {token}", "Accept": "application/json"}
+    try:
+        r = (s.post(url, headers=headers, data=data, timeout=(4, 30)) if data is not None
+             else s.get(url, headers=headers, params=params or {}, timeout=(4, 30)))
+    except requests.RequestException as e:
+        print(f"[warn] {url}: {e}")
+        return None
+    if r.status_code != 200:
+        print(f"[warn] HTTP {r.status_code}: {url} :: {r.text[:200]}")
+        return None
+    try:
+        return r.json()
+    except ValueError:
+        print(f"[warn] JSON decode failed: {url}")
+        return None
+
+def _listify(x: Any) -> List[dict]:
+    """Tradier sends one row as an object, several as a list and none as the string "null"."""
+    if isinstance(x, dict):
+        return [x]
+    if isinstance(x, list):
+        return [r for r in x if isinstance(r, dict)]
+    return []
+
+def discover_accounts(s: requests.Session, token: str, base: str = ACCOUNTS_BASE) -> List[str]:
+    js = _call(s, f"{base}/user/profile", token) or {}
+    return [a["account_number"] for a in _listify((js.get("profile") or {}).get("account"))
+            if a.get("account_number")]
+
+def fetch_positions(s: requests.Session, token: str, account: str, base: str = ACCOUNTS_BASE) -> Optional[List[dict]]:
+    """Raw positions of one account; None when the request failed (as opposed to an empty account)."""
+    js = _call(s, f"{base}/accounts/{account}/positions", token)
+    if js is None or "positions" not in js:
+        return None
+    return _listify((js["positions"] or {}).get("position") if isinstance(js["positions"], dict) else None)
+
+def fetch_quotes(symbols: List[str], base: str = BASE, token: Optional[str] = None,
+                 s: Optional[requests.Session] = None) -> Dict[str, dict]:
+    """{symbol: quote} for equities and options alike, with greeks; POSTed in QUOTE_CHUNK batches."""
+    token = token or os.environ.get("TRADIER_TOKEN", "").strip()
+    if not symbols or not token:
+        return {}
+    s = s or _session()
+    out: Dict[str, dict] = {}
+    for i in range(0, len(symbols), QUOTE_CHUNK):
+        js = _call(s, f"{base}/markets/quotes", token,
+                   data={"symbols": ",".join(symbols[i:i + QUOTE_CHUNK]), "greeks": "true"})
+        for q in _listify(((js or {}).get("quotes") or {}).get("quote")):
+            if q.get("symbol"):
+                out[q["symbol"]] = q
+    return out
+
+# ---------- Book ----------
+def position_hash(account: str, p: Dict[str, Any]) -> str:
+    key = [account, str(p.get("symbol", "")).strip(), float(p.get("quantity") or 0),
+           round(float(p.get("cost_basis") or 0), 4)]
+    return hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()[:16]
+
+def _num(v: Any) -> Optional[float]:
+    try:
+        x = float(v)
+    except (TypeError, ValueError):
+        return None
+    return x if x == x else None
+
+def mid_from_quote(q: Dict[str, Any]) -> Optional[float]:
+    """(bid+ask)/2 when both sides are quoted, else last, else whichever side there is."""
+    bid, ask, last = (_num(q.get(k)) or 0.0 for k in ("bid", "ask", "last"))
+    if bid > 0 and ask > 0:
+        return (bid + ask) / 2.0
+    return last or bid or ask or None
+
+def contract_label(root: str, expiry: Any, right: str, strike_mills: int) -> str:
+    """META 700C Feb '26"""
+    d = expiry.item() if hasattr(expiry, "item") else expiry
+    return f"{root} {strike_mills / 1000:g}{right} {d:%b} '{d:%y}"
+
+class PositionBook:
+    """Option positions across accounts, synced incrementally against a local JSON cache."""
+
+    def __init__(self, path: str = CACHE_PATH):
+        self.path = path
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                doc = json.load(f)
+        except (OSError, ValueError):
+            doc = {}
+        self.synced_utc: Optional[str] = doc.get("synced_utc")
+        self.book_sha256: Optional[str] = doc.get("book_sha256")
+        self.positions: Dict[str, dict] = doc.get("positions") or {}   # "account:OCC" -> position + hash
+        self.quotes: Dict[str, dict] = doc.get("quotes") or {}         # OCC -> {"hash", "at", "quote"}
+        self.spots: Dict[str, float] = doc.get("spots") or {}          # root -> last
+
+    def save(self):
+        doc = {"synced_utc": self.synced_utc, "book_sha256": self.book_sha256,
+               "positions": self.positions, "quotes": self.quotes, "spots": self.spots}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        atomic_write_bytes(self.path, json.dumps(doc, separators=(",", ":")).encode("utf-8"))
+
+    def sync(self, accounts: Optional[List[str]] = None, token: Optional[str] = None,
+             base: str = ACCOUNTS_BASE, workers: int = 8) -> Dict[str, Any]:
+        """Pull every account's positions concurrently → {"added", "changed", "removed", "accounts", "failed", ...}."""
+        token = token or os.environ.get("TRADIER_TOKEN", "").strip()
+        if not token:
+            return {"added": [], "changed": [], "removed": [], "accounts": 0, "failed": [], "skipped": "no token"}
+        s = _session(max(workers, 1) * 2)
+        accounts = list(accounts or ACCOUNTS) or discover_accounts(s, token, base)
+        if not accounts:  # profile unavailable: re-pull the accounts we already know
+            accounts = sorted({p["account"] for p in self.positions.values()})
+        if not accounts:
+            print("[warn] no accounts to sync (set TRADIER_ACCOUNTS or check the token's account access)")
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(accounts) or 1))) as pool:
+            pulled = dict(zip(accounts, pool.map(lambda a: fetch_positions(s, token, a, base), accounts)))
+
+        failed = [a for a, rows in pulled.items() if rows is None]
+        raw = [(a, p) for a, rows in pulled.items() if rows for p in rows]
+        ix = ContractIndex(str(p.get("symbol", "")) for _, p in raw)   # one bulk parse for every account
+        canon = ix.occ()
+        fresh: Dict[str, dict] = {k: v for k, v in self.positions.items() if v["account"] in failed}
+        for (a, p), ok, occ in zip(raw, ix.valid.tolist(), canon.tolist()):
+            if not ok:  # equity (or anything that isn't an option)
+                continue
+            key = f"{a}:{occ}"
+            qty, cost = float(p.get("quantity") or 0), float(p.get("cost_basis") or 0)
+            prev = fresh.get(key)
+            if prev:  # the same contract split over lots
+                qty, cost = qty + prev["quantity"], cost + prev["cost_basis"]
+            fresh[key] = {"account": a, "occ": occ, "quantity": qty, "cost_basis": round(cost, 4),
+                          "date_acquired": p.get("date_acquired") or (prev or {}).get("date_acquired")}
+            fresh[key]["hash"] = position_hash(a, {"symbol": occ, "quantity": qty, "cost_basis": cost})
+
+        old = self.positions
+        added = sorted(k for k in fresh if k not in old)
+        changed = sorted(k for k in fresh if k in old and old[k]["hash"] != fresh[k]["hash"])
+        removed = sorted(k for k in old if k not in fresh)
+        self.positions = dict(sorted(fresh.items()))
+        self.book_sha256 = hashlib.sha256("".join(v["hash"] for v in self.positions.values()).encode("utf-8")).hexdigest()
+        self.synced_utc = dt.datetime.now(dt.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        for a in failed:
+            print(f"[warn] positions for account {a} unavailable; keeping the cached ones")
+        self.save()
+        return {"added": added, "changed": changed, "removed": removed, "accounts": len(accounts),
+                "failed": failed, "positions": len(self.positions), "book_sha256": self.book_sha256}
+
+    def contracts(self) -> List[Dict[str, Any]]:
+        """One entry per contract held (sorted by OCC), summed across accounts; flat contracts are dropped."""
+        agg: Dict[str, dict] = {}
+        for p in self.positions.values():
+            c = agg.setdefault(p["occ"], {"occ": p["occ"], "quantity": 0.0, "cost_basis": 0.0,
+                                           "accounts": [], "hashes": []})
+            c["quantity"] += p["quantity"]
+            c["cost_basis"] += p["cost_basis"]
+            c["accounts"].append(p["account"])
+            c["hashes"].append(p["hash"])
+        book = [agg[k] for k in sorted(agg) if agg[k]["quantity"]]
+        ix = ContractIndex(c["occ"] for c in book)
+        for c, root, exp, right, mills in zip(book, ix.root.tolist(), ix.expiry, ix.right.tolist(),
+                                              ix.strike_mills.tolist()):
+            c.update(root=root, expiry=str(exp), right=right, strike=mills / 1000.0,
+                     label=contract_label(root, exp, right, mills),
+                     entry=round(c["cost_basis"] / (c["quantity"] * MULT), 4),
+                     hash=hashlib.sha256("".join(sorted(c.pop("hashes"))).encode("utf-8")).hexdigest()[:16])
+        return book
+
+    def open_options(self) -> List[Dict[str, Any]]:
+        """The book as [{"occ", "entry", "contracts", "label"}] (what CONFIG["open_options"] used to hold)."""
+        return [{"occ": c["occ"], "entry": c["entry"], "contracts": int(c["quantity"]), "label": c["label"]}
+                for c in self.contracts()]
+
+    def resolve(self, ttl: float = QUOTE_TTL, fetch: Optional[Callable[[List[str]], Dict[str, dict]]] = None,
+                fresh: Iterable[str] = ()) -> List[str]:
+        """
+        Re-quote contracts whose positions were added or changed since their cached quote,
+        or whose quote is older than ttl seconds (unless in `fresh`, e.g. with a current
+        streamed mark); returns the contracts re-quoted.
+        """
+        now = time.time()
+        book = self.contracts()
+        fresh = set(fresh)
+        stale = [c for c in book
+                 if (q := self.quotes.get(c["occ"])) is None or q["hash"] != c["hash"]
+                 or (now - q["at"] > ttl and c["occ"] not in fresh)]
+        if stale:
+            roots = sorted({c["root"] for c in stale})
+            got = (fetch or fetch_quotes)([c["occ"] for c in stale] + roots)
+            for c in stale:
+                q = got.get(c["occ"])
+                if q:
+                    g = q.get("greeks") or {}
+                    self.quotes[c["occ"]] = {"hash": c["hash"], "at": now, "quote": {
+                        "bid": q.get("bid"), "ask": q.get("ask"), "last": q.get("last"),
+                        "greeks": {k: g[k] for k in GREEKS if g.get(k) is not None}}}
+            for r in roots:
+                px = _num((got.get(r) or {}).get("last"))
+                if px:
+                    self.spots[r] = px
+        held = {c["occ"] for c in book}
+        self.quotes = {k: v for k, v in self.quotes.items() if k in held}
+        self.spots = {k: v for k, v in self.spots.items() if k in {c["root"] for c in book}}
+        self.save()
+        return [c["occ"] for c in stale if c["occ"] in got] if stale else []
+
+    def quote(self, occ: str) -> Dict[str, Any]:
+        return (self.quotes.get(occ) or {}).get("quote") or {}
+
+    def pl_rows(self, marks: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
+        """option_pl.csv rows from the cached quotes; `marks` (e.g. streamed) override the quote's mid."""
+        rows = []
+        for c in self.contracts():
+            q = self.quote(c["occ"])
+            mid = (marks or {}).get(c["occ"]) or (mid_from_quote(q) if q else None)
+            if mid is None:
+                print(f"[warn] missing quote for {c['occ']}; skipping P/L calc")
+                continue
+            entry, qty = c["entry"], int(c["quantity"])
+            pnl_p = (mid / entry - 1) * 100 * (1 if qty > 0 else -1) if entry else None  # shorts gain as mid falls
+            g = q.get("greeks") or {}
+            rows.append({
+                "Contract": c["label"], "OCC": c["occ"],
+                "Bid": q.get("bid"), "Ask": q.get("ask"), "Last": q.get("last"),
+                "MidUsed": round(mid, 2), "Entry": entry, "Contracts": qty,
+                "P/L($)": round((mid - entry) * MULT * qty, 2) if pnl_p is not None else None,
+                "P/L(%)": round(pnl_p, 2) if pnl_p is not None else None,
+                "IV": g.get("mid_iv") or g.get("ask_iv") or g.get("bid_iv") or g.get("smv_vol"),
+                "spot": self.spots.get(c["root"]),
+            })
+        return rows
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="leaps positions", description="sync account positions into the local book")
+    ap.add_argument("--accounts", default=None, help="comma-separated account ids (default: $TRADIER_ACCOUNTS or all)")
+    ap.add_argument("--cache", default=CACHE_PATH)
+    ap.add_argument("--ttl", type=float, default=QUOTE_TTL, help="re-quote unchanged contracts older than this (s)")
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--offline", action="store_true", help="use the cached book; no account or quote requests")
+    ap.add_argument("--out", default=None, help="also write option_pl.csv-shaped rows here")
+    args = ap.parse_args(argv)
+    if not args.offline and not os.environ.get("TRADIER_TOKEN", "").strip():
+        print("[positions] TRADIER_TOKEN not set (skipping)")
+        return 0
+
+    book = PositionBook(args.cache)
+    t0 = time.perf_counter()
+    if not args.offline:
+        accounts = [a.strip() for a in args.accounts.split(",") if a.strip()] if args.accounts else None
+        d = book.sync(accounts, workers=args.workers)
+        t1 = time.perf_counter()
+        n = len(book.resolve(args.ttl))
+        print(f"[positions] {d['accounts']} accounts, {d['positions']} positions: +{len(d['added'])} "
+              f"~{len(d['changed'])} -{len(d['removed'])} (sync {t1 - t0:.2f}s); "
+              f"{n} contracts re-quoted ({time.perf_counter() - t1:.2f}s)")
+    rows = book.pl_rows()
+    if args.out:
+        import pandas as pd
+        pd.DataFrame(rows, columns=PL_COLS).to_csv(args.out, index=False)
+    for o in book.open_options()[:20]:
+        print(f"  {o['label']:<24} {o['occ']:<22} x{o['contracts']:<5} entry {o['entry']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Vectorized portfolio risk + scenario grid for the options book.
+
+- Loads the whole book (option_pl.csv, or the synced account positions with --positions)
+  into arrays: spot, strike, T, vol, qty, call/put.
+  OCC symbols are parsed in one pass by tools.occ.ContractIndex, which also does the
+  optional --root / --expiry-from / --expiry-to filtering.
+- Vol: the quote's IV when present, else implied from MidUsed (vectorized bisection),
+  else DEFAULT_VOL. Spot: the `spot` column, else LastPx from the sibling overlay CSV.
+- Black-Scholes greeks aggregated by root and expiry → risk_greeks.csv
+  (delta in shares, gamma per $1, vega per vol point, theta per calendar day).
+- Revalues the full book over a spot-shock × vol-shock × days-forward grid with NumPy
+  broadcasting (shocks apply to every root at once) → risk_grid.csv next to option_pl.csv,
+  one row per (root | ALL, spot_shock_pct, vol_shock_pts, days).
+
+Usage:
+  python -m tools.risk_grid [--pl option_pl.csv] [--overlay overlay_vwap_macd_rsi.csv]
+      [--spot-range 0.3 --spot-steps 50] [--vol-range 20 --vol-steps 20] [--days 0,7,30,60,90]
+      [--root META,MSTU] [--expiry-from 2026-01-01] [--expiry-to 2026-12-31] [--positions [CACHE]]
+
+Env:
+  RISK_FREE_RATE  -> annual rate for pricing (default 0.04)
+"""
+
+from __future__ import annotations
+import argparse, os, sys, time
+import datetime as dt
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from tools.occ import ContractIndex
+from tools.positions import CACHE_PATH as POSITIONS_CACHE, PL_COLS, PositionBook
+
+RISK_FREE = float(os.environ.get("RISK_FREE_RATE", "0.04"))
+DEFAULT_VOL = 0.5
+MULT = 100.0
+
+# ---------- Black-Scholes (vectorized) ----------
+def norm_cdf(x: np.ndarray) -> np.ndarray:
+    """Φ(x) via Abramowitz–Stegun 7.1.26 erf (|err| < 1.5e-7); avoids a SciPy dependency."""
+    z = np.abs(x) / np.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * z)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1.0 - poly * np.exp(-z * z)
+    return 0.5 * (1.0 + np.sign(x) * erf)
+
+def norm_pdf(x: np.ndarray) -> np.ndarray:
+    return np.exp(-0.5 * x * x) / np.sqrt(2.0 * np.pi)
+
+def _d1d2(s, k, t, vol, r):
+    t = np.maximum(t, 1e-8)
+    sd = np.maximum(vol, 1e-6) * np.sqrt(t)
+    d1 = (np.log(s / k) + (r + 0.5 * vol * vol) * t) / sd
+    return d1, d1 - sd, t, sd
+
+def bs_price(s, k, t, vol, is_call, r: float = RISK_FREE) -> np.ndarray:
+    d1, d2, t, _ = _d1d2(s, k, t, vol, r)
+    disc = k * np.exp(-r * t)
+    call = s * norm_cdf(d1) - disc * norm_cdf(d2)
+    return np.where(is_call, call, call - s + disc)  # put via parity
+
+def bs_greeks(s, k, t, vol, is_call, r: float = RISK_FREE) -> Dict[str, np.ndarray]:
+    d1, d2, t, sd = _d1d2(s, k, t, vol, r)
+    pdf, disc = norm_pdf(d1), k * np.exp(-r * t)
+    delta = np.where(is_call, norm_cdf(d1), norm_cdf(d1) - 1.0)
+    gamma = pdf / (s * sd)
+    vega = s * pdf * np.sqrt(t) / 100.0
+    theta_call = -s * pdf * vol / (2 * np.sqrt(t)) - r * disc * norm_cdf(d2)
+    theta = np.where(is_call, theta_call, theta_call + r * disc) / 365.0
+    return {"delta": delta, "gamma": gamma, "vega": vega, "theta": theta}
+
+def implied_vol(price, s, k, t, is_call, r: float = RISK_FREE, lo: float = 0.01, hi: float = 5.0, iters: int = 60) -> np.ndarray:
+    """Vectorized bisection; NaN where the price is outside the [lo, hi] vol bracket."""
+    price = np.asarray(price, dtype=float)
+    a, b = np.full_like(price, lo), np.full_like(price, hi)
+    p_lo, p_hi = bs_price(s, k, t, a, is_call, r), bs_price(s, k, t, b, is_call, r)
+    ok = np.isfinite(price) & (price > p_lo) & (price < p_hi)
+    for _ in range(iters):
+        mid = 0.5 * (a + b)
+        above = bs_price(s, k, t, mid, is_call, r) > price
+        b, a = np.where(above, mid, b), np.where(above, a, mid)
+    return np.where(ok, 0.5 * (a + b), np.nan)
+
+# ---------- Book ----------
+def _num(df: pd.DataFrame, col: str) -> np.ndarray:
+    if col not in df:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+
+def load_book(pl_csv: Union[str, pd.DataFrame], overlay_csv: Optional[str] = None, today: Optional[dt.date] = None,
+              roots: Optional[List[str]] = None, expiry_from: Optional[str] = None,
+              expiry_to: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """
+    option_pl.csv (or rows already in that shape) → dict of aligned arrays, sorted by root (contracts with no usable OCC/spot are dropped);
+    roots / expiry_from / expiry_to (inclusive) restrict the book.
+    """
+    today = today or dt.datetime.now(dt.timezone.utc).date()
+    df = pl_csv if isinstance(pl_csv, pd.DataFrame) else pd.read_csv(pl_csv)
+    ix = ContractIndex(df.get("OCC", pd.Series(dtype=str)).astype(str))
+    keep = ix.valid
+    if roots or expiry_from or expiry_to:
+        keep = np.zeros(len(ix), dtype=bool)
+        for r in roots or [None]:
+            keep[ix.select(root=r, expiry_from=expiry_from, expiry_to=expiry_to)] = True
+    df = df[keep].reset_index(drop=True)
+    if df.empty:
+        return {}
+    root, strike, is_call = ix.root[keep], ix.strike[keep], ix.is_call[keep]
+    expiry = np.datetime_as_string(ix.expiry[keep], unit="D")
+    t = np.maximum((ix.expiry[keep] - np.datetime64(today, "D")).astype(float), 0.0) / 365.0
+
+    spot = _num(df, "spot")
+    if overlay_csv and os.path.exists(overlay_csv) and np.isnan(spot).any():
+        ov = pd.read_csv(overlay_csv)
+        px = dict(zip(ov["Ticker"], pd.to_numeric(ov["LastPx"], errors="coerce")))
+        spot = np.where(np.isnan(spot), np.array([px.get(r, np.nan) for r in root], dtype=float), spot)
+    mid = _num(df, "MidUsed")
+    vol = _num(df, "IV")
+    need = np.isnan(vol) | (vol <= 0)
+    if need.any():
+        vol = np.where(need, implied_vol(mid, spot, strike, t, is_call), vol)
+    vol = np.where(np.isnan(vol) | (vol <= 0), DEFAULT_VOL, vol)
+
+    ok = np.isfinite(spot) & (spot > 0)
+    for lbl in df.loc[~ok, "OCC"]:
+        print(f"[risk] no spot for {lbl}; excluded")
+    order = np.argsort(root[ok], kind="stable")
+    pick = lambda a: a[ok][order]
+    return {"occ": pick(df["OCC"].astype(str).to_numpy()), "root": pick(root), "expiry": pick(expiry),
+            "strike": pick(strike), "is_call": pick(is_call), "t": pick(t), "spot": pick(spot),
+            "vol": pick(vol), "qty": pick(_num(df, "Contracts")), "mid": pick(mid)}
+
+# ---------- Aggregates ----------
+def greeks_by_root_expiry(book: Dict[str, np.ndarray]) -> pd.DataFrame:
+    g = bs_greeks(book["spot"], book["strike"], book["t"], book["vol"], book["is_call"])
+    w = book["qty"] * MULT
+    value = bs_price(book["spot"], book["strike"], book["t"], book["vol"], book["is_call"]) * w
+    df = pd.DataFrame({"root": book["root"], "expiry": book["expiry"], "contracts": book["qty"],
+                       "value": value, "delta_shares": g["delta"] * w, "gamma": g["gamma"] * w,
+                       "vega": g["vega"] * w, "theta": g["theta"] * w})
+    out = df.groupby(["root", "expiry"], as_index=False).sum()
+    return out.round({"value": 2, "delta_shares": 2, "gamma": 4, "vega": 2, "theta": 2})
+
+def scenario_grid(book: Dict[str, np.ndarray], spot_shocks: np.ndarray, vol_shocks: np.ndarray,
+                  days: np.ndarray) -> pd.DataFrame:
+    """
+    Revalue every contract on spot×(1+shock) × (vol+shock) × (T-days): contracts on axis 0,
+    one (N, S, V) slab per horizon; summed per root with reduceat (book is root-sorted).
+    """
+    s = book["spot"][:, None, None] * (1.0 + spot_shocks[None, :, None])
+    vol = np.maximum(book["vol"][:, None, None] + vol_shocks[None, None, :], 0.01)
+    k, c, w = (a[:, None, None] for a in (book["strike"], book["is_call"], book["qty"] * MULT))
+    base = bs_price(book["spot"], book["strike"], book["t"], book["vol"], book["is_call"]) * book["qty"] * MULT
+
+    roots, starts = np.unique(book["root"], return_index=True)
+    base_root = np.add.reduceat(base, starts)
+    frames = []
+    S, V = len(spot_shocks), len(vol_shocks)
+    ss, vv = np.meshgrid(spot_shocks * 100.0, vol_shocks * 100.0, indexing="ij")
+    for d in days:
+        t = np.maximum(book["t"] - d / 365.0, 0.0)[:, None, None]
+        val = bs_price(s, k, t, vol, c) * w                          # (N, S, V)
+        per_root = np.add.reduceat(val, starts, axis=0)              # (R, S, V)
+        allv = per_root.sum(axis=0, keepdims=True)
+        names = np.append(roots, "ALL")
+        vals = np.concatenate([per_root, allv])
+        bases = np.append(base_root, base_root.sum())
+        frames.append(pd.DataFrame({
+            "root": np.repeat(names, S * V),
+            "spot_shock_pct": np.tile(ss.ravel(), len(names)),
+            "vol_shock_pts": np.tile(vv.ravel(), len(names)),
+            "days": int(d),
+            "value": vals.reshape(-1),
+            "pnl": (vals - bases[:, None, None]).reshape(-1),
+        }))
+    out = pd.concat(frames, ignore_index=True)
+    return out.round({"spot_shock_pct": 2, "vol_shock_pts": 2, "value": 2, "pnl": 2})
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="leaps risk")
+    ap.add_argument("--pl", default="option_pl.csv")
+    ap.add_argument("--overlay", default=None, help="default: overlay_vwap_macd_rsi.csv next to --pl")
+    ap.add_argument("--out", default=None, help="default: risk_grid.csv next to --pl")
+    ap.add_argument("--greeks-out", default=None, help="default: risk_greeks.csv next to --pl")
+    ap.add_argument("--spot-range", type=float, default=0.3, help="± fractional spot shock")
+    ap.add_argument("--spot-steps", type=int, default=13)
+    ap.add_argument("--vol-range", type=float, default=20.0, help="± vol shock in points")
+    ap.add_argument("--vol-steps", type=int, default=5)
+    ap.add_argument("--days", default="0,7,30")
+    ap.add_argument("--root", default=None, help="comma-separated roots to include (default: all)")
+    ap.add_argument("--expiry-from", default=None, help="YYYY-MM-DD, inclusive")
+    ap.add_argument("--expiry-to", default=None, help="YYYY-MM-DD, inclusive")
+    ap.add_argument("--positions", nargs="?", const=POSITIONS_CACHE, default=None,
+                    help="take the book from the synced account positions cache instead of --pl")
+    args = ap.parse_args(argv)
+
+    d = os.path.dirname(os.path.abspath(args.pl))
+    overlay = args.overlay or os.path.join(d, "overlay_vwap_macd_rsi.csv")
+    out = args.out or os.path.join(d, "risk_grid.csv")
+    greeks_out = args.greeks_out or os.path.join(d, "risk_greeks.csv")
+    src = args.pl
+    if args.positions:
+        src = pd.DataFrame(PositionBook(args.positions).pl_rows(), columns=PL_COLS)
+    elif not os.path.exists(args.pl):
+        print(f"[risk] {args.pl} not found (skipping)")
+        return 0
+
+    t0 = time.perf_counter()
+    roots = [r.strip() for r in args.root.split(",") if r.strip()] if args.root else None
+    book = load_book(src, overlay, roots=roots, expiry_from=args.expiry_from, expiry_to=args.expiry_to)
+    if not book:
+        print("[risk] no valid positions in book")
+        return 0
+    spot_shocks = np.linspace(-args.spot_range, args.spot_range, args.spot_steps)
+    vol_shocks = np.linspace(-args.vol_range, args.vol_range, args.vol_steps) / 100.0
+    days = np.array([int(x) for x in args.days.split(",") if x.strip()])
+    greeks = greeks_by_root_expiry(book)
+    grid = scenario_grid(book, spot_shocks, vol_shocks, days)
+    greeks.to_csv(greeks_out, index=False)
+    grid.to_csv(out, index=False)
+    print(greeks.to_string(index=False))
+    print(f"[risk] {len(book['occ'])} contracts × {len(spot_shocks)}×{len(vol_shocks)}×{len(days)} "
+          f"scenarios -> {out} ({time.perf_counter() - t0:.3f}s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
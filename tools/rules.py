@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Declarative, vectorized rule engine for Guidance and screens.
+
+Rules live in a JSON file (rules.json at the repo root by default):
+
+  {"screens": {
+     "Guidance": {"default": "HOLD", "rules": [
+        "px <= vwap & ~(macd > signal) & rsi < 45 -> EXIT",
+        "px <= vwap | (rsi > 70 & ~(macd > signal)) -> TRIM"]},
+     "gap_down_above_sma100": {"rules": ["gap <= -1 & close > sma100 -> PASS"]}}}
+
+Each rule is `<expression> -> <LABEL>`. Expressions use panel column names,
+numbers, + - * /, comparisons (chains allowed), & | ~ (or and/or/not) and
+parentheses. & | ~ bind like and/or/not — looser than comparisons — so
+`px < vwap & rsi < 45` needs no extra parentheses. Expressions are parsed once
+with `ast` into closures over NumPy arrays — no eval — so a screen is a handful
+of array ops over the whole panel. Within a screen the first matching rule
+wins; rows matching nothing get the default.
+NaN compares False, so a missing VWAP never satisfies `px <= vwap`.
+
+Usage:
+  python -m tools.rules overlay_vwap_macd_rsi.csv [--rules rules.json]   # dry-run over a CSV
+"""
+
+from __future__ import annotations
+import argparse, ast, io, json, operator, os, sys, tokenize
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+RULES_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rules.json")
+
+# Fallback when no rules file exists: the original hard-coded heuristics.
+DEFAULT_RULES = {
+    "screens": {
+        "Guidance": {"default": "HOLD", "rules": [
+            "px <= vwap & ~(macd > signal) & rsi < 45 -> EXIT",
+            "px <= vwap | (rsi > 70 & ~(macd > signal)) -> TRIM",
+        ]},
+        "gap_down_above_sma100": {"rules": ["gap <= -1 & close > sma100 -> PASS"]},
+    }
+}
+
+Panel = Dict[str, np.ndarray]
+Expr = Callable[[Panel], np.ndarray]
+
+_BIN = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.true_divide}
+_LOGICAL = {"&": "and", "|": "or", "~": "not"}
+_CMP = {ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge,
+        ast.Eq: operator.eq, ast.NotEq: operator.ne}
+
+def _truth(a: np.ndarray) -> np.ndarray:
+    a = np.asarray(a)
+    return a if a.dtype == bool else np.nan_to_num(a.astype(float)) != 0
+
+class RuleError(ValueError):
+    pass
+
+def _logical_ops(text: str) -> str:
+    """Rewrite & | ~ as and/or/not so they get boolean (not bitwise) precedence."""
+    toks = [(tokenize.NAME, _LOGICAL[t.string]) if t.type == tokenize.OP and t.string in _LOGICAL
+            else (t.type, t.string) for t in tokenize.generate_tokens(io.StringIO(text.strip()).readline)]
+    return tokenize.untokenize(toks)
+
+def compile_expr(text: str) -> Expr:
+    try:
+        tree = ast.parse(_logical_ops(text), mode="eval").body
+    except (SyntaxError, tokenize.TokenError) as e:
+        raise RuleError(f"cannot parse rule expression {text!r}: {e}") from None
+
+    def build(node: ast.AST) -> Expr:
+        if isinstance(node, ast.Name):
+            name = node.id
+            def col(p: Panel) -> np.ndarray:
+                if name not in p:
+                    raise RuleError(f"unknown column {name!r} (have: {', '.join(sorted(p))})")
+                return p[name]
+            return col
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, bool)):
+            v = float(node.value)
+            return lambda p: v
+        if isinstance(node, ast.UnaryOp):
+            f = build(node.operand)
+            if isinstance(node.op, ast.Not):
+                return lambda p: ~_truth(f(p))
+            if isinstance(node.op, ast.USub):
+                return lambda p: -f(p)
+        if isinstance(node, ast.BinOp) and type(node.op) in _BIN:
+            op, l, r = _BIN[type(node.op)], build(node.left), build(node.right)
+            return lambda p: op(l(p), r(p))
+        if isinstance(node, ast.BoolOp):
+            parts = [build(v) for v in node.values]
+            op = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            def boolop(p: Panel) -> np.ndarray:
+                out = _truth(parts[0](p))
+                for f in parts[1:]:
+                    out = op(out, _truth(f(p)))
+                return out
+            return boolop
+        if isinstance(node, ast.Compare) and all(type(o) in _CMP for o in node.ops):
+            terms = [build(node.left)] + [build(c) for c in node.comparators]
+            ops = [_CMP[type(o)] for o in node.ops]
+            def compare(p: Panel) -> np.ndarray:
+                vals = [t(p) for t in terms]
+                with np.errstate(invalid="ignore"):
+                    out = ops[0](vals[0], vals[1])
+                    for i in range(1, len(ops)):
+                        out = np.logical_and(out, ops[i](vals[i], vals[i + 1]))
+                return np.asarray(out, dtype=bool)
+            return compare
+        raise RuleError(f"unsupported syntax in rule {text!r}: {ast.dump(node)[:60]}")
+
+    return build(tree)
+
+class Screen:
+    """Ordered rules for one named output; evaluate() returns (labels, fired rule index or -1)."""
+
+    def __init__(self, name: str, spec: Dict[str, Any]):
+        self.name = name
+        self.default = spec.get("default")
+        self.rules: List[tuple[str, str, Expr]] = []
+        for text in spec.get("rules", []):
+            if "->" not in text:
+                raise RuleError(f"{name}: rule needs '-> LABEL': {text!r}")
+            expr, label = text.rsplit("->", 1)
+            self.rules.append((text.strip(), label.strip(), compile_expr(expr)))
+
+    def evaluate(self, panel: Panel, n: int) -> tuple[np.ndarray, np.ndarray]:
+        labels = np.full(n, self.default, dtype=object)
+        fired = np.full(n, -1, dtype=np.int64)
+        open_ = np.ones(n, dtype=bool)
+        for i, (_, label, expr) in enumerate(self.rules):
+            hit = np.broadcast_to(_truth(expr(panel)), (n,)) & open_
+            labels[hit], fired[hit] = label, i
+            open_ &= ~hit
+        return labels, fired
+
+    def rule_text(self, fired: np.ndarray) -> np.ndarray:
+        texts = np.array([r[0] for r in self.rules] + [None], dtype=object)
+        return texts[fired]  # -1 → trailing None
+
+class RuleSet:
+    def __init__(self, spec: Dict[str, Any]):
+        self.screens = {name: Screen(name, s) for name, s in spec.get("screens", {}).items()}
+
+    def evaluate(self, panel: Panel) -> Dict[str, Dict[str, np.ndarray]]:
+        """All screens in one pass → {screen: {"label": [...], "rule": [...]}}."""
+        n = len(next(iter(panel.values()))) if panel else 0
+        out = {}
+        for name, screen in self.screens.items():
+            labels, fired = screen.evaluate(panel, n)
+            out[name] = {"label": labels, "rule": screen.rule_text(fired)}
+        return out
+
+def load_rules(path: Optional[str] = None) -> RuleSet:
+    path = path or os.environ.get("RULES_FILE") or RULES_FILE
+    if not os.path.exists(path):
+        print(f"[rules] {path} not found; using built-in defaults")
+        return RuleSet(DEFAULT_RULES)
+    with open(path, "r", encoding="utf-8") as f:
+        return RuleSet(json.load(f))
+
+def panel_from_rows(rows: List[Dict[str, Any]], cols: List[str]) -> Panel:
+    """Row dicts → float64 columns (None → NaN, bools → 0/1)."""
+    return {c: np.array([np.nan if r.get(c) is None else float(r[c]) for r in rows], dtype=np.float64)
+            for c in cols}
+
+def main(argv=None):
+    import pandas as pd
+    ap = argparse.ArgumentParser(prog="leaps rules")
+    ap.add_argument("overlay")
+    ap.add_argument("--rules", default=None)
+    args = ap.parse_args(argv)
+    rs = load_rules(args.rules)
+    df = pd.read_csv(args.overlay)
+    alias = {"px": "LastPx", "vwap": "VWAP", "rsi": "RSI14", "sma100": "SMA100", "gap": "Gap%", "close": "LastPx",
+             "vwap_sd": "VWAP_SD", "vwap_z": "VWAP_Z"}
+    for c in df.columns:  # intraday columns: RSI14_5m → rsi_5m, MACDh_5m → macdh_5m, EMA20_5m → ema20_5m
+        k, _, tf = c.partition("_")
+        if k in ("RSI14", "MACDh", "EMA20") and tf.endswith("m"):
+            alias[f"{'rsi' if k == 'RSI14' else k.lower()}_{tf}"] = c
+    panel = {k: pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=float) for k, c in alias.items() if c in df}
+    if "MACD>Signal" in df:  # CSV only keeps the crossover flag
+        flag = df["MACD>Signal"].astype(str).str.lower().eq("true").to_numpy()
+        panel["macd"], panel["signal"] = flag.astype(float), np.zeros(len(df))
+    for name, res in rs.evaluate(panel).items():
+        df[name], df[f"{name}Rule"] = res["label"], res["rule"]
+    print(df.to_string(index=False))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Row-level delta publishing between intraday runs.
+
+Each run gets a sequence number. Every FULL_EVERY runs (and whenever the day,
+a CSV header or a non-keyed artifact changes, or a CSV has empty or duplicate
+keys) a full snapshot is published via tools.snapshot_manifest; in between, the
+run is diffed against the previous published state by key (Ticker / OCC) and
+only a compact delta is written:
+
+  <snapshot_dir>/deltas/<seq:06d>.json
+  {"seq", "prev_seq", "full_seq", "snapshot_id", "generated_utc",
+   "artifacts": {"<name>": {"key", "upserts": [row...], "deletes": [key...],
+                            "order": [key...], "sha256"}}}
+
+`sha256` is the hash of the canonical CSV (render_csv) after applying the delta,
+so a reader can verify it rebuilt exactly the producer's state. latest.json keeps
+pointing at the base manifest and carries "seq"/"full_seq"; a consumer applies
+deltas full_seq+1..seq in order and resyncs from the full snapshot on a gap.
+
+Usage:
+  python -m tools.snapshot_delta [--full-every 12] [--data-root data] [--pointer latest.json]
+      overlay_vwap_macd_rsi.csv option_pl.csv gapdown_above_100sma.csv
+
+Env:
+  FULL_EVERY  -> runs between full snapshots (default 12)
+"""
+
+from __future__ import annotations
+import argparse, csv, io, json, os, sys
+import datetime as dt
+from typing import Any, Callable, Dict, List, Optional
+
+from tools.snapshot_manifest import (
+    MANIFEST_NAME, POINTER_PATH, atomic_write_bytes, publish_snapshot, sha256_bytes, write_pointer,
+)
+
+ROW_KEYS = {
+    "overlay_vwap_macd_rsi.csv": "Ticker",
+    "option_pl.csv": "OCC",
+    "gapdown_above_100sma.csv": "Ticker",
+}
+FULL_EVERY = int(os.environ.get("FULL_EVERY", "12"))
+
+# ---------- Keyed CSV state ----------
+def parse_csv(data: bytes, key: str) -> Dict[str, Any]:
+    """
+    CSV bytes → {"header", "order", "rows": {key: {col: str}}, "bad_keys"}; cells stay as text
+    for exact round trips. "bad_keys" counts rows whose key is empty or repeats an earlier
+    row's, which the keyed state cannot represent.
+    """
+    rdr = csv.DictReader(io.StringIO(data.decode("utf-8")))
+    rows: Dict[str, Dict[str, str]] = {}
+    bad = 0
+    for r in rdr:
+        k = r.get(key) or ""
+        if not k.strip() or k in rows:
+            bad += 1
+        rows[k] = r
+    return {"header": list(rdr.fieldnames or []), "order": list(rows), "rows": rows, "bad_keys": bad}
+
+def render_csv(state: Dict[str, Any]) -> bytes:
+    if not state["header"]:
+        return b""
+    buf = io.StringIO()
+    w = csv.DictWriter(buf, fieldnames=state["header"], lineterminator="\n", extrasaction="ignore")
+    w.writeheader()
+    for k in state["order"]:
+        w.writerow(state["rows"][k])
+    return buf.getvalue().encode("utf-8")
+
+def diff_state(prev: Dict[str, Any], cur: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Upserts/deletes turning prev into cur, or None if nothing changed."""
+    upserts = [cur["rows"][k] for k in cur["order"] if prev["rows"].get(k) != cur["rows"][k]]
+    deletes = [k for k in prev["order"] if k not in cur["rows"]]
+    if not upserts and not deletes and prev["order"] == cur["order"]:
+        return None
+    return {"upserts": upserts, "deletes": deletes, "order": cur["order"]}
+
+def apply_delta(state: Dict[str, Any], change: Dict[str, Any], key: str) -> Dict[str, Any]:
+    rows = dict(state["rows"])
+    for k in change.get("deletes", []):
+        rows.pop(k, None)
+    for r in change.get("upserts", []):
+        rows[r.get(key, "")] = r
+    return {"header": state["header"], "order": list(change["order"]), "rows": rows}
+
+def delta_path(snapshot_dir: str, seq: int) -> str:
+    return f"{snapshot_dir.rstrip('/')}/deltas/{seq:06d}.json"
+
+def replay(base: Dict[str, bytes], full_seq: int, upto: int,
+           load_delta: Callable[[int], Optional[Dict[str, Any]]],
+           start: Optional[Dict[str, bytes]] = None, start_seq: Optional[int] = None) -> Dict[str, bytes]:
+    """
+    Apply deltas (start_seq or full_seq)+1 .. upto onto the artifact bytes and return the new bytes.
+    Raises LookupError on a gap (missing delta, broken prev_seq chain or checksum mismatch).
+    """
+    cur = dict(start if start is not None else base)
+    seq = start_seq if start is not None else full_seq
+    states: Dict[str, Dict[str, Any]] = {}
+    while seq < upto:
+        d = load_delta(seq + 1)
+        if not d or d.get("seq") != seq + 1 or d.get("prev_seq") != seq:
+            raise LookupError(f"delta gap at seq {seq + 1}")
+        for name, change in d.get("artifacts", {}).items():
+            key = ROW_KEYS[name]
+            st = states.get(name) or parse_csv(cur.get(name, b""), key)
+            st = apply_delta(st, change, key)
+            data = render_csv(st)
+            if sha256_bytes(data) != change.get("sha256"):
+                raise LookupError(f"checksum mismatch for {name} at seq {seq + 1}")
+            states[name], cur[name] = st, data
+        seq += 1
+    return cur
+
+# ---------- Producer ----------
+def _read(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+def _load_json(path: str) -> Optional[Dict[str, Any]]:
+    raw = _read(path)
+    return json.loads(raw) if raw else None
+
+def publish_run(files: List[str], data_root: str = "data", pointer: str = POINTER_PATH,
+                full_every: int = FULL_EVERY) -> Dict[str, Any]:
+    """Publish one run as a delta against the current pointer, or as a full snapshot when required."""
+    now = dt.datetime.now(dt.timezone.utc)
+    ptr = _load_json(pointer) or {}
+    man = _load_json(ptr["manifest"]) if ptr.get("manifest") else None
+    seq = int(ptr.get("seq", 0))
+    full_seq = int(ptr.get("full_seq", seq))
+
+    cur = {os.path.basename(f): (_read(f) or b"") for f in files}
+    reason = None
+    if not man or man.get("seq") is None:
+        reason = "no sequenced snapshot yet"
+    elif not man["snapshot_id"].startswith(now.strftime("%Y-%m-%d")):
+        reason = "new trading day"
+    elif seq + 1 - full_seq >= full_every:
+        reason = f"full snapshot period ({full_every})"
+    elif set(cur) != set(man["artifacts"]):
+        reason = "artifact set changed"
+
+    prev: Dict[str, bytes] = {}
+    if reason is None:
+        snapshot_dir = ptr["date_dir"]
+        base = {n: (_read(a["path"]) or b"") for n, a in man["artifacts"].items()}
+        try:
+            prev = replay(base, full_seq, seq, lambda s: _load_json(delta_path(snapshot_dir, s)))
+        except LookupError as e:
+            reason = f"cannot rebuild previous state ({e})"
+    states: Dict[str, tuple] = {}
+    if reason is None:
+        for name, data in cur.items():
+            if name not in ROW_KEYS:
+                if data != prev.get(name):
+                    reason = f"non-keyed artifact changed ({name})"
+                continue
+            key = ROW_KEYS[name]
+            states[name] = (parse_csv(prev.get(name, b""), key), parse_csv(data, key))
+            if states[name][0]["header"] != states[name][1]["header"]:
+                reason = f"schema changed ({name})"
+            elif states[name][0]["bad_keys"] or states[name][1]["bad_keys"]:
+                reason = f"empty or duplicate {key} keys ({name})"
+
+    if reason is not None:
+        sid = now.strftime("%Y-%m-%d")
+        if os.path.exists(f"{data_root.rstrip('/')}/{sid}/{MANIFEST_NAME}"):
+            sid = now.strftime("%Y-%m-%dT%H%M%SZ")
+        publish_snapshot(files, data_root, sid, pointer, seq=seq + 1)
+        print(f"[delta] seq={seq + 1}: full snapshot {data_root}/{sid} ({reason})")
+        return {"seq": seq + 1, "full": True, "reason": reason}
+
+    changes: Dict[str, Any] = {}
+    for name, (p_state, c_state) in states.items():
+        change = diff_state(p_state, c_state)
+        if change is not None:
+            change["key"] = ROW_KEYS[name]
+            change["sha256"] = sha256_bytes(render_csv(c_state))
+            changes[name] = change
+
+    delta = {"seq": seq + 1, "prev_seq": seq, "full_seq": full_seq, "snapshot_id": man["snapshot_id"],
+             "generated_utc": now.strftime("%Y-%m-%dT%H:%M:%SZ"), "artifacts": changes}
+    path = delta_path(ptr["date_dir"], seq + 1)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    atomic_write_bytes(path, (json.dumps(delta, separators=(",", ":")) + "\n").encode("utf-8"))
+    write_pointer(ptr["date_dir"], pointer, seq=seq + 1, full_seq=full_seq,
+                  generated_utc=delta["generated_utc"])
+    n_up = sum(len(c["upserts"]) for c in changes.values())
+    n_del = sum(len(c["deletes"]) for c in changes.values())
+    print(f"[delta] seq={seq + 1}: {path} ({n_up} upserts, {n_del} deletes)")
+    return {"seq": seq + 1, "full": False, "path": path}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="leaps publish-delta")
+    ap.add_argument("files", nargs="+")
+    ap.add_argument("--data-root", default="data")
+    ap.add_argument("--pointer", default=POINTER_PATH)
+    ap.add_argument("--full-every", type=int, default=FULL_EVERY)
+    args = ap.parse_args(argv)
+    publish_run(args.files, args.data_root, args.pointer, max(1, args.full_every))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
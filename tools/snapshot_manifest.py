@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Atomic snapshot publishing with a checksummed manifest.
+
+Each producer run is published as an immutable snapshot directory
+(data/<snapshot_id>/) holding the artifacts plus a single manifest.json:
+
+  {"snapshot_id", "generated_utc", "artifacts": {
+      "<name>": {"path", "bytes", "rows", "sha256", "schema"}}}
+
+Artifacts are written first, the manifest last, and latest.json (which carries
+the manifest path and its SHA-256) after that — so a reader never sees a
+pointer to a half-published snapshot and can decide what changed with one
+small request.
+
+Every pointer write also records the snapshot in <data_root>/index.json, one entry
+per trading day (the day's latest snapshot and sequence), so readers that want
+history can list the published days without walking the calendar:
+
+  {"updated_utc", "days": {"YYYY-MM-DD": {"date_dir", "manifest", "manifest_sha256",
+                                          "generated_utc", "seq", "full_seq"}}}
+
+Usage:
+  python -m tools.snapshot_manifest [--data-root data] [--snapshot-id YYYY-MM-DD]
+      [--pointer latest.json | --no-pointer] [--force]
+      overlay_vwap_macd_rsi.csv option_pl.csv gapdown_above_100sma.csv
+  python -m tools.snapshot_manifest --repoint data/2025-10-29   # rewrite latest.json only
+"""
+
+from __future__ import annotations
+import argparse, csv, hashlib, io, json, os, sys, tempfile
+import datetime as dt
+from typing import Any, Dict, List, Optional
+
+MANIFEST_NAME = "manifest.json"
+POINTER_PATH = "latest.json"
+INDEX_NAME = "index.json"
+
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def atomic_write_bytes(path: str, data: bytes):
+    d = os.path.dirname(os.path.abspath(path)) or "."
+    fd, tmp = tempfile.mkstemp(prefix=".tmp_", dir=d)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def _cell_type(v: str) -> str:
+    if v == "":
+        return "empty"
+    if v in ("True", "False"):
+        return "bool"
+    try:
+        int(v)
+        return "int"
+    except ValueError:
+        pass
+    try:
+        float(v)
+        return "float"
+    except ValueError:
+        return "str"
+
+def _widen(a: str, b: str) -> str:
+    if a == "empty" or a == b:
+        return b
+    if b == "empty":
+        return a
+    return "float" if {a, b} == {"int", "float"} else "str"
+
+def csv_schema(data: bytes) -> tuple[int, List[Dict[str, str]]]:
+    """Row count and [{"name","type"}] for a CSV payload (types: bool/int/float/str/empty)."""
+    rows = list(csv.reader(io.StringIO(data.decode("utf-8"))))
+    if not rows:
+        return 0, []
+    header, body = rows[0], rows[1:]
+    types = ["empty"] * len(header)
+    for r in body:
+        for i, v in enumerate(r[:len(header)]):
+            types[i] = _widen(types[i], _cell_type(v))
+    return len(body), [{"name": c, "type": t} for c, t in zip(header, types)]
+
+def artifact_entry(rel_path: str, data: bytes) -> Dict[str, Any]:
+    rows, schema = (csv_schema(data) if rel_path.endswith(".csv") else (None, None))
+    return {"path": rel_path, "bytes": len(data), "rows": rows,
+            "sha256": sha256_bytes(data), "schema": schema}
+
+def verify_artifact(entry: Dict[str, Any], data: Optional[bytes]) -> bool:
+    return data is not None and len(data) == entry.get("bytes") and sha256_bytes(data) == entry.get("sha256")
+
+def load_manifest(snapshot_dir: str) -> Optional[Dict[str, Any]]:
+    path = os.path.join(snapshot_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def write_pointer(snapshot_dir: str, pointer: str = POINTER_PATH, **extra: Any) -> Dict[str, Any]:
+    """
+    latest.json → {"date_dir", "generated_utc", "snapshot_id", "manifest", "manifest_sha256"}
+    (+ "seq"/"full_seq" for sequenced snapshots; `extra` overrides, e.g. after a delta run).
+    """
+    mpath = os.path.join(snapshot_dir, MANIFEST_NAME)
+    with open(mpath, "rb") as f:
+        raw = f.read()
+    man = json.loads(raw)
+    ptr = {
+        "date_dir": snapshot_dir.rstrip("/"),
+        "generated_utc": man["generated_utc"],
+        "snapshot_id": man["snapshot_id"],
+        "manifest": mpath.replace(os.sep, "/"),
+        "manifest_sha256": sha256_bytes(raw),
+    }
+    if man.get("seq") is not None:
+        ptr["seq"] = ptr["full_seq"] = man["seq"]
+    ptr.update(extra)
+    atomic_write_bytes(pointer, (json.dumps(ptr, indent=2) + "\n").encode("utf-8"))
+    update_index(ptr)
+    return ptr
+
+def update_index(ptr: Dict[str, Any]) -> Dict[str, Any]:
+    """Record the pointer's snapshot as its day's entry in <data_root>/index.json."""
+    data_root = os.path.dirname(ptr["date_dir"]) or "."
+    path = os.path.join(data_root, INDEX_NAME)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+    days = index.get("days") or {}
+    days[ptr["snapshot_id"][:10]] = {k: ptr[k] for k in ("date_dir", "manifest", "manifest_sha256",
+                                                          "generated_utc", "seq", "full_seq") if k in ptr}
+    index = {"updated_utc": dt.datetime.now(dt.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+             "days": dict(sorted(days.items()))}
+    atomic_write_bytes(path, (json.dumps(index, indent=1) + "\n").encode("utf-8"))
+    return index
+
+def refresh_artifacts(snapshot_dir: str, names: List[str], pointer: str = POINTER_PATH) -> Optional[Dict[str, Any]]:
+    """
+    Re-hash artifacts rewritten in place (e.g. a backfill) into the snapshot's manifest,
+    keeping its generated_utc (the snapshot time), then carry the new manifest SHA-256
+    into latest.json / index.json wherever they reference this manifest.
+    """
+    man = load_manifest(snapshot_dir)
+    if man is None:
+        return None
+    for name in names:
+        entry = man["artifacts"].get(name) or {"path": f"{snapshot_dir.rstrip('/')}/{name}"}
+        with open(os.path.join(snapshot_dir, name), "rb") as f:
+            man["artifacts"][name] = artifact_entry(entry["path"], f.read())
+    mpath = os.path.join(snapshot_dir, MANIFEST_NAME)
+    raw = (json.dumps(man, indent=2) + "\n").encode("utf-8")
+    atomic_write_bytes(mpath, raw)
+    sha, rel = sha256_bytes(raw), mpath.replace(os.sep, "/")
+    index_path = os.path.join(os.path.dirname(snapshot_dir.rstrip("/")) or ".", INDEX_NAME)
+    for path, indent in ((pointer, 2), (index_path, 1)):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                doc = json.load(f)
+        except (OSError, ValueError):
+            continue
+        refs = [doc] if path == pointer else list((doc.get("days") or {}).values())
+        hit = [r for r in refs if r.get("manifest") == rel]
+        for r in hit:
+            r["manifest_sha256"] = sha
+        if hit:
+            atomic_write_bytes(path, (json.dumps(doc, indent=indent) + "\n").encode("utf-8"))
+    return man
+
+def publish_snapshot(files: List[str], data_root: str = "data", snapshot_id: Optional[str] = None,
+                     pointer: Optional[str] = POINTER_PATH, force: bool = False,
+                     seq: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Copy `files` into data_root/snapshot_id, write manifest.json (+ legacy READY),
+    then repoint latest.json. Missing inputs are published as empty artifacts so the
+    snapshot shape is stable. Refuses to touch an already-published snapshot unless force.
+    """
+    now = dt.datetime.now(dt.timezone.utc)
+    snapshot_id = snapshot_id or now.strftime("%Y-%m-%d")
+    snapshot_dir = f"{data_root.rstrip('/')}/{snapshot_id}"
+    if os.path.exists(os.path.join(snapshot_dir, MANIFEST_NAME)) and not force:
+        raise FileExistsError(f"snapshot already published: {snapshot_dir}")
+    os.makedirs(snapshot_dir, exist_ok=True)
+
+    artifacts: Dict[str, Any] = {}
+    for src in files:
+        name = os.path.basename(src)
+        data = b""
+        if os.path.exists(src):
+            with open(src, "rb") as f:
+                data = f.read()
+        else:
+            print(f"[snapshot] {src} missing; publishing empty artifact")
+        dest = f"{snapshot_dir}/{name}"
+        atomic_write_bytes(dest, data)
+        artifacts[name] = artifact_entry(dest, data)
+
+    manifest = {"snapshot_id": snapshot_id,
+                "generated_utc": now.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "artifacts": artifacts}
+    if seq is not None:
+        manifest["seq"] = seq
+    atomic_write_bytes(os.path.join(snapshot_dir, MANIFEST_NAME),
+                       (json.dumps(manifest, indent=2) + "\n").encode("utf-8"))
+    atomic_write_bytes(os.path.join(snapshot_dir, "READY"), b"")
+    if pointer:
+        write_pointer(snapshot_dir, pointer)
+    return manifest
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="leaps publish")
+    ap.add_argument("files", nargs="*")
+    ap.add_argument("--data-root", default="data")
+    ap.add_argument("--snapshot-id", default=None, help="default: UTC date (YYYY-MM-DD)")
+    ap.add_argument("--pointer", default=POINTER_PATH)
+    ap.add_argument("--no-pointer", action="store_true")
+    ap.add_argument("--force", action="store_true", help="republish over an existing snapshot")
+    ap.add_argument("--repoint", metavar="SNAPSHOT_DIR", help="only rewrite the pointer for an existing snapshot")
+    args = ap.parse_args(argv)
+
+    if args.repoint:
+        ptr = write_pointer(args.repoint, args.pointer)
+        print(f"[snapshot] {args.pointer} -> {ptr['manifest']}")
+        return 0
+    if not args.files:
+        ap.error("no artifacts given")
+    try:
+        man = publish_snapshot(args.files, args.data_root, args.snapshot_id,
+                               None if args.no_pointer else args.pointer, args.force)
+    except FileExistsError as e:
+        print(f"::error::{e} (use --force to republish)")
+        return 1
+    for name, a in man["artifacts"].items():
+        print(f"[snapshot] {a['path']}: {a['bytes']} bytes, rows={a['rows']}, sha256={a['sha256'][:12]}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Streaming market-data ingestion (Tradier /v1/markets/events, HTTP streaming).
+
+- One session (POST /v1/markets/events/session) + one long-lived streaming POST
+  carries trades and quotes for every symbol; no REST rate-limit usage.
+- Per tick: session VWAP/σ (tools.vwap_engine.VWAP anchored at 09:30 ET, trades
+  before 16:00), last price, bid/ask and mark (mid) for equities and OCC options.
+- Reconnects with a fresh session on drop; resets accumulators on a new ET day.
+- Ticks only count from the first 15-minute boundary after a (re)connect;
+  StreamState.seed folds in the session bars before it, and lookup()["seeded"]
+  says whether the VWAP covers the session from 09:30.
+- Works offline against tools/stream_replay.py (set --base to the replay server).
+
+Usage:
+  python -m tools.stream_ingest QQQ META META260220C00700000 [--base https://api.tradier.com]
+      [--out stream_snapshot.json] [--every 5] [--record ticks.ndjson] [--max-events N]
+
+Env:
+  TRADIER_TOKEN  -> Bearer token (not needed against the local replay server)
+"""
+
+from __future__ import annotations
+import argparse, json, os, sys, threading, time
+import datetime as dt
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import requests
+
+from tools.vwap_engine import VWAP
+
+TRADIER = "https://api.tradier.com"
+HEADERS = lambda tok: {"Authorization": f"Bearer {tok}", "Accept": "application/json"}
+ET = ZoneInfo("America/New_York")
+ALIGN_MS = 15 * 60_000  # 1/5/15-minute bars from 09:30 all end on this grid, so bars and ticks never overlap
+
+def _f(v) -> Optional[float]:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+class StreamState:
+    """
+    Per-symbol live state, updated in place per event.
+    Slots: [vwap, last, bid, ask, trades, updated_ms, seeded].
+    """
+    VW, LAST, BID, ASK, TRADES, UPDATED, SEEDED = range(7)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sym: Dict[str, list] = {}
+        self.day: Optional[dt.date] = None
+        self.session_ms = (0, 0)
+        self.since_ms = 0  # ticks are counted from here on (grid point after the last connect)
+        self.events = 0
+
+    def _roll_day(self, ts_ms: int):
+        day = dt.datetime.fromtimestamp(ts_ms / 1000, ET).date()
+        if day == self.day:
+            return
+        self.day = day
+        o = dt.datetime.combine(day, dt.time(9, 30), ET)
+        c = dt.datetime.combine(day, dt.time(16, 0), ET)
+        self.session_ms = (int(o.timestamp() * 1000), int(c.timestamp() * 1000))
+        self.since_ms = self.session_ms[0]  # connected through the open: nothing to seed
+        for row in self.sym.values():
+            row[self.VW].reset(self.session_ms[0])
+            row[self.TRADES] = 0
+            row[self.SEEDED] = True
+
+    def _new_row(self) -> list:
+        return [VWAP(self.since_ms), None, None, None, 0, 0, self.since_ms <= self.session_ms[0]]
+
+    def connected(self, ts_ms: int):
+        """
+        A (re)connect at ts_ms: ticks missed before it are gone, so every accumulator
+        restarts at the next ALIGN_MS boundary and waits for seed() to cover 09:30 → there.
+        """
+        with self.lock:
+            if ts_ms >= self.session_ms[1] or self.day is None:
+                self._roll_day(ts_ms)
+            self.since_ms = max(-(-ts_ms // ALIGN_MS) * ALIGN_MS, self.session_ms[0])
+            for row in self.sym.values():
+                row[self.VW].reset(self.since_ms)
+                row[self.TRADES] = 0
+                row[self.SEEDED] = self.since_ms <= self.session_ms[0]
+
+    def seed(self, sym: str, t: np.ndarray, price: np.ndarray, volume: np.ndarray) -> bool:
+        """
+        Fold session bars (epoch-ms starts, time-sorted) from before since_ms into sym's
+        accumulator, once. Waits for a bar at or past since_ms, so every bar folded in
+        is final. Returns whether sym's VWAP now covers the session.
+        """
+        t = np.asarray(t, dtype=np.int64)
+        with self.lock:
+            row = self.sym.get(sym)
+            if row is None:
+                row = self.sym[sym] = self._new_row()
+            if row[self.SEEDED]:
+                return True
+            if not len(t) or t[-1] < self.since_ms:
+                return False
+            keep = (t >= self.session_ms[0]) & (t < self.since_ms)
+            seed = VWAP(self.session_ms[0])
+            seed.update(t[keep], np.asarray(price)[keep], np.asarray(volume)[keep])
+            row[self.VW].merge(seed)
+            row[self.SEEDED] = True
+            return True
+
+    def on_event(self, evt: dict):
+        sym = evt.get("symbol")
+        kind = evt.get("type")
+        if not sym or kind not in ("trade", "quote", "timesale"):
+            return
+        ts = int(_f(evt.get("date") or evt.get("biddate") or evt.get("askdate")) or time.time() * 1000)
+        with self.lock:
+            if ts >= self.session_ms[1] or self.day is None:
+                self._roll_day(ts)
+            row = self.sym.get(sym)
+            if row is None:
+                row = self.sym[sym] = self._new_row()
+            self.events += 1
+            row[self.UPDATED] = max(row[self.UPDATED], ts)
+            if kind == "quote":
+                row[self.BID], row[self.ASK] = _f(evt.get("bid")), _f(evt.get("ask"))
+                return
+            px, size = _f(evt.get("price") or evt.get("last")), _f(evt.get("size")) or 0.0
+            if px is None:
+                return
+            row[self.LAST] = px
+            if self.since_ms <= ts < self.session_ms[1] and size > 0:
+                row[self.VW].add_tick(ts, px, size)
+                row[self.TRADES] += 1
+
+    def lookup(self, sym: str) -> Optional[dict]:
+        with self.lock:
+            row = self.sym.get(sym)
+            if row is None:
+                return None
+            bid, ask = row[self.BID], row[self.ASK]
+            mark = (bid + ask) / 2.0 if bid and ask and bid > 0 and ask > 0 else row[self.LAST]
+            vw = row[self.VW].stats()
+            return {"symbol": sym, "last": row[self.LAST], "vwap": vw["vwap"], "vwap_sd": vw["sigma"],
+                    "bid": bid, "ask": ask, "mark": mark, "volume": vw["volume"],
+                    "trades": row[self.TRADES], "updated_ms": row[self.UPDATED], "seeded": row[self.SEEDED]}
+
+    def snapshot(self) -> List[dict]:
+        return [self.lookup(s) for s in sorted(self.sym)]
+
+def open_session(base: str, token: str) -> tuple[str, str]:
+    r = requests.post(f"{base}/v1/markets/events/session", headers=HEADERS(token), timeout=10)
+    r.raise_for_status()
+    stream = r.json()["stream"]
+    return stream["url"], stream["sessionid"]
+
+def consume(base: str, token: str, symbols: List[str], state: StreamState,
+            stop: Optional[threading.Event] = None, record: Optional[str] = None,
+            max_events: Optional[int] = None, retries: int = 0) -> int:
+    """
+    Stream events into `state` until stop is set (or max_events read).
+    retries=0 means reconnect forever; returns the number of events consumed.
+    """
+    stop = stop or threading.Event()
+    seen, attempt = 0, 0
+    rec = open(record, "a", encoding="utf-8") if record else None
+    try:
+        while not stop.is_set():
+            try:
+                url, sid = open_session(base, token)
+                data = {"sessionid": sid, "symbols": ",".join(symbols),
+                        "filter": "trade,quote", "linebreak": "true"}
+                with requests.post(url, data=data, headers=HEADERS(token), stream=True, timeout=(5, 90)) as r:
+                    r.raise_for_status()
+                    state.connected(int(time.time() * 1000))
+                    attempt = 0
+                    for line in r.iter_lines():
+                        if stop.is_set():
+                            break
+                        if not line:
+                            continue
+                        try:
+                            evt = json.loads(line)
+                        except ValueError:
+                            continue
+                        state.on_event(evt)
+                        if rec:
+                            rec.write(line.decode("utf-8") + "\n")
+                        seen += 1
+                        if max_events and seen >= max_events:
+                            return seen
+            except (requests.RequestException, KeyError, ValueError) as e:
+                print(f"[stream] connection error: {e}")
+            attempt += 1
+            if retries and attempt > retries:
+                break
+            stop.wait(min(30.0, 1.5 * attempt))
+    finally:
+        if rec:
+            rec.close()
+    return seen
+
+def start_background(symbols: List[str], base: str = TRADIER, token: Optional[str] = None) -> StreamState:
+    """Daemon-thread ingestion for resident processes (leaps_batched_cached.py --serve --stream)."""
+    state = StreamState()
+    tok = token if token is not None else os.environ.get("TRADIER_TOKEN", "").strip()
+    threading.Thread(target=consume, args=(base, tok, symbols, state), daemon=True).start()
+    return state
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="leaps stream")
+    ap.add_argument("symbols", nargs="+")
+    ap.add_argument("--base", default=os.environ.get("TRADIER_STREAM_BASE", TRADIER))
+    ap.add_argument("--out", default="stream_snapshot.json")
+    ap.add_argument("--every", type=float, default=5.0, help="seconds between snapshot writes")
+    ap.add_argument("--record", default=None, help="append raw events (NDJSON) for later replay")
+    ap.add_argument("--max-events", type=int, default=None)
+    args = ap.parse_args(argv)
+
+    token = os.environ.get("TRADIER_TOKEN", "").strip()
+    symbols = [s.upper() for s in args.symbols]
+    state, stop = StreamState(), threading.Event()
+
+    def _writer():
+        while not stop.wait(args.every):
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump({"events": state.events, "symbols": state.snapshot()}, f)
+    threading.Thread(target=_writer, daemon=True).start()
+    try:
+        n = consume(args.base, token, symbols, state, stop, args.record, args.max_events)
+    except KeyboardInterrupt:
+        n = state.events
+    stop.set()
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"events": state.events, "symbols": state.snapshot()}, f)
+    print(f"[stream] {n} events, {len(state.sym)} symbols -> {args.out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
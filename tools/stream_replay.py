@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local stand-in for the Tradier streaming API, for building/testing tools.stream_ingest offline.
+
+Serves:
+  POST /v1/markets/events/session  -> {"stream": {"url": ".../v1/markets/events", "sessionid": "..."}}
+  POST /v1/markets/events          -> newline-delimited JSON events (filtered by symbols/filter)
+
+Events come from a recorded NDJSON file (tools.stream_ingest --record) replayed at
+--speed × real time (0 = as fast as possible), or from a synthetic random walk
+over --synthetic N symbols timestamped "now" (session hours are ignored).
+
+Usage:
+  python -m tools.stream_replay --file ticks.ndjson [--speed 10] [--port 8790]
+  python -m tools.stream_replay --synthetic 2000 [--rate 5000] [--port 8790]
+  python -m tools.stream_ingest QQQ META --base http://127.0.0.1:8790
+"""
+
+from __future__ import annotations
+import argparse, itertools, json, random, sys, time, uuid
+from typing import Iterator, Optional, Set
+from urllib.parse import parse_qs
+
+def recorded_events(path: str, speed: float) -> Iterator[dict]:
+    prev_ts = None
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            evt = json.loads(line)
+            ts = int(float(evt.get("date") or evt.get("biddate") or 0))
+            if speed > 0 and prev_ts is not None and ts > prev_ts:
+                time.sleep(min(5.0, (ts - prev_ts) / 1000.0 / speed))
+            prev_ts = ts or prev_ts
+            yield evt
+
+def synthetic_events(symbols: list[str], rate: float, seed: int = 7) -> Iterator[dict]:
+    rnd = random.Random(seed)
+    px = {s: rnd.uniform(5, 500) for s in symbols}
+    for i in itertools.count():
+        s = symbols[i % len(symbols)] if i < len(symbols) else rnd.choice(symbols)
+        px[s] *= 1 + rnd.gauss(0, 0.0005)
+        now_ms = int(time.time() * 1000)
+        if rnd.random() < 0.5:
+            yield {"type": "trade", "symbol": s, "price": f"{px[s]:.4f}", "size": str(rnd.randint(1, 500)),
+                   "date": str(now_ms), "last": f"{px[s]:.4f}"}
+        else:
+            spread = max(0.01, px[s] * 0.0005)
+            yield {"type": "quote", "symbol": s, "bid": round(px[s] - spread, 4), "ask": round(px[s] + spread, 4),
+                   "biddate": str(now_ms), "askdate": str(now_ms)}
+        if rate > 0:
+            time.sleep(1.0 / rate)
+
+def make_handler(source, host: str, port: int):
+    from http.server import BaseHTTPRequestHandler  # here, not at import: `--help` stays cheap (leaps startup)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.0"  # body ends at connection close, like a chunked stream
+
+        def _params(self) -> dict:
+            n = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(n).decode("utf-8") if n else ""
+            q = self.path.split("?", 1)[1] if "?" in self.path else ""
+            return {k: v[-1] for k, v in {**parse_qs(q), **parse_qs(body)}.items()}
+
+        def do_POST(self):
+            path = self.path.split("?", 1)[0]
+            params = self._params()
+            if path == "/v1/markets/events/session":
+                body = json.dumps({"stream": {"url": f"http://{host}:{port}/v1/markets/events",
+                                              "sessionid": uuid.uuid4().hex}}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            if path != "/v1/markets/events" or not params.get("sessionid"):
+                self.send_error(400, "sessionid required")
+                return
+            wanted: Optional[Set[str]] = set(params["symbols"].split(",")) if params.get("symbols") else None
+            kinds = set((params.get("filter") or "trade,quote").split(","))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            try:
+                for evt in source(wanted):
+                    if evt.get("type") not in kinds or (wanted and evt.get("symbol") not in wanted):
+                        continue
+                    self.wfile.write(json.dumps(evt, separators=(",", ":")).encode("utf-8") + b"\n")
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        do_GET = do_POST
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="leaps stream-replay")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8790)
+    ap.add_argument("--file", help="recorded NDJSON events to replay")
+    ap.add_argument("--speed", type=float, default=0.0, help="replay speed multiplier (0 = no pacing)")
+    ap.add_argument("--synthetic", type=int, default=0, help="number of synthetic symbols (SYM0000...)")
+    ap.add_argument("--rate", type=float, default=2000.0, help="synthetic events/second per connection")
+    args = ap.parse_args(argv)
+    if not args.file and not args.synthetic:
+        ap.error("give --file or --synthetic N")
+
+    if args.file:
+        source = lambda wanted: recorded_events(args.file, args.speed)
+    else:
+        universe = [f"SYM{i:04d}" for i in range(args.synthetic)]
+        source = lambda wanted: synthetic_events(sorted(wanted) if wanted else universe, args.rate)
+    from http.server import ThreadingHTTPServer
+    httpd = ThreadingHTTPServer((args.host, args.port), make_handler(source, args.host, args.port))
+    print(f"[replay] http://{args.host}:{args.port}/v1/markets/events ({args.file or f'{args.synthetic} synthetic symbols'})")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,8 +9,7 @@ Usage:
 """
 
 from __future__ import annotations
-import os, sys, datetime as dt
-import requests
+import argparse, os, sys, datetime as dt
 from zoneinfo import ZoneInfo
 
 def try_timesales(base: str, token: str, symbol: str) -> tuple[int, str]:
@@ -21,6 +20,7 @@ def try_timesales(base: str, token: str, symbol: str) -> tuple[int, str]:
     url = f"{base}/v1/markets/timesales"
     hdr = {"Authorization": f"Bearer {token}", "Accept": "application/json"}
     params = {"symbol": symbol, "interval": "1min", "start": start, "end": end, "session_filter": "open"}
+    import requests  # deferred: only paid when a token is actually probed
     try:
         r = requests.get(url, headers=hdr, params=params, timeout=15)
         if r.status_code != 200:
@@ -31,11 +31,10 @@ def try_timesales(base: str, token: str, symbol: str) -> tuple[int, str]:
     except Exception as e:
         return 0, str(e)
 
-def main():
-    if len(sys.argv) < 2:
-        print("usage: python tools/timesales_probe.py <SYMBOL>")
-        return 2
-    sym = sys.argv[1].upper()
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="leaps probe")
+    ap.add_argument("symbol")
+    sym = ap.parse_args(argv).symbol.upper()
 
     prod_token = os.environ.get("TRADIER_TOKEN", "").strip()
     sand_token = os.environ.get("TRADIER_SANDBOX_TOKEN", "").strip()
@@ -51,6 +50,7 @@ def main():
         print(f"[sandbox] {sym}: {msg}")
     else:
         print("[sandbox] TRADIER_SANDBOX_TOKEN not set")
+    return 0
 
 if __name__ == "__main__":
     sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Day-over-day trend columns across N daily snapshots, computed for every key at once.
+
+Input is one record list per day (oldest → newest), e.g. the overlay CSV rows keyed
+by Ticker or the option P/L rows keyed by OCC. For each metric the rows become one
+days × keys float matrix (NaN where a key has no value that day), and a handful of
+NumPy ops produce, per key:
+
+  <metric>_d1      change since the previous day's snapshot
+  <metric>_streak  consecutive days the metric moved the same way, ending today
+                   (+3 = rose three days running, -2 = fell two; 0 = flat/unknown)
+  <metric>_chg     change over the window (today minus the first day with a value)
+  TrendDays        days in the window on which the key appears
+
+A missing day breaks a streak (NaN never equals a direction).
+"""
+
+from __future__ import annotations
+import math
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+import numpy as np
+
+OVERLAY_KEY, OVERLAY_METRICS = "Ticker", ("RSI14", "LastPx", "VWAP_Z")
+PL_KEY, PL_METRICS = "OCC", ("P/L($)", "P/L(%)", "MidUsed")
+SUFFIXES = ("_d1", "_streak", "_chg")
+
+def _num(v: Any) -> float:
+    if v is None or isinstance(v, bool):
+        return math.nan
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return math.nan
+
+def trend_columns(metrics: Sequence[str]) -> List[str]:
+    return [f"{m}{s}" for m in metrics for s in SUFFIXES] + ["TrendDays"]
+
+def trend_table(days: Sequence[Iterable[Dict[str, Any]]], key: str,
+                metrics: Sequence[str]) -> Dict[Any, Dict[str, Any]]:
+    """{key: {"<metric>_d1", "<metric>_streak", "<metric>_chg", ..., "TrendDays"}} for keys present on the last day."""
+    rows = [list(d) for d in days]
+    if not rows:
+        return {}
+    keys = list(dict.fromkeys(r.get(key) for r in rows[-1] if r.get(key) not in (None, "")))
+    if not keys:
+        return {}
+    col = {k: j for j, k in enumerate(keys)}
+    n_days, n_keys = len(rows), len(keys)
+    mats = {m: np.full((n_days, n_keys), np.nan) for m in metrics}
+    seen = np.zeros((n_days, n_keys), dtype=bool)
+    for i, recs in enumerate(rows):
+        for r in recs:
+            j = col.get(r.get(key))
+            if j is None:
+                continue
+            seen[i, j] = True
+            for m in metrics:
+                mats[m][i, j] = _num(r.get(m))
+
+    out_cols: Dict[str, np.ndarray] = {"TrendDays": seen.sum(axis=0).astype(float)}
+    for m, a in mats.items():
+        if n_days < 2:
+            out_cols.update({f"{m}_d1": np.full(n_keys, np.nan), f"{m}_streak": np.zeros(n_keys),
+                             f"{m}_chg": np.full(n_keys, np.nan)})
+            continue
+        diff = np.diff(a, axis=0)                       # (days-1) × keys, NaN where either side is missing
+        sgn = np.sign(diff)
+        last = sgn[-1]
+        same = (sgn == last) & (last != 0)              # NaN compares False → gaps break the run
+        run = np.cumprod(same[::-1], axis=0).sum(axis=0)
+        ok = np.isfinite(a)
+        first = np.argmax(ok, axis=0)
+        first_val = a[first, np.arange(n_keys)]
+        out_cols[f"{m}_d1"] = diff[-1]
+        out_cols[f"{m}_streak"] = np.where(np.isfinite(last), run * last, 0.0)
+        out_cols[f"{m}_chg"] = np.where(ok.any(axis=0), a[-1] - first_val, np.nan)
+
+    names = trend_columns(metrics)
+    table = {}
+    for j, k in enumerate(keys):
+        rec = {}
+        for c in names:
+            v = float(out_cols[c][j])
+            rec[c] = (int(v) if c.endswith("_streak") or c == "TrendDays"
+                      else (round(v, 4) if math.isfinite(v) else None))
+        table[k] = rec
+    return table
+
+def with_trends(records: Iterable[Dict[str, Any]], key: str, table: Dict[Any, Dict[str, Any]],
+                metrics: Sequence[str]) -> Iterator[Dict[str, Any]]:
+    """Stream records with their trend columns appended (blank for keys without history)."""
+    blank = dict.fromkeys(trend_columns(metrics))
+    for r in records:
+        yield {**r, **table.get(r.get(key), blank)}
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Resumable, parallel VWAP backfill for published overlays under data/.
+
+For every data/<snapshot>/overlay_vwap_macd_rsi.csv with empty VWAP cells, each
+(snapshot, ticker) pair fetches that session's 1-minute timesales up to the
+snapshot time and computes VWAP / σ with tools.vwap_engine:
+
+- Snapshot time: the time in an intraday id (YYYY-MM-DDTHHMMSSZ), else the
+  manifest's generated_utc when it falls on the directory's date, else 16:00 ET
+  on that date. A time outside the session falls back to the last close before
+  it (weekends skipped; holidays simply return no bars).
+- Pairs run on a thread pool; every HTTP attempt (retries included) first takes a
+  token from one shared bucket (BACKFILL_RPS, default 2/s = Tradier's 120 req/min
+  market-data budget), so the worker count only sets how many requests overlap.
+- Each finished pair is appended to a checkpoint (NDJSON, <CACHE_DIR>/vwap_backfill.ndjson)
+  keyed by snapshot (relative to --data-root), ticker and as-of time. A rerun after an
+  interruption skips those pairs and rewrites their rows from the checkpoint without
+  refetching. Only a 200 with no bars is checkpointed as empty; a pair whose requests
+  keep failing (429s, 5xx, connection errors) is left out and retried next run.
+- As soon as a snapshot's last pair finishes, its overlay is rewritten atomically
+  (VWAP, Px_vs_VWAP, and VWAP_SD / VWAP_Z where the CSV has them; other cells are
+  untouched) and its manifest.json re-hashed, with latest.json / index.json following
+  when they reference it. Snapshots with intraday deltas are skipped: rewriting their
+  base would break the delta checksums.
+
+Guidance is not recomputed.
+
+Usage:
+  python -m tools.vwap_backfill [--data-root data] [--since 2025-10-01] [--until 2025-10-31]
+      [--workers 8] [--rps 2] [--checkpoint PATH] [--force] [--retry-empty] [--dry-run]
+
+Env:
+  TRADIER_TOKEN, TRADIER_BASE (see tools/vwap_utils.py), BACKFILL_RPS, CACHE_DIR
+"""
+
+from __future__ import annotations
+import argparse, csv, io, json, os, re, sys, threading, time
+import datetime as dt
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+ET = ZoneInfo("America/New_York")
+OVERLAY = "overlay_vwap_macd_rsi.csv"
+CACHE_DIR = os.environ.get("CACHE_DIR", ".leaps_cache")
+CHECKPOINT = "vwap_backfill.ndjson"
+RPS = float(os.environ.get("BACKFILL_RPS", "2"))
+_DIR_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})(?:T(\d{6})Z)?$")
+
+class TokenBucket:
+    """Blocking token bucket shared by the workers: `rate` tokens/s, bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate, self.burst = float(rate), max(float(burst), 1.0)
+        self.tokens, self.t = self.burst, time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.t) * self.rate)
+                self.t = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait = (1.0 - self.tokens) / self.rate
+            time.sleep(wait)
+
+# ---------- Snapshots ----------
+def snapshot_time(snapshot_dir: str) -> dt.datetime:
+    """UTC time the snapshot was taken (manifest generated_utc, intraday id, else 16:00 ET that day)."""
+    m = _DIR_RE.match(os.path.basename(snapshot_dir.rstrip("/")))
+    if m and m.group(2):
+        return dt.datetime.strptime(m.group(1) + m.group(2), "%Y-%m-%d%H%M%S").replace(tzinfo=dt.timezone.utc)
+    day = dt.date.fromisoformat(m.group(1)) if m else dt.date.today()
+    try:
+        with open(os.path.join(snapshot_dir, "manifest.json"), "r", encoding="utf-8") as f:
+            ts = dt.datetime.fromisoformat(json.load(f)["generated_utc"].replace("Z", "+00:00"))
+        if ts.astimezone(ET).date() == day:  # a day republished later keeps its own session
+            return ts
+    except (OSError, ValueError, KeyError):
+        pass
+    return dt.datetime.combine(day, dt.time(16, 0), ET).astimezone(dt.timezone.utc)
+
+def session_as_of(ts_utc: dt.datetime) -> Tuple[dt.datetime, dt.datetime]:
+    """(session open, as-of) in ET for the session in effect at ts: capped at the close, else the previous close."""
+    t = ts_utc.astimezone(ET)
+    open_, close = t.replace(hour=9, minute=30, second=0, microsecond=0), t.replace(hour=16, minute=0, second=0, microsecond=0)
+    if t.weekday() < 5 and t >= open_:
+        return open_, min(t, close)
+    d = t.date() - dt.timedelta(days=1)
+    while d.weekday() >= 5:
+        d -= dt.timedelta(days=1)
+    return (dt.datetime.combine(d, dt.time(9, 30), ET), dt.datetime.combine(d, dt.time(16, 0), ET))
+
+def snapshot_dirs(data_root: str, since: Optional[str] = None, until: Optional[str] = None) -> List[str]:
+    out = []
+    for name in sorted(os.listdir(data_root)):
+        m = _DIR_RE.match(name)
+        d = os.path.join(data_root, name)
+        if not m or not os.path.exists(os.path.join(d, OVERLAY)):
+            continue
+        if (since and m.group(1) < since) or (until and m.group(1) > until):
+            continue
+        out.append(d.replace(os.sep, "/"))
+    return out
+
+def _blank(v: Optional[str]) -> bool:
+    return v is None or v.strip() in ("", "nan", "NaN", "None")
+
+def read_overlay(snapshot_dir: str) -> Tuple[List[str], List[Dict[str, str]]]:
+    with open(os.path.join(snapshot_dir, OVERLAY), "r", encoding="utf-8", newline="") as f:
+        rd = csv.DictReader(f)
+        return list(rd.fieldnames or []), list(rd)
+
+# ---------- Checkpoint ----------
+def _ckey(data_root: str, snapshot_dir: str, ticker: str, as_of: dt.datetime) -> str:
+    """Keyed by the snapshot's path under data_root, so ./data and data/ runs share a checkpoint."""
+    rel = os.path.relpath(snapshot_dir, data_root).replace(os.sep, "/")
+    return f"{rel}|{ticker}|{as_of.strftime('%Y-%m-%dT%H:%M')}"
+
+class Checkpoint:
+    """Append-only NDJSON of finished pairs; a torn last line (killed mid-write) is ignored."""
+
+    def __init__(self, path: str):
+        self.path, self.done, self.lock = path, {}, threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                        self.done[rec["key"]] = rec
+                    except (ValueError, KeyError):
+                        continue
+        except OSError:
+            pass
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.f = open(path, "a", encoding="utf-8")
+
+    def add(self, rec: Dict):
+        with self.lock:
+            self.done[rec["key"]] = rec
+            self.f.write(json.dumps(rec, separators=(",", ":")) + "\n")
+            self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+# ---------- Work ----------
+def fetch_pair(ticker: str, open_et: dt.datetime, as_of: dt.datetime, limiter) -> Dict:
+    from tools.vwap_utils import fetch_timesales
+    from tools.vwap_engine import bars_vwap
+    bars = fetch_timesales(ticker, open_et.strftime("%Y-%m-%d %H:%M"), as_of.strftime("%Y-%m-%d %H:%M"),
+                           interval="1min", limiter=limiter, strict=True)  # failures raise: never checkpointed
+    bars = bars.until(int(as_of.timestamp() * 1000))
+    st = bars_vwap(bars)[None] if len(bars) else {"vwap": float("nan"), "sigma": float("nan")}
+    ok = lambda x: None if x != x else float(x)
+    return {"vwap": ok(st["vwap"]), "sigma": ok(st["sigma"]), "bars": len(bars)}
+
+def rewrite_overlay(snapshot_dir: str, results: Dict[str, Dict]) -> int:
+    """Fill VWAP columns from {ticker: result}; atomic rewrite + manifest refresh. Returns rows changed."""
+    from tools.snapshot_manifest import atomic_write_bytes, refresh_artifacts
+    header, rows = read_overlay(snapshot_dir)
+    changed = 0
+    for r in rows:
+        res = results.get((r.get("Ticker") or "").strip())
+        if not res or res.get("vwap") is None:
+            continue
+        vwap, sd = res["vwap"], res.get("sigma")
+        try:
+            px = float(r.get("LastPx") or "nan")
+        except ValueError:
+            px = float("nan")
+        r["VWAP"] = f"{round(vwap, 4)}"
+        r["Px_vs_VWAP"] = "Unknown" if px != px else ("Above" if px > vwap else "Below")
+        if "VWAP_SD" in header:
+            r["VWAP_SD"] = "" if sd is None else f"{round(sd, 4)}"
+        if "VWAP_Z" in header:
+            r["VWAP_Z"] = f"{round((px - vwap) / sd, 2)}" if sd and px == px else ""
+        changed += 1
+    if not changed:
+        return 0
+    buf = io.StringIO()
+    w = csv.DictWriter(buf, fieldnames=header, lineterminator="\n")
+    w.writeheader()
+    w.writerows(rows)
+    atomic_write_bytes(os.path.join(snapshot_dir, OVERLAY), buf.getvalue().encode("utf-8"))
+    refresh_artifacts(snapshot_dir, [OVERLAY])
+    return changed
+
+def plan(data_root: str, dirs: List[str], ckpt: Checkpoint, force: bool, retry_empty: bool):
+    """Per snapshot: (open, as_of, tickers needing a value, tickers still to fetch)."""
+    jobs = {}
+    for d in dirs:
+        if os.path.isdir(os.path.join(d, "deltas")):
+            print(f"[backfill] {d}: has intraday deltas; skipped (republish it instead)")
+            continue
+        header, rows = read_overlay(d)
+        if "Ticker" not in header:
+            continue
+        open_et, as_of = session_as_of(snapshot_time(d))
+        want = [r["Ticker"].strip() for r in rows if r.get("Ticker") and (force or _blank(r.get("VWAP")))]
+        fetch = []
+        for t in want:
+            rec = ckpt.done.get(_ckey(data_root, d, t, as_of))
+            if rec is None or (retry_empty and rec.get("vwap") is None):
+                fetch.append(t)
+        if want:
+            jobs[d] = (open_et, as_of, want, fetch)
+    return jobs
+
+def backfill(data_root: str = "data", since: Optional[str] = None, until: Optional[str] = None,
+             workers: int = 8, rps: float = RPS, checkpoint: Optional[str] = None, force: bool = False,
+             retry_empty: bool = False, dry_run: bool = False) -> Dict[str, int]:
+    ckpt = Checkpoint(checkpoint or os.path.join(CACHE_DIR, CHECKPOINT))
+    try:
+        jobs = plan(data_root, snapshot_dirs(data_root, since, until), ckpt, force, retry_empty)
+        n_fetch = sum(len(j[3]) for j in jobs.values())
+        print(f"[backfill] {len(jobs)} snapshots, {sum(len(j[2]) for j in jobs.values())} rows to fill, "
+              f"{n_fetch} to fetch at ≤{rps:g} req/s")
+        if dry_run:
+            for d, (_, as_of, want, fetch) in jobs.items():
+                print(f"  {d} as of {as_of:%Y-%m-%d %H:%M} ET: {len(want)} rows, {len(fetch)} to fetch")
+            return {"snapshots": 0, "fetched": 0, "rows": 0}
+
+        bucket = TokenBucket(rps, burst=max(1.0, min(rps, float(workers))))
+        left = {d: len(j[3]) for d, j in jobs.items()}
+        stats = {"snapshots": 0, "fetched": 0, "rows": 0}
+
+        def finish(d: str):
+            _, as_of, want, _ = jobs[d]
+            results = {t: ckpt.done.get(_ckey(data_root, d, t, as_of)) for t in want}
+            n = rewrite_overlay(d, {t: r for t, r in results.items() if r})
+            stats["snapshots"] += 1 if n else 0
+            stats["rows"] += n
+            print(f"[backfill] {d}: {n}/{len(want)} rows filled")
+
+        for d in [d for d, n in left.items() if n == 0]:  # everything already checkpointed
+            finish(d)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futs = {pool.submit(fetch_pair, t, jobs[d][0], jobs[d][1], bucket.take): (d, t)
+                    for d, j in jobs.items() for t in j[3]}
+            for fut in as_completed(futs):
+                d, t = futs[fut]
+                try:
+                    res = fut.result()
+                except Exception as e:  # leave it out of the checkpoint: the next run retries
+                    print(f"[warn] {d} {t}: {e}")
+                    res = None
+                if res is not None:
+                    ckpt.add({"key": _ckey(data_root, d, t, jobs[d][1]), **res})
+                    stats["fetched"] += 1
+                left[d] -= 1
+                if left[d] == 0:
+                    finish(d)
+        return stats
+    finally:
+        ckpt.close()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="leaps vwap-backfill", description="fill empty VWAP cells in published overlays")
+    ap.add_argument("--data-root", default="data")
+    ap.add_argument("--since", default=None, help="first snapshot date (YYYY-MM-DD)")
+    ap.add_argument("--until", default=None, help="last snapshot date (YYYY-MM-DD)")
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--rps", type=float, default=RPS, help="request budget shared by all workers")
+    ap.add_argument("--checkpoint", default=None, help=f"default: $CACHE_DIR/{CHECKPOINT}")
+    ap.add_argument("--force", action="store_true", help="recompute rows that already have a VWAP")
+    ap.add_argument("--retry-empty", action="store_true", help="refetch pairs that previously returned no bars")
+    ap.add_argument("--dry-run", action="store_true")
+    args = ap.parse_args(argv)
+    if not os.environ.get("TRADIER_TOKEN", "").strip() and not args.dry_run:
+        print("[backfill] TRADIER_TOKEN not set (skipping)")
+        return 0
+    t0 = time.perf_counter()
+    st = backfill(args.data_root, args.since, args.until, args.workers, args.rps, args.checkpoint,
+                  args.force, args.retry_empty, args.dry_run)
+    print(f"[backfill] {st['snapshots']} snapshots rewritten, {st['rows']} rows filled, "
+          f"{st['fetched']} pairs fetched in {time.perf_counter() - t0:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
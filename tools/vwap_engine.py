@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+One VWAP engine for bars and ticks: session VWAP, anchored VWAP and σ bands.
+
+- Price per row is the bar's typical price (high+low+close)/3 when OHLC is
+  present, else `price`/`close` (ticks, or timesales rows without OHLC).
+- One pass of cumulative sums Σv, Σpv, Σp²v (prices shifted by the first price
+  so the variance does not cancel) gives VWAP and the volume-weighted σ of price
+  around it for *every* anchor: an anchor at time a is the suffix from
+  searchsorted(t, a), so N anchors cost one scan plus N lookups per symbol.
+- Bands are VWAP ± 1σ / ± 2σ. Nothing is rounded here; round at display time.
+- VWAP keeps running sums for incremental use. update() takes sorted bars
+  (repeated/older bars are skipped, and the newest bar stays "open" so a
+  re-fetched partial bar replaces it). add_tick() is the scalar path for streamed
+  trades, which never revise.
+
+Times are any consistent int64 scale (epoch ms by convention); to_ms() converts
+pandas/NumPy datetimes and datetime objects (naive ones as wall clock).
+"""
+
+from __future__ import annotations
+import math
+import datetime as dt
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+BANDS = (1.0, 2.0)
+
+def to_ms(x: Any) -> Any:
+    """datetime / datetime64 / pandas Series or array → int64 ms (scalars → int)."""
+    if isinstance(x, dt.datetime):
+        if x.tzinfo is not None:
+            return int(round(x.timestamp() * 1000))
+        return int(np.datetime64(x, "ms").astype(np.int64))
+    if hasattr(x, "to_numpy"):
+        x = x.to_numpy()
+    a = np.asarray(x)
+    if np.issubdtype(a.dtype, np.datetime64):
+        return a.astype("datetime64[ms]").astype(np.int64)
+    return a.astype(np.int64)
+
+def bar_prices(cols: Dict[str, Any]) -> np.ndarray:
+    """Typical price from a frame/dict of columns; falls back to `price`, then `close`."""
+    have = lambda c: c in cols and cols[c] is not None
+    num = lambda c: np.asarray(cols[c], dtype=np.float64)
+    if have("high") and have("low") and have("close"):
+        return (num("high") + num("low") + num("close")) / 3.0
+    for c in ("price", "close"):
+        if have(c):
+            return num(c)
+    raise KeyError("bars need high/low/close, price or close")
+
+def _clean(price: np.ndarray, volume: np.ndarray):
+    price = np.asarray(price, dtype=np.float64)
+    volume = np.nan_to_num(np.asarray(volume, dtype=np.float64), nan=0.0)
+    ok = np.isfinite(price) & (volume > 0)
+    return np.where(ok, price, 0.0), np.where(ok, volume, 0.0)
+
+def _stats(v: float, pv: float, p2v: float, ref: float, last: float = math.nan) -> Dict[str, float]:
+    """Sums (prices relative to ref) → {"vwap", "sigma", "volume", "upper1", "lower1", ...}."""
+    if v <= 0:
+        out = {"vwap": math.nan, "sigma": math.nan, "volume": 0.0}
+    else:
+        m = pv / v
+        out = {"vwap": ref + m, "sigma": math.sqrt(max(p2v / v - m * m, 0.0)), "volume": v}
+    for k in BANDS:
+        out[f"upper{k:g}"] = out["vwap"] + k * out["sigma"]
+        out[f"lower{k:g}"] = out["vwap"] - k * out["sigma"]
+    out["last"] = last
+    out["z"] = (last - out["vwap"]) / out["sigma"] if out["sigma"] and out["sigma"] == out["sigma"] else math.nan
+    return out
+
+def anchored(t: np.ndarray, price: np.ndarray, volume: np.ndarray,
+             anchors: Sequence[int] = (), series: bool = False) -> Dict[Any, Dict[str, Any]]:
+    """
+    Single pass over time-sorted rows → {anchor: stats} for the session (key None,
+    i.e. all rows) and every anchor time. series=True adds the running VWAP per row
+    for the session anchor ("vwap_series").
+    """
+    t = np.asarray(t, dtype=np.int64)
+    p, v = _clean(price, volume)
+    n = len(p)
+    if n == 0:
+        return {a: _stats(0.0, 0.0, 0.0, 0.0) for a in [None, *anchors]}
+    ref = float(p[np.argmax(v > 0)]) if (v > 0).any() else 0.0
+    d = np.where(v > 0, p - ref, 0.0)
+    cv = np.cumsum(v)
+    cpv = np.cumsum(d * v)
+    cp2v = np.cumsum(d * d * v)
+    last = float(p[np.flatnonzero(v > 0)[-1]]) if (v > 0).any() else math.nan
+
+    def suffix(i: int) -> Dict[str, float]:
+        if i >= n:
+            return _stats(0.0, 0.0, 0.0, ref, last)
+        if i == 0:
+            return _stats(cv[-1], cpv[-1], cp2v[-1], ref, last)
+        return _stats(cv[-1] - cv[i - 1], cpv[-1] - cpv[i - 1], cp2v[-1] - cp2v[i - 1], ref, last)
+
+    out: Dict[Any, Dict[str, Any]] = {None: suffix(0)}
+    if series:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[None]["vwap_series"] = np.where(cv > 0, ref + cpv / cv, np.nan)
+    if len(anchors):
+        idx = np.searchsorted(t, np.asarray(anchors, dtype=np.int64), side="left")
+        for a, i in zip(anchors, idx):
+            out[a] = suffix(int(i))
+    return out
+
+def session_vwap(t: np.ndarray, price: np.ndarray, volume: np.ndarray) -> Dict[str, float]:
+    return anchored(t, price, volume)[None]
+
+class VWAP:
+    """Running anchored VWAP + σ for one symbol; rows before `anchor` are ignored."""
+    __slots__ = ("anchor", "ref", "v", "pv", "p2v", "open_t", "open_p", "open_v", "last_t", "last")
+
+    def __init__(self, anchor: Optional[int] = None):
+        self.anchor = anchor
+        self.reset()
+
+    def reset(self, anchor: Optional[int] = None):
+        if anchor is not None:
+            self.anchor = anchor
+        self.ref = None
+        self.v = self.pv = self.p2v = 0.0
+        self.open_t, self.open_p, self.open_v = None, 0.0, 0.0  # newest bar, still revisable
+        self.last_t, self.last = None, math.nan
+
+    def _commit(self, p: float, v: float):
+        if v <= 0 or p != p:
+            return
+        if self.ref is None:
+            self.ref = p
+        d = p - self.ref
+        self.v += v
+        self.pv += d * v
+        self.p2v += d * d * v
+
+    def add_tick(self, t: int, price: float, size: float):
+        """Scalar path for trades (never revised)."""
+        if self.anchor is not None and t < self.anchor:
+            return
+        self._commit(price, size)
+        if size > 0:
+            self.last_t, self.last = t, price
+
+    def update(self, t: Iterable[int], price: np.ndarray, volume: np.ndarray):
+        """
+        Fold in time-sorted bars. Bars older than the open bar are already counted and
+        skipped; a bar at the open bar's time replaces it (re-fetched partial bar).
+        """
+        t = np.asarray(t, dtype=np.int64)
+        p, v = _clean(price, volume)
+        lo = 0 if self.anchor is None else int(np.searchsorted(t, self.anchor, side="left"))
+        if self.open_t is not None:
+            lo = max(lo, int(np.searchsorted(t, self.open_t, side="left")))
+        if lo >= len(t):
+            return
+        if self.open_t is not None and t[lo] > self.open_t:
+            self._commit(self.open_p, self.open_v)  # the open bar is final: a later bar arrived
+        t, p, v = t[lo:], p[lo:], v[lo:]
+        if len(t) > 1:
+            body_p, body_v = p[:-1], v[:-1]
+            if self.ref is None and (body_v > 0).any():
+                self.ref = float(body_p[np.argmax(body_v > 0)])
+            if self.ref is not None:
+                d = np.where(body_v > 0, body_p - self.ref, 0.0)
+                self.v += float(body_v.sum())
+                self.pv += float((d * body_v).sum())
+                self.p2v += float((d * d * body_v).sum())
+        self.open_t, self.open_p, self.open_v = int(t[-1]), float(p[-1]), float(v[-1])
+        if (v > 0).any():
+            j = int(np.flatnonzero(v > 0)[-1])
+            self.last_t, self.last = int(t[j]), float(p[j])
+
+    def _totals(self):
+        v, pv, p2v, ref = self.v, self.pv, self.p2v, self.ref
+        if self.open_v > 0:
+            ref = self.open_p if ref is None else ref
+            d = self.open_p - ref
+            v, pv, p2v = v + self.open_v, pv + d * self.open_v, p2v + d * d * self.open_v
+        return v, pv, p2v, ref
+
+    def merge(self, other: "VWAP"):
+        """Add another accumulator's volume (its open bar taken as final), e.g. bars before a stream connected."""
+        v, pv, p2v, ref = other._totals()
+        if v <= 0:
+            return
+        if self.ref is None:
+            self.ref = ref
+        d = ref - self.ref  # re-centre other's sums on our reference price
+        self.v += v
+        self.pv += pv + d * v
+        self.p2v += p2v + 2 * d * pv + d * d * v
+        if self.last_t is None:
+            self.last_t, self.last = other.last_t, other.last
+
+    def stats(self) -> Dict[str, float]:
+        v, pv, p2v, ref = self._totals()
+        return _stats(v, pv, p2v, ref or 0.0, self.last)
+
+    @property
+    def value(self) -> float:
+        return self.stats()["vwap"] if self.v > 0 or self.open_v > 0 else math.nan
+
+def bars_vwap(df, anchors: Sequence[int] = ()) -> Dict[Any, Dict[str, Any]]:
+    """Timesales/history frame or Bars (time + OHLCV or price/volume) → anchored() result."""
+    if df is None or len(df) == 0:
+        return anchored(np.empty(0, np.int64), np.empty(0), np.empty(0), anchors)
+    cols = {c: np.asarray(df[c]) for c in ("high", "low", "close", "price", "volume") if c in df}
+    t = to_ms(df["time"]) if "time" in df else np.arange(len(df), dtype=np.int64)
+    return anchored(t, bar_prices(cols), cols.get("volume", np.zeros(len(df))), anchors)
+
+def multi_symbol(bars: Dict[str, Any], anchors: Dict[str, List[int]] | None = None) -> Dict[str, Dict[Any, Dict[str, Any]]]:
+    """{symbol: frame} → {symbol: anchored stats}; one scan per symbol whatever the anchor count."""
+    anchors = anchors or {}
+    return {sym: bars_vwap(df, anchors.get(sym, ())) for sym, df in bars.items()}
@@ -2,69 +2,83 @@
 # -*- coding: utf-8 -*-
 """
 VWAP helpers using Tradier /v1/markets/timesales.
-- Computes intraday VWAP from market open (09:30 ET) up to "now" ET.
+- Computes intraday VWAP from market open (09:30 ET) up to "now" ET with
+  tools.vwap_engine (typical price of the 1-min bars; unrounded).
 - Graceful retries and empty-data handling.
+- The timesales body is decoded as it streams in (tools/bars_decode.py), straight
+  into typed arrays — no JSON dicts or DataFrame per call.
 Env:
   TRADIER_TOKEN   -> Bearer token for production (required for live data).
+  TRADIER_BASE    -> API base (default https://api.tradier.com/v1), e.g. a local stand-in.
 """
 
 from __future__ import annotations
 import os, time
-from typing import Optional
+from typing import Callable, Optional
 from zoneinfo import ZoneInfo
 import datetime as dt
 import requests
-import pandas as pd
 
-TRADIER = "https://api.tradier.com"
+from tools.bars_decode import Bars, decode_bars
+from tools.vwap_engine import bars_vwap
+
+BASE = os.environ.get("TRADIER_BASE", "https://api.tradier.com/v1").rstrip("/")
 HEADERS = lambda tok: {"Authorization": f"Bearer {tok}", "Accept": "application/json"}
 
-def _get_json(url: str, token: str, params: dict, retries: int = 3, backoff: float = 1.2) -> tuple[int, dict|None]:
-    last_err = None
+def _get_bars(url: str, token: str, params: dict, retries: int = 3, backoff: float = 1.2,
+              limiter: Optional[Callable[[], None]] = None, strict: bool = False) -> Bars:
+    """
+    `limiter` (e.g. a token bucket's take) is called before every attempt, retries included.
+    Failures give empty Bars, or raise RuntimeError with `strict` so a caller can tell an
+    outage from a 200 that simply had no bars.
+    """
+    err = None
     for i in range(retries):
+        if limiter is not None:
+            limiter()
         try:
-            r = requests.get(url, headers=HEADERS(token), params=params, timeout=15)
-            if r.status_code == 200:
-                try:
-                    return r.status_code, r.json()
-                except Exception:
-                    return r.status_code, None
-            last_err = f"HTTP {r.status_code}"
+            with requests.get(url, headers=HEADERS(token), params=params, timeout=15, stream=True) as r:
+                if r.status_code == 200:
+                    try:
+                        return decode_bars(r.iter_content(1 << 16),
+                                           size_hint=int(r.headers.get("Content-Length") or 0))
+                    except ValueError as e:
+                        err = f"undecodable body: {e}"
+                        break
+                err = f"HTTP {r.status_code}"
         except Exception as e:
-            last_err = str(e)
+            err = str(e) or e.__class__.__name__
         time.sleep(backoff * (i+1))
-    return 0, {"error": last_err} if last_err else None
+    if strict:
+        raise RuntimeError(f"timesales failed: {err}")
+    return Bars.blank()
 
-def fetch_timesales(symbol: str, start_et: str, end_et: str, interval: str = "1min") -> pd.DataFrame:
+def fetch_timesales(symbol: str, start_et: str, end_et: str, interval: str = "1min",
+                    limiter: Optional[Callable[[], None]] = None, strict: bool = False) -> Bars:
     """
     start_et/end_et: 'YYYY-MM-DD HH:MM' in America/New_York (ET)
-    Returns DataFrame[time, price, volume] or empty df.
+    Returns Bars (t = epoch ms, OHLCV float64); empty Bars when there is no data.
+    A single bar (returned by Tradier as an object, not a list) decodes the same way.
+    strict=True raises instead when the token is missing or the request keeps failing.
     """
     token = os.environ.get("TRADIER_TOKEN", "").strip()
     if not token:
-        return pd.DataFrame()
-    url = f"{TRADIER}/v1/markets/timesales"
+        if strict:
+            raise RuntimeError("TRADIER_TOKEN not set")
+        return Bars.blank()
+    url = f"{BASE}/markets/timesales"
     params = {"symbol": symbol, "interval": interval, "start": start_et, "end": end_et, "session_filter": "open"}
-    code, js = _get_json(url, token, params)
-    if code != 200 or not js:
-        return pd.DataFrame()
-    series = (js or {}).get("series", {}).get("data", [])
-    if not series:
-        return pd.DataFrame()
-    df = pd.DataFrame(series)
-    # Expecting keys: time, price, volume
-    cols = [c for c in ["time", "price", "volume"] if c in df.columns]
-    return df[cols].copy() if cols else pd.DataFrame()
+    return _get_bars(url, token, params, limiter=limiter, strict=strict)
 
-def intraday_vwap(df: pd.DataFrame) -> Optional[float]:
-    if df.empty or "price" not in df or "volume" not in df:
+def intraday_vwap(df) -> Optional[float]:
+    """Session VWAP over the bars (typical price when OHLC is present); None when there's no volume."""
+    if df.empty or "volume" not in df:
         return None
     try:
-        pv = (df["price"].astype(float) * df["volume"].astype(float)).sum()
-        v  = df["volume"].astype(float).sum()
-        return round(pv / v, 4) if v > 0 else None
-    except Exception:
+        v = bars_vwap(df)[None]["vwap"]
+    except KeyError:  # no usable price columns
         return None
+    return v if v == v else None
 
 def compute_today_vwap(symbol: str, as_of_et: dt.datetime | None = None) -> Optional[float]:
     """
@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
-import json, sys
+import argparse, json, sys
 
-def main():
-    path = "vwap_missing.json"
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="leaps vwap-warn")
+    ap.add_argument("--path", default="vwap_missing.json")
+    path = ap.parse_args(argv).path
     try:
         with open(path, "r", encoding="utf-8") as f:
             j = json.load(f)